@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Compare the parallel upload hashing with the sequential hashing loop.
+Run with: dokku run jazzband python benchmark_hashing.py
+"""
+
+import hashlib
+import os
+import sys
+import time
+
+from jazzband.projects.hashing import CHUNK_SIZE, MultiDigest
+
+
+SIZES = [1, 10, 60]  # in MB
+ROUNDS = 5
+
+
+def sequential(data, chunk_size):
+    # the loop the upload view used before
+    hashers = {
+        "md5": hashlib.md5(),
+        "sha256": hashlib.sha256(),
+        "blake2_256": hashlib.blake2b(digest_size=256 // 8),
+    }
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        for hasher in hashers.values():
+            hasher.update(view[start : start + chunk_size])
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+
+def parallel(data, chunk_size):
+    view = memoryview(data)
+    with MultiDigest() as digest:
+        for start in range(0, len(view), chunk_size):
+            digest.update(view[start : start + chunk_size])
+        return digest.hexdigests()
+
+
+def best_of(function, data, chunk_size):
+    timings = []
+    for _ in range(ROUNDS):
+        started_at = time.perf_counter()
+        function(data, chunk_size)
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+sizes = [int(size) for size in sys.argv[1:]] or SIZES
+print(f"{'size':>6} {'chunk':>8} {'sequential':>11} {'parallel':>9} {'speedup':>8}")
+for size in sizes:
+    data = os.urandom(size * 1024 * 1024)
+    assert sequential(data, CHUNK_SIZE) == parallel(data, CHUNK_SIZE)
+    for chunk_size in (8096, CHUNK_SIZE):
+        before = best_of(sequential, data, chunk_size)
+        after = best_of(parallel, data, chunk_size)
+        print(
+            f"{size:>4}MB {chunk_size:>8} {before * 1000:>9.1f}ms "
+            f"{after * 1000:>7.1f}ms {before / after:>7.2f}x"
+        )
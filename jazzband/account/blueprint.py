@@ -1,6 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import threading
 
-from flask import current_app, flash
+from flask import current_app, flash, has_app_context, has_request_context
 from flask_dance.consumer import OAuth2ConsumerBlueprint, oauth_error
 from flask_dance.consumer.requests import BaseOAuth2Session, OAuth2Session
 from flask_dance.consumer.storage.sqla import SQLAlchemyStorage
@@ -12,11 +14,30 @@ from werkzeug.utils import cached_property
 from ..cache import cache
 from ..db import postgres as db
 from ..exceptions import RateLimit
+from .httpcache import GitHubResponseCache
 from .models import OAuth
+from .ratelimit import RateLimitBudget
 
 
 logger = logging.getLogger(__name__)
 
+# how many repositories to query at once via GraphQL
+WATCHERS_BATCH_SIZE = 50
+
+# below this remaining rate limit pages are fetched one by one again
+PAGE_CONCURRENCY_RATELIMIT = 500
+
+
+def ratelimit_remaining(response):
+    """
+    Returns the remaining rate limit from the response headers or infinity
+    if it's unknown.
+    """
+    try:
+        return int(response.headers["X-RateLimit-Remaining"])
+    except (KeyError, TypeError, ValueError):
+        return float("inf")
+
 
 @oauth_error.connect
 def github_error(blueprint, error, error_description=None, error_uri=None):
@@ -37,14 +58,68 @@ class GitHubSessionMixin:
     """A requests session mixin for GitHub that implements currently:
 
     - rate limit handling (by raising an exception when it happens)
-    - pagination by the additional all_pages parameter
+    - pagination by the additional all_pages parameter, optionally
+      fetching pages concurrently (see page_concurrency)
+    - counting of the HTTP requests made (see request_count)
+    - optional conditional request caching of GET requests (see response_cache)
+    - optional pacing of background requests (see ratelimit_budget)
     """
 
-    def request(self, method, url, data=None, headers=None, all_pages=False, **kwargs):
+    #: the number of HTTP requests sent to GitHub by this session
+    request_count = 0
+    request_count_lock = threading.Lock()
+
+    #: a GitHubResponseCache instance to use for GET requests, if any
+    response_cache = None
+
+    #: how many pages to fetch concurrently with all_pages
+    page_concurrency = 1
+
+    #: a RateLimitBudget instance shared with other processes, if any
+    ratelimit_budget = None
+
+    def send_request(self, method, url, data=None, headers=None, **kwargs):
+        """
+        Sends a single HTTP request to GitHub and counts it.
+
+        If a response cache is set, GET requests are made conditional on
+        the ETag of the cached response and a 304 response is replaced
+        with the cached one. If a rate limit budget is set, background
+        requests wait for it and every response updates it.
+        """
+        cached = None
+        if self.response_cache is not None and method.upper() == "GET":
+            cache_key = self.response_cache.key(url, headers)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                headers = self.response_cache.conditional_headers(cached, headers)
+
+        if self.ratelimit_budget is not None:
+            # requests made while handling a web request are interactive
+            self.ratelimit_budget.acquire(interactive=has_request_context())
+
+        with self.request_count_lock:
+            self.request_count += 1
         response = super().request(
             method=method, url=url, data=data, headers=headers, **kwargs
         )
 
+        if self.ratelimit_budget is not None:
+            self.ratelimit_budget.update(response)
+
+        if self.response_cache is not None and method.upper() == "GET":
+            if cached is not None and response.status_code == 304:
+                self.response_cache.record(hit=True)
+                return self.response_cache.replay(cached, response)
+            self.response_cache.record(hit=False)
+            self.response_cache.store(cache_key, response)
+        return response
+
+    def check_rate_limit(self, response):
+        """
+        Raises a RateLimit exception if the response says the rate limit
+        has been exceeded.
+        """
         if response.status_code == 403:
             ratelimit_remaining = response.headers.get("X-RateLimit-Remaining")
             if ratelimit_remaining:
@@ -54,13 +129,31 @@ class GitHubSessionMixin:
                 except ValueError:
                     pass
 
+    def request(self, method, url, data=None, headers=None, all_pages=False, **kwargs):
+        response = self.send_request(
+            method=method, url=url, data=data, headers=headers, **kwargs
+        )
+        self.check_rate_limit(response)
+
         if all_pages:
             result = response.json()
-            while response.links.get("next"):
-                url = response.links["next"]["url"]
-                response = super().request(
-                    method=method, url=url, data=data, headers=headers, **kwargs
+            page_urls = None
+            if (
+                self.page_concurrency > 1
+                and ratelimit_remaining(response) >= PAGE_CONCURRENCY_RATELIMIT
+            ):
+                page_urls = self.remaining_page_urls(response)
+
+            if page_urls:
+                responses = self.fetch_pages(
+                    page_urls, method=method, data=data, headers=headers, **kwargs
                 )
+            else:
+                responses = self.follow_pages(
+                    response, method=method, data=data, headers=headers, **kwargs
+                )
+
+            for response in responses:
                 body = response.json()
                 if isinstance(body, list):
                     result += body
@@ -70,6 +163,71 @@ class GitHubSessionMixin:
         else:
             return response
 
+    def follow_pages(self, response, method, data=None, headers=None, **kwargs):
+        """
+        Yields the remaining pages one by one by following the next links.
+        """
+        while response.links.get("next"):
+            url = response.links["next"]["url"]
+            response = self.send_request(
+                method=method, url=url, data=data, headers=headers, **kwargs
+            )
+            self.check_rate_limit(response)
+            yield response
+
+    def remaining_page_urls(self, response):
+        """
+        Builds the URLs of the remaining pages from the next and last links
+        of the given response. Returns None if they can't be determined.
+        """
+        next_link = response.links.get("next")
+        last_link = response.links.get("last")
+        if not next_link or not last_link:
+            return None
+        last_url = URLObject(last_link["url"])
+        try:
+            first_page = int(URLObject(next_link["url"]).query_dict["page"])
+            last_page = int(last_url.query_dict["page"])
+        except (KeyError, ValueError):
+            return None
+        return [
+            last_url.set_query_param("page", str(page))
+            for page in range(first_page, last_page + 1)
+        ]
+
+    def fetch_pages(self, urls, method, data=None, headers=None, **kwargs):
+        """
+        Fetches the pages with the given URLs concurrently on a thread pool
+        of page_concurrency threads and returns the responses in order.
+
+        The pages are fetched in rounds and once the remaining rate limit
+        drops below PAGE_CONCURRENCY_RATELIMIT the rest of the pages are
+        fetched one by one.
+        """
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def fetch(url):
+            if app is None:
+                return self.send_request(
+                    method=method, url=url, data=data, headers=headers, **kwargs
+                )
+            with app.app_context():
+                return self.send_request(
+                    method=method, url=url, data=data, headers=headers, **kwargs
+                )
+
+        workers = self.page_concurrency
+        responses = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while len(responses) < len(urls):
+                batch = urls[len(responses) : len(responses) + workers]
+                for response in executor.map(fetch, batch):
+                    self.check_rate_limit(response)
+                    responses.append(response)
+                    if ratelimit_remaining(response) < PAGE_CONCURRENCY_RATELIMIT:
+                        workers = 1
+        return responses
+
 
 class GitHubSession(GitHubSessionMixin, OAuth2Session):
     """A custom GitHub session that implements a bunch of GitHub
@@ -91,6 +249,9 @@ class AdminGitHubSession(GitHubSessionMixin, BaseOAuth2Session):
         super().__init__(**kwargs)
         self.blueprint = blueprint
         self.base_url = URLObject(base_url)
+        self.response_cache = GitHubResponseCache()
+        self.ratelimit_budget = RateLimitBudget()
+        self.page_concurrency = blueprint.page_concurrency
 
     def request(self, method, url, data=None, headers=None, **kwargs):
         if self.base_url:
@@ -110,12 +271,32 @@ class AdminGitHubSession(GitHubSessionMixin, BaseOAuth2Session):
         return super().request(**kwargs)
 
 
+class MemberSnapshot:
+    """
+    The org-wide sets of user ids that are used to enrich team members,
+    fetched once and shared by all get_members calls of a sync run.
+    """
+
+    def __init__(self, without_2fa_ids, roadies_ids):
+        self.without_2fa_ids = frozenset(without_2fa_ids)
+        self.roadies_ids = frozenset(roadies_ids)
+
+    def enrich(self, member):
+        member["is_member"] = True
+        member["is_roadie"] = member["id"] in self.roadies_ids
+        member["has_2fa"] = member["id"] not in self.without_2fa_ids
+        return member
+
+
 class GitHubBlueprint(OAuth2ConsumerBlueprint):
     """
     A custom OAuth2 blueprint that implements some of our
     specific GitHub API functions.
     """
 
+    #: how many pages the admin session fetches concurrently
+    page_concurrency = 1
+
     def __init__(self, *args, **kwargs):
         # Define default keyword arguments for GitHub OAuth blueprint
         default_kwargs = {
@@ -140,6 +321,7 @@ class GitHubBlueprint(OAuth2ConsumerBlueprint):
                 "roadies_team_slug": "GITHUB_ROADIES_TEAM_SLUG",
                 "admin_access_token": "GITHUB_ADMIN_TOKEN",
                 "org_name": "GITHUB_ORG_NAME",
+                "page_concurrency": "GITHUB_PAGE_CONCURRENCY",
             }
         )
 
@@ -248,22 +430,118 @@ class GitHubBlueprint(OAuth2ConsumerBlueprint):
             headers={"Accept": "application/vnd.github.v3+json"},
         )
 
-    def get_projects(self):
+    def get_projects(self, batched=True):
+        """
+        Fetches all public repositories of the org together with their
+        watcher counts.
+
+        With batched=True the watcher counts are loaded via GraphQL in a few
+        requests, falling back to one paginated REST call per repository
+        for those that couldn't be loaded that way.
+        """
         # https://docs.github.com/en/rest/reference/repos#list-organization-repositories
         projects = self.admin_session.get(
             f"orgs/{self.org_name}/repos?type=public", all_pages=True
         )
+        return self.add_watcher_counts(projects, batched=batched)
+
+    def get_updated_projects(self, since, batched=True):
+        """
+        Fetches the public repositories of the org that were updated at or
+        after the given ISO 8601 timestamp, together with their watcher
+        counts.
+
+        The repositories are requested sorted by their update time, newest
+        first, so paging stops at the first page that reaches older ones.
+        """
+        url = f"orgs/{self.org_name}/repos?type=public&sort=updated&direction=desc"
+        projects = []
+        while url:
+            response = self.admin_session.get(url)
+            response.raise_for_status()
+            page = response.json()
+            updated = [project for project in page if project["updated_at"] >= since]
+            projects.extend(updated)
+            if len(updated) < len(page):
+                break
+            url = response.links.get("next", {}).get("url")
+        return self.add_watcher_counts(projects, batched=batched)
+
+    def add_watcher_counts(self, projects, batched=True):
+        if batched:
+            watcher_counts = self.get_watcher_counts(
+                [project["name"] for project in projects]
+            )
+        else:
+            watcher_counts = {}
+
         projects_with_subscribers = []
         for project in projects:
             project_name = project["name"]
-            # https://docs.github.com/en/rest/reference/activity#list-watchers
-            watchers = self.admin_session.get(
-                f"repos/{self.org_name}/{project_name}/subscribers", all_pages=True
-            )
-            project["subscribers_count"] = len(watchers)
+            subscribers_count = watcher_counts.get(project_name)
+            if subscribers_count is None:
+                subscribers_count = self.get_watcher_count(project_name)
+            project["subscribers_count"] = subscribers_count
             projects_with_subscribers.append(project)
         return projects_with_subscribers
 
+    def get_watcher_count(self, project_name):
+        """
+        Counts the watchers of a single repository by loading all of them.
+        """
+        # https://docs.github.com/en/rest/reference/activity#list-watchers
+        watchers = self.admin_session.get(
+            f"repos/{self.org_name}/{project_name}/subscribers", all_pages=True
+        )
+        return len(watchers)
+
+    def get_watcher_counts(self, project_names, batch_size=WATCHERS_BATCH_SIZE):
+        """
+        Gets the watcher counts of many repositories using GraphQL queries
+        with one aliased repository block per repository.
+
+        Returns a mapping of repository name to watcher count, leaving out
+        repositories that couldn't be loaded.
+
+        Docs: https://docs.github.com/en/graphql/guides/forming-calls-with-graphql
+        """
+        watcher_counts = {}
+        for start in range(0, len(project_names), batch_size):
+            batch = project_names[start : start + batch_size]
+            variables = {"owner": self.org_name}
+            blocks = []
+            for index, project_name in enumerate(batch):
+                variables[f"name{index}"] = project_name
+                blocks.append(
+                    f"repo{index}: repository(owner: $owner, name: $name{index}) "
+                    "{ watchers { totalCount } }"
+                )
+            definitions = ", ".join(
+                ["$owner: String!"]
+                + [f"$name{index}: String!" for index in range(len(batch))]
+            )
+            query = f"query({definitions}) {{ {' '.join(blocks)} }}"
+            try:
+                response = self.admin_session.post(
+                    "graphql", json={"query": query, "variables": variables}
+                )
+                response.raise_for_status()
+                data = response.json().get("data") or {}
+            except RateLimit:
+                raise
+            except Exception:
+                logger.warning(
+                    "Couldn't load watcher counts via GraphQL",
+                    exc_info=True,
+                    extra={"project_names": batch},
+                )
+                continue
+            for index, project_name in enumerate(batch):
+                repository = data.get(f"repo{index}")
+                if repository:
+                    watcher_counts[project_name] = repository["watchers"]["totalCount"]
+        return watcher_counts
+
     def get_teams(self):
         # https://docs.github.com/en/rest/reference/teams#list-child-teams
         return self.admin_session.get(
@@ -278,21 +556,38 @@ class GitHubBlueprint(OAuth2ConsumerBlueprint):
             all_pages=True,
         )
 
-    def get_members(self, team_slug=None):
-        if team_slug is None:
-            team_slug = self.members_team_slug
-        without_2fa_ids = {user["id"] for user in self.get_without_2fa()}
-        roadies_ids = {roadie["id"] for roadie in self.get_roadies()}
-        all_members = self.admin_session.get(
+    def get_member_snapshot(self):
+        """
+        Fetches the org members without 2FA and the roadies once, to be
+        shared by the get_members calls of a sync run.
+        """
+        return MemberSnapshot(
+            without_2fa_ids=[user["id"] for user in self.get_without_2fa()],
+            roadies_ids=[roadie["id"] for roadie in self.get_roadies()],
+        )
+
+    def get_team_members(self, team_slug):
+        """
+        Gets the plain members of the team with the given slug, without
+        any enrichment.
+
+        https://docs.github.com/en/rest/reference/teams#list-team-members
+        """
+        return self.admin_session.get(
             f"orgs/{self.org_name}/teams/{team_slug}/members", all_pages=True
         )
-        members = []
-        for member in all_members:
-            member["is_member"] = True
-            member["is_roadie"] = member["id"] in roadies_ids
-            member["has_2fa"] = member["id"] not in without_2fa_ids
-            members.append(member)
-        return members
+
+    def get_members(self, team_slug=None, snapshot=None):
+        """
+        Gets the members of the team with the given slug (the members
+        team by default), enriched with their roadie and 2FA status from
+        the given MemberSnapshot, or a new one.
+        """
+        if team_slug is None:
+            team_slug = self.members_team_slug
+        if snapshot is None:
+            snapshot = self.get_member_snapshot()
+        return [snapshot.enrich(member) for member in self.get_team_members(team_slug)]
 
     def get_emails(self, user):
         """
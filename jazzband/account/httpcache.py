@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+
+from flask import current_app
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from ..db import redis
+
+
+logger = logging.getLogger(__name__)
+
+RATELIMIT_HEADERS = (
+    "X-RateLimit-Limit",
+    "X-RateLimit-Remaining",
+    "X-RateLimit-Reset",
+    "X-RateLimit-Used",
+)
+
+
+class GitHubResponseCache:
+    """
+    A Redis backed HTTP cache for GitHub API responses that uses
+    conditional requests.
+
+    For every URL (and therefore every page of a paginated listing) the
+    ETag, headers and body of the last 200 response is stored. Later
+    requests send the ETag in the If-None-Match header and GitHub answers
+    with a 304 if nothing has changed, which doesn't count against the
+    rate limit. The stored response is then returned instead, including
+    its Link header so pagination replays the cached pages.
+
+    https://docs.github.com/en/rest/overview/resources-in-the-rest-api#conditional-requests
+    """
+
+    prefix = "github-cache"
+
+    @property
+    def stats_key(self):
+        return f"{self.prefix}:stats"
+
+    @property
+    def timeout(self):
+        return current_app.config["GITHUB_CACHE_TIMEOUT"]
+
+    def key(self, url, headers=None):
+        accept = (headers or {}).get("Accept", "")
+        digest = hashlib.sha256(f"{url}|{accept}".encode()).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def get(self, key):
+        try:
+            cached = redis.hgetall(key)
+        except Exception:
+            logger.warning("Couldn't load cached GitHub response", exc_info=True)
+            return None
+        if not cached or b"etag" not in cached:
+            return None
+        return cached
+
+    def conditional_headers(self, cached, headers=None):
+        headers = dict(headers or {})
+        headers["If-None-Match"] = cached[b"etag"].decode()
+        return headers
+
+    def store(self, key, response):
+        etag = response.headers.get("ETag")
+        if response.status_code != 200 or not etag:
+            return
+        try:
+            redis.hset(
+                key,
+                mapping={
+                    "etag": etag,
+                    "url": response.url or "",
+                    "encoding": response.encoding or "",
+                    "headers": json.dumps(dict(response.headers)),
+                    "content": response.content,
+                },
+            )
+            redis.expire(key, self.timeout)
+        except Exception:
+            logger.warning("Couldn't store GitHub response in cache", exc_info=True)
+
+    def replay(self, cached, not_modified):
+        """
+        Builds a response from the cached data, updated with the rate limit
+        headers of the 304 response.
+        """
+        headers = CaseInsensitiveDict(json.loads(cached[b"headers"]))
+        for name in RATELIMIT_HEADERS:
+            if name in not_modified.headers:
+                headers[name] = not_modified.headers[name]
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = headers
+        response.url = cached[b"url"].decode()
+        response.encoding = cached[b"encoding"].decode() or None
+        response._content = cached[b"content"]
+        response.request = not_modified.request
+        return response
+
+    def record(self, hit):
+        try:
+            redis.hincrby(self.stats_key, "hits" if hit else "misses", 1)
+        except Exception:
+            logger.warning("Couldn't record GitHub cache stats", exc_info=True)
+
+    def stats(self):
+        """
+        Returns the number of cache hits and misses and the hit ratio.
+        """
+        counts = redis.hgetall(self.stats_key)
+        hits = int(counts.get(b"hits", 0))
+        misses = int(counts.get(b"misses", 0))
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "ratio": hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        redis.delete(self.stats_key)
@@ -0,0 +1,126 @@
+import logging
+import time
+
+from flask import current_app
+
+from ..db import redis
+from ..exceptions import RateLimit
+
+
+logger = logging.getLogger(__name__)
+
+
+def header_int(response, name):
+    try:
+        return int(response.headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimitBudget:
+    """
+    A token bucket stored in Redis that is shared by all processes using
+    the admin access token, so that background work (the periodic syncs
+    of the spinach worker, bulk CLI commands) can't starve interactive
+    requests (logins, releases) of the shared rate limit.
+
+    The remaining requests and the reset time are tracked from the
+    X-RateLimit-* headers of every response. Interactive requests are
+    never delayed. Background requests take a token from the bucket,
+    which is refilled at a rate that spreads the rate limit left above
+    GITHUB_RATELIMIT_RESERVE evenly until the reset. If no token is
+    available they wait for one, for at most GITHUB_RATELIMIT_MAX_WAIT
+    seconds per request.
+
+    Once only the reserve is left, background requests wait for the reset
+    if it's at most GITHUB_RATELIMIT_MAX_WAIT seconds away, and raise
+    RateLimit otherwise, so the periodic syncs give up until their next
+    run instead of eating into the reserve.
+
+    https://docs.github.com/en/rest/overview/resources-in-the-rest-api#rate-limiting
+    """
+
+    key = "github-ratelimit"
+
+    @property
+    def reserve(self):
+        return current_app.config["GITHUB_RATELIMIT_RESERVE"]
+
+    @property
+    def burst(self):
+        return current_app.config["GITHUB_RATELIMIT_BURST"]
+
+    @property
+    def max_wait(self):
+        return current_app.config["GITHUB_RATELIMIT_MAX_WAIT"]
+
+    def update(self, response):
+        """
+        Stores the rate limit state from the headers of the given response.
+        """
+        remaining = header_int(response, "X-RateLimit-Remaining")
+        reset = header_int(response, "X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            redis.hset(self.key, mapping={"remaining": remaining, "reset": reset})
+        except Exception:
+            logger.warning("Couldn't store GitHub rate limit state", exc_info=True)
+
+    def reserve_token(self, state, now):
+        """
+        Takes a token from the bucket described by the given state and
+        returns how many seconds to wait for it and the new bucket state.
+        Raises RateLimit if only the reserve is left for longer than
+        GITHUB_RATELIMIT_MAX_WAIT seconds.
+        """
+        if b"remaining" not in state or b"reset" not in state:
+            # nothing known about the rate limit yet
+            return 0, {}
+        remaining = int(state[b"remaining"])
+        reset = int(state[b"reset"])
+        window = reset - now
+        if window <= 0:
+            # the rate limit has been reset in the meantime
+            return 0, {}
+
+        available = remaining - self.reserve
+        if available <= 0:
+            # only the reserve for interactive requests is left
+            if window > self.max_wait:
+                raise RateLimit(
+                    message=(
+                        f"Only the reserve of {self.reserve} GitHub requests "
+                        f"is left for the next {window}s"
+                    )
+                )
+            return window, {}
+
+        rate = available / window
+        tokens = float(state.get(b"tokens", self.burst))
+        timestamp = float(state.get(b"timestamp", now))
+        tokens = min(self.burst, tokens + (now - timestamp) * rate) - 1
+        wait = -tokens / rate if tokens < 0 else 0
+        return wait, {"tokens": tokens, "timestamp": now}
+
+    def acquire(self, interactive=False):
+        """
+        Waits until the request may be sent and returns the seconds waited.
+        """
+        if interactive:
+            return 0
+        try:
+            with redis.lock(f"{self.key}-lock", ttl=5 * 1000):
+                wait, state = self.reserve_token(redis.hgetall(self.key), time.time())
+                if state:
+                    redis.hset(self.key, mapping=state)
+        except RateLimit:
+            raise
+        except Exception:
+            logger.warning("Couldn't check GitHub rate limit budget", exc_info=True)
+            return 0
+        wait = min(wait, self.max_wait)
+        if wait > 0:
+            logger.info(f"Delaying background GitHub request by {wait:.1f}s")
+            time.sleep(wait)
+        return wait
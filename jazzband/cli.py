@@ -3,6 +3,7 @@ import sys
 import click
 from flask.cli import with_appcontext
 
+from .account.httpcache import GitHubResponseCache
 from .db import postgres, redis
 from .members.commands import sync_email_addresses, sync_members
 from .projects.commands import (
@@ -17,6 +18,9 @@ from .projects.commands import (
     sync_projects,
     update_all_projects_members_team,
 )
+from .projects.hashing import hash_stream
+from .projects.models import Project, ProjectUpload
+from .projects.storage import upload_storage
 
 
 @click.command("db")
@@ -43,6 +47,56 @@ def check_redis():
         sys.exit(1)
 
 
+@click.command("github_cache")
+@click.option("--reset", is_flag=True, help="Reset the counters after showing them")
+@with_appcontext
+def check_github_cache(reset):
+    "Shows the hit/miss ratio of the GitHub API response cache"
+    cache = GitHubResponseCache()
+    stats = cache.stats()
+    print(
+        f"Hits: {stats['hits']}, misses: {stats['misses']}, "
+        f"hit ratio: {stats['ratio']:.1%}"
+    )
+    if reset:
+        cache.reset_stats()
+
+
+@click.command("uploads")
+@click.option("--project", "-p", default=None, help="Only check this project")
+@with_appcontext
+def check_uploads(project):
+    "Verifies the digests of the stored upload files"
+    uploads = ProjectUpload.query.order_by(ProjectUpload.id)
+    if project:
+        uploads = uploads.join(ProjectUpload.project).filter(Project.name == project)
+    checked = failed = 0
+    for upload in uploads:
+        checked += 1
+        try:
+            # read through the storage since S3 uploads have no local path
+            with upload_storage.open(upload.path) as file:
+                digests = hash_stream(file)
+        except Exception as exc:
+            print(f"{upload.path} ({upload.filename}): {exc}")
+            failed += 1
+            continue
+        mismatches = [
+            name
+            for name, digest in digests.items()
+            if getattr(upload, f"{name}_digest").lower() != digest
+        ]
+        if mismatches:
+            print(
+                f"{upload.path} ({upload.filename}): "
+                f"{', '.join(mismatches)} digest mismatch"
+            )
+            failed += 1
+    print(f"Checked {checked} uploads, {failed} failed.")
+    if failed:
+        sys.exit(1)
+
+
 def init_app(app):
     @app.cli.group()
     def sync():
@@ -58,6 +112,8 @@ def init_app(app):
 
     check.add_command(check_db)
     check.add_command(check_redis)
+    check.add_command(check_github_cache)
+    check.add_command(check_uploads)
 
     send.add_command(send_new_upload_notifications)
 
@@ -1,5 +1,6 @@
 from datetime import timedelta
 import os
+import time
 
 from decouple import Csv, config
 from markdown.extensions.toc import TocExtension
@@ -36,6 +37,20 @@ MAIL_USE_TLS = config("MAIL_USE_TLS", False, cast=bool)
 
 # how many seconds to set the expires and max_age headers
 HTTP_CACHE_TIMEOUT = config("HTTP_CACHE_TIMEOUT", 60 * 60, cast=int)
+# how many seconds to cache the pages of these blueprints for anonymous
+# visitors, on the server and the CDN
+PAGE_CACHE_TIMEOUTS = {
+    "content": config("PAGE_CACHE_TIMEOUT_CONTENT", 60 * 60, cast=int),
+    "members": config("PAGE_CACHE_TIMEOUT_MEMBERS", 60 * 10, cast=int),
+    "projects": config("PAGE_CACHE_TIMEOUT_PROJECTS", 60 * 5, cast=int),
+}
+# where to keep the node-local read store of reference data and how many
+# seconds may pass before checking if it needs to be rebuilt
+READ_STORE_PATH = config("READ_STORE_PATH", "/dev/shm/jazzband/readstore.sqlite3")
+READ_STORE_CHECK_INTERVAL = config("READ_STORE_CHECK_INTERVAL", 10, cast=int)
+# how many seconds to keep the sorted projects index at most, it's
+# invalidated by project syncs and uploads as well
+PROJECTS_INDEX_CACHE_TIMEOUT = config("PROJECTS_INDEX_CACHE_TIMEOUT", 60 * 60, cast=int)
 
 FLATPAGES_ABOUT_ROOT = "../docs/about"
 FLATPAGES_ABOUT_EXTENSION = FLATPAGES_NEWS_EXTENSION = [".md"]
@@ -66,6 +81,16 @@ GITHUB_MEMBERS_TEAM_SLUG = config("GITHUB_MEMBERS_TEAM_SLUG", "members")
 GITHUB_ROADIES_TEAM_SLUG = config("GITHUB_ROADIES_TEAM_SLUG", "roadies")
 GITHUB_ADMIN_TOKEN = config("GITHUB_ADMIN_TOKEN", "")
 GITHUB_WEBHOOKS_KEY = config("GITHUB_WEBHOOKS_KEY", "")
+# how many pages of GitHub API listings to fetch concurrently
+GITHUB_PAGE_CONCURRENCY = config("GITHUB_PAGE_CONCURRENCY", 4, cast=int)
+# how much of the admin token's rate limit to keep for interactive requests
+GITHUB_RATELIMIT_RESERVE = config("GITHUB_RATELIMIT_RESERVE", 1000, cast=int)
+# how many background requests may be sent in a burst
+GITHUB_RATELIMIT_BURST = config("GITHUB_RATELIMIT_BURST", 100, cast=int)
+# how many seconds a background request waits for the budget at most
+GITHUB_RATELIMIT_MAX_WAIT = config("GITHUB_RATELIMIT_MAX_WAIT", 60, cast=int)
+# how many seconds to keep GitHub API responses for conditional requests
+GITHUB_CACHE_TIMEOUT = config("GITHUB_CACHE_TIMEOUT", 60 * 60 * 24 * 7, cast=int)
 
 SESSION_COOKIE_NAME = "session"
 SESSION_COOKIE_HTTPONLY = True
@@ -87,6 +112,15 @@ else:
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# how many seconds may pass between full project syncs, in between only
+# the repositories updated since the last sync are fetched
+SYNC_PROJECTS_FULL_INTERVAL = config(
+    "SYNC_PROJECTS_FULL_INTERVAL", 60 * 60 * 6, cast=int
+)
+
+# how many seconds to keep the fingerprints of synced rows
+SYNC_FINGERPRINT_TIMEOUT = config("SYNC_FINGERPRINT_TIMEOUT", 60 * 60 * 6, cast=int)
+
 CSP_REPORT_URI = config("CSP_REPORT_URI", None)
 CSP_REPORT_ONLY = config("CSP_REPORT_ONLY", False, cast=bool)
 CSP_RULES = {
@@ -117,10 +151,46 @@ FEATURE_POLICY = {
 SENTRY_USER_ATTRS = ["id", "login", "is_banned", "is_member"]
 if "GIT_REV" in os.environ:
     SENTRY_CONFIG = {"release": os.environ["GIT_REV"]}
+# the deployed version of the code and templates, part of the page ETags
+# so browsers don't keep the old markup after a deploy, falls back to the
+# start time of the process without GIT_REV, e.g. during development
+APP_VERSION = config("GIT_REV", str(int(time.time())))
 
 UPLOAD_ROOT = "/app/uploads"
+# the write buffer size of files while they are uploaded
+UPLOAD_BUFFER_SIZE = 1024 * 1024  # 1M
+# the upload storage backend, "local" (in UPLOAD_ROOT) or "s3"
+UPLOAD_STORAGE = config("UPLOAD_STORAGE", "local")
+UPLOAD_S3_BUCKET = config("UPLOAD_S3_BUCKET", None)
+UPLOAD_S3_PREFIX = config("UPLOAD_S3_PREFIX", "")
+# e.g. the URL of a MinIO server, or None for AWS S3
+UPLOAD_S3_ENDPOINT_URL = config("UPLOAD_S3_ENDPOINT_URL", None)
+UPLOAD_S3_REGION = config("UPLOAD_S3_REGION", None)
+# how upload downloads are sent: "app" sends them from the app itself,
+# "accel-redirect" (nginx) and "sendfile" (Apache, lighttpd) hand them to
+# the front proxy after the permission checks
+UPLOAD_DOWNLOAD_MODE = config("UPLOAD_DOWNLOAD_MODE", "app")
+USE_X_SENDFILE = UPLOAD_DOWNLOAD_MODE == "sendfile"
+# the internal nginx location that serves the upload storage by key
+UPLOAD_ACCEL_REDIRECT_PREFIX = config("UPLOAD_ACCEL_REDIRECT_PREFIX", "/_uploads/")
 UPLOAD_ENABLED = config("UPLOAD_ENABLED", True, cast=bool)
 RELEASE_ENABLED = config("RELEASE_ENABLED", True, cast=bool)
+# the package index releases are uploaded to, using the twine settings
+PYPI_REPOSITORY_URL = config("TWINE_REPOSITORY_URL", "https://upload.pypi.org/legacy/")
+PYPI_USERNAME = config("TWINE_USERNAME", "__token__")
+PYPI_PASSWORD = config("TWINE_PASSWORD", "")
+PYPI_UPLOAD_TIMEOUT = config("PYPI_UPLOAD_TIMEOUT", 5 * 60, cast=int)
+# how often to poll PyPI for the files of a release right after uploading
+# them and how many seconds to wait before the second attempt, doubled after
+# every attempt, the release job waits up to 31 seconds with the defaults
+RELEASE_VALIDATION_ATTEMPTS = config("RELEASE_VALIDATION_ATTEMPTS", 6, cast=int)
+RELEASE_VALIDATION_DELAY = config("RELEASE_VALIDATION_DELAY", 1, cast=int)
+# how many seconds to wait before verifying released uploads against PyPI,
+# doubled after every attempt, and until when after the release to retry
+RELEASE_VERIFICATION_DELAY = config("RELEASE_VERIFICATION_DELAY", 30, cast=int)
+RELEASE_VERIFICATION_DEADLINE = config(
+    "RELEASE_VERIFICATION_DEADLINE", 60 * 60, cast=int
+)
 INTERNAL_PROJECTS = config("INTERNAL_PROJECTS", "website,help,.github", cast=Csv())
 
 MAX_CONTENT_LENGTH = 60 * 1024 * 1024  # 60M
@@ -1,14 +1,33 @@
 from functools import wraps
+import hashlib
 
-from flask import make_response, render_template, request
+from flask import current_app, make_response, render_template, request, session
 from flask_login import current_user
 
 from .utils import patch_http_cache_headers
 
 
-def templated(template=None):
+def make_etag(template_name, version):
+    """
+    Builds a strong ETag of a page from its template, the deployed app
+    version, a version stamp of its data and the current user, since
+    pages differ for logged-in users.
+    """
+    user = current_user.get_id() if current_user.is_authenticated else None
+    app_version = current_app.config["APP_VERSION"]
+    data = f"{template_name}|{app_version}|{version}|{user}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def templated(template=None, etag=None):
     """
     Taken from https://flask.palletsprojects.com/en/0.12.x/patterns/viewdecorators/
+
+    If etag is given it's called with the view arguments before the view
+    and should return a cheap version stamp of the data the page shows
+    (or None if unknown). The response then gets an ETag built from it
+    and conditional GET requests with a matching If-None-Match header
+    are answered with 304 Not Modified without running the view.
     """
 
     def decorator(f):
@@ -17,12 +36,33 @@ def templated(template=None):
             template_name = template
             if template_name is None:
                 template_name = request.endpoint.replace(".", "/") + ".html"
+
+            tag = None
+            # pending flash messages would get lost with a 304
+            if (
+                etag is not None
+                and request.method in ("GET", "HEAD")
+                and not session.get("_flashes")
+            ):
+                version = etag(*args, **kwargs)
+                if version is not None:
+                    tag = make_etag(template_name, version)
+                    if request.if_none_match.contains(tag):
+                        response = make_response("", 304)
+                        response.set_etag(tag)
+                        return response
+
             ctx = f(*args, **kwargs)
             if ctx is None:
                 ctx = {}
             elif not isinstance(ctx, dict):
                 return ctx
-            return render_template(template_name, **ctx)
+            rendered = render_template(template_name, **ctx)
+            if tag is None:
+                return rendered
+            response = make_response(rendered)
+            response.set_etag(tag)
+            return response
 
         return decorated_function
 
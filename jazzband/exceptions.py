@@ -2,12 +2,13 @@ from werkzeug.exceptions import Aborter
 
 
 class RateLimit(Exception):
-    def __init__(self, response):
+    def __init__(self, response=None, message=None):
         self.response = response
-        try:
-            message = response.json()["message"]
-        except Exception:
-            message = getattr(response, "content", response)
+        if message is None:
+            try:
+                message = response.json()["message"]
+            except Exception:
+                message = getattr(response, "content", response)
         super().__init__(message)
 
 
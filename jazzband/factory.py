@@ -5,7 +5,7 @@ from flask_session import Session
 from werkzeug.middleware.proxy_fix import ProxyFix
 from whitenoise import WhiteNoise
 
-from . import admin, cli, errors, logging  # noqa
+from . import admin, cli, errors, logging, pagecache  # noqa
 from .account.manager import login_manager
 from .cache import cache
 from .content import about_pages, news_pages
@@ -15,12 +15,15 @@ from .headers import talisman
 from .hooks import hooks
 from .members.models import User
 from .projects.models import Project
+from .projects.uploads import UploadRequest
 from .tasks import spinach
 
 
 def create_app():
     # setup flask
     app = Flask("jazzband")
+    # stream uploaded files directly into the upload storage
+    app.request_class = UploadRequest
     # load decoupled config variables
     app.config.from_object("jazzband.config")
 
@@ -87,4 +90,6 @@ def create_app():
 
     blueprints.init_app(app)
 
+    pagecache.init_app(app)
+
     return app
@@ -9,7 +9,9 @@ import werkzeug.security
 from .db import redis
 from .hookserver import Hooks
 from .members.models import User
+from .pagecache import invalidate_pages
 from .projects.tasks import update_project_by_hook
+from .readstore import invalidate_read_store
 from .tasks import spinach
 
 
@@ -59,11 +61,15 @@ def membership(data, guid):
     if data["action"] == "added":
         member.is_member = True
         member.save()
+        invalidate_pages("members", "projects")
+        invalidate_read_store()
         return "User {member} is a member now."
     elif data["action"] == "removed":
         member.left_at = datetime.utcnow()
         member.is_member = False
         member.save()
+        invalidate_pages("members", "projects")
+        invalidate_read_store()
         return "User {member} is not a member anymore."
     else:
         return "Thanks."
@@ -1,6 +1,8 @@
 from datetime import datetime
 
 from flask_login import UserMixin
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.sql import expression
 from sqlalchemy_utils import generic_repr
 
@@ -80,6 +82,41 @@ class User(db.Model, Syncable, UserMixin):
     def roadies(cls):
         return cls.query.filter(cls.is_roadie.is_(True))
 
+    @classmethod
+    def mark_former_members(cls, member_ids):
+        """
+        Marks every member whose id isn't in the given ids as former member
+        with a single UPDATE and returns the ids of the changed users.
+
+        The ids are passed as one array parameter and compared on the
+        server, so no users need to be loaded.
+        """
+        member_ids = bindparam("member_ids", list(member_ids), type_=ARRAY(db.Integer))
+        former_ids = (
+            db.session.execute(
+                cls.__table__.update()
+                .where(cls.is_member.is_(True), ~(cls.id == any_(member_ids)))
+                .values(is_member=False, synced_at=datetime.utcnow())
+                .returning(cls.id)
+            )
+            .scalars()
+            .all()
+        )
+        # the fingerprints of the changed rows don't match anymore
+        cls.forget_fingerprints([str(user_id) for user_id in former_ids])
+        return former_ids
+
+    @classmethod
+    def version_stamp(cls, query):
+        """
+        Returns a stamp of the users matching the given query that changes
+        whenever one of them changes, joins or leaves.
+        """
+        count, synced_at = query.with_entities(
+            db.func.count(cls.id), db.func.max(cls.synced_at)
+        ).one()
+        return f"{count}|{synced_at}"
+
     @classmethod
     def active_members(cls):
         return cls.query.filter(
@@ -6,6 +6,8 @@ from spinach import Tasks
 from ..account import github
 from ..config import ONE_MINUTE
 from ..db import postgres, redis
+from ..pagecache import invalidate_pages
+from ..readstore import invalidate_read_store
 from .models import EmailAddress, User
 
 
@@ -19,16 +21,14 @@ def sync_members():
     # use a lock to make sure we don't run this multiple times
     with redis.lock("sync_members", ttl=ONE_MINUTE * 14):
         members_data = github.get_members()
-        User.sync(members_data)
-
-        stored_ids = {user.id for user in User.query.all()}
-        fetched_ids = {m["id"] for m in members_data}
-        stale_ids = stored_ids - fetched_ids
-        if stale_ids:
-            User.query.filter(User.id.in_(stale_ids)).update(
-                {"is_member": False}, "fetch"
-            )
-            postgres.session.commit()
+        User.upsert(members_data)
+
+        former_ids = User.mark_former_members(m["id"] for m in members_data)
+        postgres.session.commit()
+        invalidate_pages("members", "projects")
+        invalidate_read_store()
+        if former_ids:
+            logger.info(f"Marked {len(former_ids)} users as former members")
 
 
 @tasks.task(name="sync_email_addresses", max_retries=5)
@@ -2,22 +2,37 @@ from flask import Blueprint, redirect
 from sqlalchemy.sql.expression import func
 
 from ..decorators import templated
+from ..readstore import read_store
 from .models import User
 
 
 members = Blueprint("members", __name__)
 
 
+def members_version_stamp():
+    return read_store.version() or User.version_stamp(User.active_members())
+
+
+def roadies_version_stamp():
+    return read_store.version() or User.version_stamp(User.roadies())
+
+
 @members.route("/members")
-@templated()
+@templated(etag=members_version_stamp)
 def index():
-    return {"members": User.active_members().order_by(func.random())}
+    members = read_store.members()
+    if members is None:
+        members = User.active_members().order_by(func.random()).all()
+    return {"members": members}
 
 
 @members.route("/roadies")
-@templated()
+@templated(etag=roadies_version_stamp)
 def roadies():
-    return {"roadies": User.roadies().order_by(User.login)}
+    roadies = read_store.roadies()
+    if roadies is None:
+        roadies = User.roadies().order_by(User.login).all()
+    return {"roadies": roadies}
 
 
 @members.route("/roadies/issue")
@@ -1,14 +1,109 @@
 from datetime import datetime
+import hashlib
+import json
+import logging
 
-from .db import postgres
+from flask import current_app
+from sqlalchemy import inspect, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .db import postgres, redis
 from .utils import sub_dict
 
 
+logger = logging.getLogger(__name__)
+
+# how many rows to send with a single upsert statement
+UPSERT_BATCH_SIZE = 500
+
+# the session info key of the fingerprints of upserted rows by model,
+# until the session commits them
+PENDING_FINGERPRINTS = "pending_sync_fingerprints"
+
+
+def fingerprint(row):
+    """
+    Returns a hash of the synced values of a row.
+    """
+    data = json.dumps(row, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
 class Syncable:
     synced_at = postgres.Column(
         postgres.DateTime, default=datetime.utcnow, nullable=False
     )
 
+    #: the columns identifying a row of synced data
+    sync_key = ["id"]
+
+    @classmethod
+    def fingerprints_key(cls):
+        return f"sync-fingerprints:{cls.__tablename__}"
+
+    @classmethod
+    def fingerprint_field(cls, values, key=None):
+        return "|".join(str(values[name]) for name in key or cls.sync_key)
+
+    @classmethod
+    def load_fingerprints(cls, fields):
+        """
+        Loads the fingerprints of the rows last written by upsert.
+        """
+        if not fields:
+            return []
+        try:
+            return [
+                fingerprint.decode() if fingerprint else None
+                for fingerprint in redis.hmget(cls.fingerprints_key(), fields)
+            ]
+        except Exception:
+            logger.warning("Couldn't load sync fingerprints", exc_info=True)
+            return [None] * len(fields)
+
+    @classmethod
+    def store_fingerprints(cls, fingerprints):
+        if not fingerprints:
+            return
+        name = cls.fingerprints_key()
+        try:
+            redis.hset(name, mapping=fingerprints)
+            # let all fingerprints expire every now and then to write
+            # every row once in a while in any case
+            if redis.ttl(name) < 0:
+                redis.expire(name, current_app.config["SYNC_FINGERPRINT_TIMEOUT"])
+        except Exception:
+            logger.warning("Couldn't store sync fingerprints", exc_info=True)
+
+    @classmethod
+    def forget_fingerprints(cls, fields):
+        """
+        Forgets the fingerprints of rows that were changed outside of
+        upsert, so they are written again by the next upsert.
+        """
+        if not fields:
+            return
+        try:
+            redis.hdel(cls.fingerprints_key(), *fields)
+        except Exception:
+            logger.warning("Couldn't forget sync fingerprints", exc_info=True)
+
+    @classmethod
+    def record_sync_stats(cls, touched, skipped):
+        logger.info(f"Synced {cls.__tablename__}: {touched} touched, {skipped} skipped")
+        try:
+            redis.hset(
+                f"sync-stats:{cls.__tablename__}",
+                mapping={
+                    "touched": touched,
+                    "skipped": skipped,
+                    "synced_at": datetime.utcnow().isoformat(),
+                },
+            )
+        except Exception:
+            logger.warning("Couldn't store sync stats", exc_info=True)
+
     @classmethod
     def sync(cls, data, key="id"):
         fields = [column.name for column in cls.__table__.columns]
@@ -24,9 +119,176 @@ class Syncable:
         postgres.session.commit()
         return results
 
+    @classmethod
+    def upsert(cls, data, key=None, commit=True):
+        """
+        Bulk version of sync that inserts or updates the given items with
+        PostgreSQL's INSERT ... ON CONFLICT (key) DO UPDATE, one statement
+        per batch of UPSERT_BATCH_SIZE items. Existing rows are only
+        updated if any of the synced values differ.
+
+        Items whose fingerprint matches the one stored in Redis by the
+        last committed upsert are skipped before even reaching the
+        database. With commit=False the fingerprints are stored when the
+        caller commits the session and dropped if it rolls back.
+
+        The key columns need to have a primary key or unique constraint.
+        Returns a tuple of the inserted and the updated rows. The
+        after_insert listeners of the model are called for every inserted
+        row, since they aren't triggered by Core statements otherwise.
+        """
+        if key is None:
+            key = cls.sync_key
+        elif not isinstance(key, list):
+            key = [key]
+        table = cls.__table__
+        fields = [column.name for column in table.columns]
+        # Postgres can't update the same row twice in one statement, so
+        # the last item of every key wins
+        rows = list(
+            {
+                cls.fingerprint_field(row, key): row
+                for row in (sub_dict(item, fields) for item in data)
+            }.values()
+        )
+
+        # skip the rows that haven't changed since the last upsert
+        fingerprints = {
+            cls.fingerprint_field(row, key): fingerprint(row) for row in rows
+        }
+        stored_fingerprints = dict(
+            zip(fingerprints, cls.load_fingerprints(list(fingerprints)), strict=True)
+        )
+        rows = [
+            row
+            for row in rows
+            if fingerprints[cls.fingerprint_field(row, key)]
+            != stored_fingerprints[cls.fingerprint_field(row, key)]
+        ]
+        if not rows:
+            cls.record_sync_stats(touched=0, skipped=len(fingerprints))
+            return [], []
+        new_fingerprints = {
+            field: fingerprint
+            for field, fingerprint in fingerprints.items()
+            if fingerprint != stored_fingerprints[field]
+        }
+
+        synced_at = datetime.utcnow()
+        # columns that some items lack get their default value on insert,
+        # but only columns all items have are updated
+        insert_columns = set().union(*rows)
+        update_columns = set.intersection(*(set(row) for row in rows)) - set(key)
+        for row in rows:
+            for name in insert_columns - set(row):
+                row[name] = column_default(table.c[name])
+            row["synced_at"] = synced_at
+
+        inserted = []
+        updated = []
+        connection = postgres.session.connection()
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            statement = insert(table).values(rows[start : start + UPSERT_BATCH_SIZE])
+            changed = [
+                table.c[name].is_distinct_from(statement.excluded[name])
+                for name in sorted(update_columns)
+            ]
+            if changed:
+                statement = statement.on_conflict_do_update(
+                    index_elements=key,
+                    set_={
+                        name: statement.excluded[name]
+                        for name in sorted(update_columns) + ["synced_at"]
+                    },
+                    where=or_(*changed),
+                )
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=key)
+            # xmax is 0 for rows that were inserted by the statement
+            statement = statement.returning(
+                *table.columns, literal_column("xmax = 0").label("inserted")
+            )
+            for row in connection.execute(statement).mappings():
+                values = {name: row[name] for name in fields}
+                if row["inserted"]:
+                    inserted.append(values)
+                else:
+                    updated.append(values)
+
+        mapper = cls.__mapper__
+        for values in inserted:
+            target = cls(**values)
+            mapper.dispatch.after_insert(mapper, connection, postgres.inspect(target))
+        cls.after_upsert(inserted, updated)
+
+        # the fingerprints are only stored once the rows are committed
+        pending = postgres.session.info.setdefault(PENDING_FINGERPRINTS, {})
+        pending.setdefault(cls, {}).update(new_fingerprints)
+        if commit:
+            postgres.session.commit()
+        touched = len(inserted) + len(updated)
+        cls.record_sync_stats(touched=touched, skipped=len(fingerprints) - touched)
+        return inserted, updated
+
+    @classmethod
+    def after_upsert(cls, inserted, updated):
+        """
+        Called after upsert with the inserted and updated rows, e.g. to
+        update denormalized data that ORM events would maintain otherwise.
+        """
+
+
+def column_default(column):
+    default = column.default
+    if default is None:
+        return None
+    if default.is_callable:
+        return default.arg(None)
+    if default.is_scalar:
+        return default.arg
+    return None
+
+
+def has_changes(target):
+    state = inspect(target, raiseerr=False)
+    if state is None:
+        return True
+    return any(attr.history.has_changes() for attr in state.attrs)
+
 
 @postgres.event.listens_for(Syncable, "before_update", propagate=True)
 def timestamp_before_update(mapper, connection, target):
     # When a model with a timestamp is updated; force update the updated
-    # timestamp.
-    target.synced_at = datetime.utcnow()
+    # timestamp, but only if any value actually changed.
+    if has_changes(target):
+        target.synced_at = datetime.utcnow()
+
+
+@postgres.event.listens_for(Syncable, "after_update", propagate=True)
+def forget_fingerprint_after_update(mapper, connection, target):
+    # When a synced row is changed via the ORM the stored fingerprint
+    # doesn't match it anymore.
+    if has_changes(target):
+        forget_fingerprint(target)
+
+
+@postgres.event.listens_for(Syncable, "after_delete", propagate=True)
+def forget_fingerprint_after_delete(mapper, connection, target):
+    forget_fingerprint(target)
+
+
+def forget_fingerprint(target):
+    values = {name: getattr(target, name) for name in target.sync_key}
+    target.forget_fingerprints([target.fingerprint_field(values)])
+
+
+@postgres.event.listens_for(Session, "after_commit")
+def store_pending_fingerprints(session):
+    for model, fingerprints in session.info.pop(PENDING_FINGERPRINTS, {}).items():
+        model.store_fingerprints(fingerprints)
+
+
+@postgres.event.listens_for(Session, "after_rollback")
+def discard_pending_fingerprints(session):
+    # the rows weren't written after all
+    session.info.pop(PENDING_FINGERPRINTS, None)
@@ -0,0 +1,123 @@
+import hashlib
+import logging
+
+from flask import current_app, make_response, request, session
+
+from .cache import cache
+from .utils import patch_http_cache_headers
+
+
+logger = logging.getLogger(__name__)
+
+# the response headers stored with the page body
+CACHED_HEADERS = ("Content-Type", "Content-Language", "Location", "ETag")
+
+
+def page_cache_timeout():
+    """
+    Returns the cache timeout of the current request's blueprint, or None
+    if its pages aren't cached.
+    """
+    return current_app.config["PAGE_CACHE_TIMEOUTS"].get(request.blueprint)
+
+
+def is_anonymous_request():
+    """
+    Whether the current request carries neither a session nor a remember
+    cookie, so the response can't depend on the visitor.
+    """
+    cookie_names = (
+        current_app.config["SESSION_COOKIE_NAME"],
+        current_app.config.get("REMEMBER_COOKIE_NAME", "remember_token"),
+    )
+    return not any(name in request.cookies for name in cookie_names)
+
+
+def is_cacheable_request():
+    return (
+        request.method in ("GET", "HEAD")
+        and page_cache_timeout()
+        and is_anonymous_request()
+    )
+
+
+def page_version_key(blueprint):
+    return f"page-version:{blueprint}"
+
+
+def page_key():
+    """
+    Builds the cache key of the current page from its blueprint's version
+    and its full path, so invalidating a blueprint only needs to bump
+    the version.
+    """
+    version = cache.get(page_version_key(request.blueprint)) or 0
+    digest = hashlib.sha256(request.full_path.encode()).hexdigest()
+    return f"page:{request.blueprint}:{version}:{digest}"
+
+
+def serve_cached_page():
+    if not is_cacheable_request():
+        return None
+    try:
+        cached = cache.get(page_key())
+    except Exception:
+        logger.warning("Couldn't load cached page", exc_info=True)
+        return None
+    if cached is None:
+        return None
+    status, headers, body = cached
+    response = make_response(body, status, headers)
+    response.headers["X-Page-Cache"] = "HIT"
+    return response.make_conditional(request)
+
+
+def store_page(response):
+    if not is_cacheable_request():
+        return response
+    # only cache complete pages that don't change the session
+    if (
+        response.status_code not in (200, 301)
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Set-Cookie" in response.headers
+        or session.modified
+    ):
+        return response
+    timeout = page_cache_timeout()
+    if "X-Page-Cache" not in response.headers:
+        headers = {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if name in response.headers
+        }
+        try:
+            cache.set(
+                page_key(),
+                (response.status_code, headers, response.get_data()),
+                timeout=timeout,
+            )
+            response.headers["X-Page-Cache"] = "MISS"
+        except Exception:
+            logger.warning("Couldn't cache page", exc_info=True)
+    # allow the CDN to cache the page for anonymous visitors as well
+    return patch_http_cache_headers(response, timeout)
+
+
+def invalidate_pages(*blueprints):
+    """
+    Drops the cached pages of the given blueprints, e.g. after a sync.
+    """
+    for blueprint in blueprints:
+        try:
+            cache.inc(page_version_key(blueprint))
+        except Exception:
+            logger.warning("Couldn't invalidate cached pages", exc_info=True)
+
+
+def init_app(app):
+    # Registered last so the page is stored before other after request
+    # handlers (security headers, compression) run; they are then applied
+    # to cached pages the same way as to freshly rendered ones.
+    app.before_request(serve_cached_page)
+    app.after_request(store_page)
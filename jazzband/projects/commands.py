@@ -14,11 +14,12 @@ click_log.basic_config(logger)
 
 
 @click.command("projects")
+@click.option("--full", is_flag=True, help="Sync all projects, not only updated")
 @click_log.simple_verbosity_option(logger)
 @with_appcontext
-def sync_projects():
+def sync_projects(full):
     "Syncs projects"
-    tasks.sync_projects()
+    tasks.sync_projects(full=full)
 
 
 @click.command("project_members")
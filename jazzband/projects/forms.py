@@ -107,7 +107,9 @@ class UploadForm(FlaskForm):
     )
 
     def validate_content(form, field):
-        if field.data and ("/" in field.data or "\\" in field.data):
+        # check the name only, without reading through the uploaded file
+        filename = field.data.filename if field.data else None
+        if filename and ("/" in filename or "\\" in filename):
             raise ValidationError("Cannot upload a file with '/' or '\\' in the name.")
 
 
@@ -0,0 +1,124 @@
+from functools import partial
+import hashlib
+import queue
+import threading
+
+
+# the digests stored for every upload, by the names of the upload form fields
+ALGORITHMS = {
+    "md5": hashlib.md5,
+    "sha256": hashlib.sha256,
+    "blake2_256": partial(hashlib.blake2b, digest_size=256 // 8),
+}
+
+# chunks smaller than this are hashed on the calling thread since handing
+# them to the worker threads costs more than it saves
+PARALLEL_MIN_SIZE = 256 * 1024
+
+CHUNK_SIZE = 1024 * 1024  # 1M
+
+
+class MultiDigest:
+    """
+    Computes the upload digests at once, each on its own worker thread.
+
+    hashlib releases the GIL while hashing large buffers, so the digests of
+    a chunk are computed on separate cores. The chunk is shared with the
+    workers as a memoryview without copying it, and update() waits until
+    all of them are done with it, so the caller can reuse its buffer.
+
+    The worker threads are started with the first large chunk and stopped
+    by hexdigests() or close().
+    """
+
+    def __init__(self, min_parallel_size=PARALLEL_MIN_SIZE):
+        self.hashers = {name: new() for name, new in ALGORITHMS.items()}
+        self.min_parallel_size = min_parallel_size
+        self.queues = {}
+        self.threads = []
+        self.errors = []
+
+    def start(self):
+        for name, hasher in self.hashers.items():
+            chunks = queue.Queue(maxsize=1)
+            thread = threading.Thread(
+                target=self.work,
+                args=(hasher, chunks),
+                name=f"digest-{name}",
+                daemon=True,
+            )
+            thread.start()
+            self.queues[name] = chunks
+            self.threads.append(thread)
+
+    def work(self, hasher, chunks):
+        while True:
+            chunk = chunks.get()
+            try:
+                if chunk is None:
+                    return
+                hasher.update(chunk)
+            except Exception as exc:
+                self.errors.append(exc)
+            finally:
+                chunks.task_done()
+
+    def update(self, data):
+        chunk = memoryview(data)
+        if len(chunk) < self.min_parallel_size:
+            for hasher in self.hashers.values():
+                hasher.update(chunk)
+            return
+        if not self.threads:
+            self.start()
+        for chunks in self.queues.values():
+            chunks.put(chunk)
+        for chunks in self.queues.values():
+            chunks.join()
+        if self.errors:
+            raise self.errors[0]
+
+    def close(self):
+        for chunks in self.queues.values():
+            chunks.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.queues = {}
+        self.threads = []
+
+    def hexdigests(self):
+        self.close()
+        return {
+            name: hasher.hexdigest().lower() for name, hasher in self.hashers.items()
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """
+    Returns the upload digests of the file with the given path.
+    """
+    with open(path, "rb", buffering=0) as file:
+        return hash_stream(file, chunk_size)
+
+
+def hash_stream(file, chunk_size=CHUNK_SIZE):
+    """
+    Returns the upload digests of the given binary file object, e.g. one
+    opened from the upload storage.
+    """
+    with MultiDigest() as digest:
+        if hasattr(file, "readinto"):
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            while size := file.readinto(buffer):
+                digest.update(view[:size])
+        else:
+            while chunk := file.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigests()
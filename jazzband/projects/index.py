@@ -0,0 +1,115 @@
+import logging
+import random
+
+from flask import current_app
+from sqlalchemy import desc, nullsfirst, nullslast
+
+from ..cache import cache
+from ..db import postgres as db
+from ..readstore import read_store
+from .models import Project
+
+
+logger = logging.getLogger(__name__)
+
+SORTERS = {
+    "uploads": Project.uploads_count,
+    "members": Project.membership_count,
+    "watchers": Project.subscribers_count,
+    "stargazers": Project.stargazers_count,
+    "forks": Project.forks_count,
+    "issues": Project.open_issues_count,
+    "name": Project.name,
+    "random": None,
+}
+DEFAULT_ORDER = "desc"
+# the columns shown on the projects index
+INDEX_COLUMNS = (
+    "name",
+    "description",
+    "membership_count",
+    "uploads_count",
+    "subscribers_count",
+    "stargazers_count",
+    "forks_count",
+    "open_issues_count",
+)
+
+
+def index_cache_key(sorter, order):
+    return f"projects-index:{sorter}:{order}"
+
+
+def load_index_projects(sorter, order):
+    """
+    Loads the active projects sorted by the given sorter and order.
+    """
+    criterion = SORTERS[sorter]
+    if order == DEFAULT_ORDER:
+        criterion = nullslast(desc(criterion))
+    else:
+        criterion = nullsfirst(criterion)
+    columns = [Project.__table__.c[name] for name in INDEX_COLUMNS]
+    return [
+        dict(row)
+        for row in db.session.execute(
+            db.select(*columns).where(Project.is_active.is_(True)).order_by(criterion)
+        ).mappings()
+    ]
+
+
+def get_index_projects(sorter, order):
+    """
+    Returns the active projects for the projects index as plain dicts.
+
+    The sorted lists are read from the node-local read store or, if it's
+    unavailable, cached in Redis until the next project sync or upload
+    invalidates them. The random order is shuffled in-process from the
+    list sorted by name.
+    """
+    if sorter == "random":
+        projects = list(get_index_projects("name", "asc"))
+        random.shuffle(projects)
+        return projects
+
+    order = DEFAULT_ORDER if order == DEFAULT_ORDER else "asc"
+    # the node-local read store spares even the Redis round trip
+    projects = read_store.projects(
+        SORTERS[sorter].key, descending=order == DEFAULT_ORDER
+    )
+    if projects is not None:
+        return projects
+
+    key = index_cache_key(sorter, order)
+    try:
+        projects = cache.get(key)
+    except Exception:
+        logger.warning("Couldn't load cached projects index", exc_info=True)
+        projects = None
+    if projects is None:
+        projects = load_index_projects(sorter, order)
+        try:
+            cache.set(
+                key,
+                projects,
+                timeout=current_app.config["PROJECTS_INDEX_CACHE_TIMEOUT"],
+            )
+        except Exception:
+            logger.warning("Couldn't cache projects index", exc_info=True)
+    return projects
+
+
+def invalidate_index():
+    """
+    Drops the cached projects index, e.g. after a sync or an upload.
+    """
+    keys = [
+        index_cache_key(sorter, order)
+        for sorter in SORTERS
+        if sorter != "random"
+        for order in ("asc", DEFAULT_ORDER)
+    ]
+    try:
+        cache.delete_many(*keys)
+    except Exception:
+        logger.warning("Couldn't invalidate projects index", exc_info=True)
@@ -1,20 +1,23 @@
-from datetime import datetime
-import os
-import time
+from datetime import datetime, timedelta
+import logging
 from uuid import uuid4
 
-from flask import current_app, render_template
+from flask import current_app, g, has_app_context, render_template
 from flask_login import current_user
-from sqlalchemy import func, orm
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from packaging.version import parse as parse_version
+from sqlalchemy import any_, bindparam, func, orm, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy_utils import aggregated, generic_repr
-from werkzeug.security import safe_join
 
 from ..account import github
 from ..auth import current_user_is_roadie
 from ..db import postgres as db
 from ..members.models import User
 from ..mixins import Syncable
+from .storage import upload_storage
+
+
+logger = logging.getLogger(__name__)
 
 
 @generic_repr("id", "name")
@@ -85,9 +88,7 @@ class Project(db.Model, Syncable):
         elif current_user_is_roadie():
             return True
         else:
-            return current_user.id in [
-                user.id for user in self.lead_members.options(orm.load_only(User.id))
-            ]
+            return self.membership_status(current_user)[1]
 
     @property
     def all_members(self):
@@ -105,20 +106,62 @@ class Project(db.Model, Syncable):
     def lead_members(self):
         return self.all_members.filter(ProjectMembership.is_lead.is_(True))
 
+    @classmethod
+    def update_membership_counts(cls, project_ids):
+        """
+        Recalculates the aggregated membership counts of the projects with
+        the given ids after memberships were changed without the ORM.
+        """
+        if not project_ids:
+            return
+        db.session.execute(
+            cls.__table__.update()
+            .where(cls.id.in_(project_ids))
+            .values(
+                membership_count=db.select(func.count(ProjectMembership.id))
+                .where(ProjectMembership.project_id == cls.id)
+                .scalar_subquery()
+            )
+        )
+
     def user_is_member(self, user):
-        return user.id in [
-            member.id for member in self.all_members.options(orm.load_only(User.id))
-        ]
+        return self.membership_status(user)[0]
 
-    @property
-    def pypi_json_url(self):
+    def membership_status(self, user):
         """
-        The URL to fetch JSON data from PyPI, using a timestamp to work-around
-        the PyPI CDN cache.
+        Returns whether the given user is an active member and whether they
+        are a lead of the project.
+
+        Both are checked with a single EXISTS query and cached for the
+        current request, keyed by user and project id.
         """
-        return (
-            f"https://pypi.org/pypi/{self.normalized_name}/json?time={int(time.time())}"
-        )
+        cache = g.setdefault("project_memberships", {}) if has_app_context() else {}
+        key = (user.id, self.id)
+        if key not in cache:
+            membership = (
+                User.active_members()
+                .join(User.projects_memberships)
+                .filter(
+                    User.id == user.id,
+                    ProjectMembership.project_id == self.id,
+                )
+            )
+            cache[key] = tuple(
+                db.session.execute(
+                    db.select(
+                        membership.exists(),
+                        membership.filter(ProjectMembership.is_lead.is_(True)).exists(),
+                    )
+                ).one()
+            )
+        return cache[key]
+
+    def pypi_version_json_url(self, version):
+        """
+        The URL to fetch JSON data of the given version from PyPI, which
+        only lists the files of that version.
+        """
+        return f"https://pypi.org/pypi/{self.normalized_name}/{version}/json"
 
     def create_transfer_issue(self, assignees, **data):
         issue_response = github.new_project_issue(
@@ -157,6 +200,117 @@ class Project(db.Model, Syncable):
         return None
 
 
+class ProjectDetail:
+    """
+    Everything the project detail page shows, loaded with a constant
+    number of queries regardless of the number of uploads, versions and
+    members of the project.
+    """
+
+    def __init__(self, project):
+        self.project = project
+
+        self.uploads = project.uploads.order_by(
+            ProjectUpload.ordering.desc(), ProjectUpload.version.desc()
+        ).all()
+
+        # the total and unreleased number of uploads per version
+        self.version_counts = {}
+        if self.uploads:
+            unreleased = ProjectUpload.released_at.is_(None)
+            self.version_counts = {
+                version: (total, unreleased_count)
+                for version, total, unreleased_count in db.session.execute(
+                    db.select(
+                        ProjectUpload.version,
+                        func.count(ProjectUpload.id),
+                        func.count(ProjectUpload.id).filter(unreleased),
+                    )
+                    .where(ProjectUpload.project_id == project.id)
+                    .group_by(ProjectUpload.version)
+                )
+            }
+        self.versions = sorted(self.version_counts, key=parse_version, reverse=True)
+        self.upload_count = sum(total for total, _ in self.version_counts.values())
+        self.unreleased_count = sum(
+            unreleased_count for _, unreleased_count in self.version_counts.values()
+        )
+
+        # all active members together with their lead flag
+        members = project.all_members.add_columns(ProjectMembership.is_lead).all()
+        self.lead_members = [user for user, is_lead in members if is_lead]
+        self.nonlead_members = [user for user, is_lead in members if not is_lead]
+        self.member_ids = {user.id for user, _ in members}
+        self.lead_ids = {user.id for user in self.lead_members}
+        if current_user and current_user.is_authenticated:
+            # spare Project.membership_status the query for the current user
+            g.setdefault("project_memberships", {})[(current_user.id, project.id)] = (
+                current_user.id in self.member_ids,
+                current_user.id in self.lead_ids,
+            )
+
+    @classmethod
+    def version_stamp(cls, projects):
+        """
+        Returns a stamp of the data shown on the detail page of the project
+        matched by the given query, which changes whenever the project, its
+        uploads, their verification against PyPI or its members change.
+        Loaded with a single query, returns None if there is no such project.
+        """
+        uploads = ProjectUpload.project_id == Project.id
+        verification_status = ProjectUpload.verification_status
+        memberships = ProjectMembership.project_id == Project.id
+        members = db.select(func.max(User.synced_at)).join(
+            ProjectMembership, ProjectMembership.user_id == User.id
+        )
+        row = projects.with_entities(
+            Project.id,
+            Project.synced_at,
+            *[
+                db.select(column).where(uploads).scalar_subquery()
+                for column in (
+                    func.count(ProjectUpload.id),
+                    func.max(ProjectUpload.uploaded_at),
+                    func.max(ProjectUpload.released_at),
+                    func.max(ProjectUpload.ordering),
+                    func.max(ProjectUpload.verification_checked_at),
+                    func.count(ProjectUpload.id).filter(
+                        verification_status == ProjectUpload.VERIFIED
+                    ),
+                    func.count(ProjectUpload.id).filter(
+                        verification_status == ProjectUpload.VERIFICATION_MISMATCH
+                    ),
+                    func.count(ProjectUpload.id).filter(
+                        verification_status == ProjectUpload.VERIFICATION_EXPIRED
+                    ),
+                )
+            ],
+            *[
+                db.select(column).where(memberships).scalar_subquery()
+                for column in (
+                    func.count(ProjectMembership.id),
+                    func.max(ProjectMembership.synced_at),
+                )
+            ],
+            members.where(memberships).scalar_subquery(),
+        ).first()
+        if row is None:
+            return None
+        return "|".join(str(value) for value in row)
+
+    @property
+    def current_user_is_member(self):
+        if not current_user or not current_user.is_authenticated:
+            return False
+        return current_user_is_roadie() or current_user.id in self.member_ids
+
+    @property
+    def current_user_is_lead(self):
+        if not current_user or not current_user.is_authenticated:
+            return False
+        return current_user_is_roadie() or current_user.id in self.lead_ids
+
+
 @generic_repr("id", "project_id", "is_active", "key")
 class ProjectCredential(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -180,13 +334,78 @@ class ProjectMembership(db.Model, Syncable):
     is_lead = db.Column(db.Boolean, default=False, nullable=False, index=True)
 
     __tablename__ = "project_memberships"
+    __table_args__ = (db.UniqueConstraint("user_id", "project_id"),)
+
+    sync_key = ["user_id", "project_id"]
 
     def __str__(self):
         return f"User: {self.user}, Project: {self.project}"
 
+    @classmethod
+    def after_upsert(cls, inserted, updated):
+        Project.update_membership_counts({row["project_id"] for row in inserted})
+
+    @classmethod
+    def delete_missing(cls, project_ids, memberships):
+        """
+        Deletes the memberships of the projects with the given ids that
+        aren't in the given memberships with a single DELETE and returns
+        the deleted rows.
+
+        This bypasses the after_delete listener on purpose, since the
+        memberships were already removed from the GitHub teams.
+        """
+        if not project_ids:
+            return []
+        table = cls.__table__
+        fetched = db.select(
+            func.unnest(
+                bindparam(
+                    "user_ids",
+                    [membership["user_id"] for membership in memberships],
+                    type_=ARRAY(db.Integer),
+                )
+            ),
+            func.unnest(
+                bindparam(
+                    "project_ids",
+                    [membership["project_id"] for membership in memberships],
+                    type_=ARRAY(db.Integer),
+                )
+            ),
+        )
+        deleted = (
+            db.session.execute(
+                table.delete()
+                .where(
+                    table.c.project_id
+                    == any_(
+                        bindparam(
+                            "synced_project_ids",
+                            list(project_ids),
+                            type_=ARRAY(db.Integer),
+                        )
+                    ),
+                    tuple_(table.c.user_id, table.c.project_id).not_in(fetched),
+                )
+                .returning(table.c.id, table.c.user_id, table.c.project_id)
+            )
+            .mappings()
+            .all()
+        )
+        Project.update_membership_counts({row["project_id"] for row in deleted})
+        cls.forget_fingerprints([cls.fingerprint_field(row) for row in deleted])
+        return deleted
+
 
 @generic_repr("id", "project_id", "filename")
 class ProjectUpload(db.Model):
+    # the states of verifying released uploads against PyPI
+    VERIFICATION_PENDING = "pending"
+    VERIFIED = "verified"
+    VERIFICATION_MISMATCH = "mismatch"
+    VERIFICATION_EXPIRED = "expired"
+
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey("projects.id"))
     version = db.Column(db.Text, index=True)
@@ -201,6 +420,9 @@ class ProjectUpload(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     released_at = db.Column(db.DateTime, nullable=True)
     notified_at = db.Column(db.DateTime, nullable=True, index=True)
+    verification_status = db.Column(db.Text, nullable=True, index=True)
+    verification_checked_at = db.Column(db.DateTime, nullable=True)
+    verified_at = db.Column(db.DateTime, nullable=True)
     form_data = db.Column(JSONB)
     user_agent = db.Column(db.Text)
     remote_addr = db.Column(db.Text)
@@ -213,15 +435,27 @@ class ProjectUpload(db.Model):
         db.Index("project_uploads_project_version", "project_id", "version"),
     )
 
+    @property
+    def signature_key(self):
+        # uploads with the same content share the stored file, but not
+        # their signatures, e.g. 2c/of/2coffee12345678123123123123123123.42.asc
+        return f"{self.path}.{self.id}.asc"
+
+    @property
+    def legacy_signature_key(self):
+        # the content-addressed key signatures were stored under before
+        return self.path + ".asc"
+
     @property
     def full_path(self):
-        # build storage path, e.g.
-        # /app/uploads/acme/2coffee12345678123123123123123123
-        return safe_join(current_app.config["UPLOAD_ROOT"], self.path)
+        # the local storage path, e.g.
+        # /app/uploads/2c/of/2coffee12345678123123123123123123
+        # or None if the uploads aren't stored locally
+        return upload_storage.local_path(self.path)
 
     @property
     def signature_path(self):
-        return self.full_path + ".asc"
+        return upload_storage.local_path(self.signature_key)
 
     def __str__(self):
         return self.filename
@@ -229,8 +463,169 @@ class ProjectUpload(db.Model):
 
 @db.event.listens_for(ProjectUpload, "after_delete")
 def delete_upload_file(mapper, connection, target):
-    # When a model with a timestamp is updated; force update the updated
-    # timestamp.
-    os.remove(target.full_path)
-    if os.path.exists(target.signature_path):
-        os.remove(target.signature_path)
+    upload_storage.delete(target.signature_key)
+    # only delete the stored file with the last upload of the same content
+    shared = connection.execute(
+        db.select(ProjectUpload.id)
+        .where(ProjectUpload.path == target.path, ProjectUpload.id != target.id)
+        .limit(1)
+    ).first()
+    if shared is None:
+        upload_storage.delete(target.path)
+        upload_storage.delete(target.legacy_signature_key)
+
+
+@generic_repr("id", "project_id", "version", "status")
+class ProjectReleaseJob(db.Model):
+    """
+    The persisted state of releasing uploads to PyPI in the background.
+    """
+
+    QUEUED = "queued"
+    UPLOADING = "uploading"
+    VALIDATING = "validating"
+    DONE = "done"
+    FAILED = "failed"
+    FINISHED = (DONE, FAILED)
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    version = db.Column(db.Text)
+    upload_ids = db.Column(ARRAY(db.Integer), nullable=False)
+    status = db.Column(db.Text, default=QUEUED, nullable=False, index=True)
+    output = db.Column(db.Text)
+    errors = db.Column(JSONB, default=list)
+    warnings = db.Column(JSONB, default=list)
+    #: the result of every file uploaded to PyPI, see UploadResult.to_dict
+    results = db.Column(JSONB, default=list)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    project = db.relationship(
+        "Project", backref=db.backref("release_jobs", lazy="dynamic")
+    )
+    user = db.relationship("User")
+
+    __tablename__ = "project_release_jobs"
+
+    @property
+    def uploads(self):
+        return (
+            ProjectUpload.query.filter(ProjectUpload.id.in_(self.upload_ids))
+            .order_by(ProjectUpload.filename)
+            .all()
+        )
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED
+
+    @property
+    def timeout(self):
+        """
+        The longest the release_uploads task may take for this job: the
+        upload timeout of every file plus the polling budget and request
+        timeouts of the validation.
+        """
+        config = current_app.config
+        attempts = config["RELEASE_VALIDATION_ATTEMPTS"]
+        validation = config["RELEASE_VALIDATION_DELAY"] * (2 ** (attempts - 1) - 1)
+        # each validation request times out after 10 seconds
+        validation += 10 * attempts
+        return timedelta(
+            seconds=config["PYPI_UPLOAD_TIMEOUT"] * len(self.upload_ids) + validation
+        )
+
+    @property
+    def is_stale(self):
+        """
+        Whether the job should have finished long ago but is still queued
+        or running, e.g. since the worker was killed during a deploy.
+        """
+        if self.is_finished:
+            return False
+        started_at = self.started_at or self.created_at
+        return started_at + self.timeout < datetime.utcnow()
+
+    def fail_if_stale(self):
+        """
+        Marks the job as failed if it's stale, so its uploads can be
+        released again. Returns whether it was stale.
+        """
+        if not self.is_stale:
+            return False
+        logger.warning(f"Release job {self.id} is stale, marking it as failed.")
+        self.set_status(
+            self.FAILED,
+            errors=["The release didn't finish in time, please try again."],
+        )
+        return True
+
+    @classmethod
+    def unfinished_for(cls, project_id, upload_ids):
+        """
+        Returns the oldest queued or running release job of the project
+        that releases any of the given uploads, or None. Stale jobs are
+        marked as failed on the way.
+        """
+        jobs = cls.query.filter(
+            cls.project_id == project_id,
+            cls.status.notin_(cls.FINISHED),
+            cls.upload_ids.overlap(upload_ids),
+        ).order_by(cls.created_at)
+        for job in jobs:
+            if not job.fail_if_stale():
+                return job
+        return None
+
+    @classmethod
+    def uploaded_filenames(cls, project_id, upload_ids):
+        """
+        Returns the filenames of the given uploads that failed release jobs
+        already uploaded to PyPI, which would be rejected a second time.
+        """
+        jobs = cls.query.filter(
+            cls.project_id == project_id,
+            cls.status == cls.FAILED,
+            cls.upload_ids.overlap(upload_ids),
+        )
+        return {
+            result["filename"]
+            for job in jobs
+            for result in job.results or []
+            if result.get("ok")
+        }
+
+    def set_status(self, status, **kwargs):
+        """
+        Moves the job to the given status and commits it right away, so
+        the release page can follow its progress.
+        """
+        self.status = status
+        if status == self.UPLOADING:
+            self.started_at = datetime.utcnow()
+        elif status in self.FINISHED:
+            self.finished_at = datetime.utcnow()
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.save()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "version": self.version,
+            "status": self.status,
+            "is_finished": self.is_finished,
+            "output": self.output,
+            "errors": self.errors or [],
+            "warnings": self.warnings or [],
+            "results": self.results or [],
+            "created_at": self.created_at and self.created_at.isoformat(),
+            "started_at": self.started_at and self.started_at.isoformat(),
+            "finished_at": self.finished_at and self.finished_at.isoformat(),
+        }
+
+    def __str__(self):
+        return f"release #{self.id}"
@@ -0,0 +1,195 @@
+import logging
+import os
+import tempfile
+
+from flask import current_app
+import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+import twine
+from twine.package import PackageFile
+
+from .storage import upload_storage
+
+
+logger = logging.getLogger(__name__)
+
+
+def metadata_fields(metadata):
+    """
+    Returns the form fields of the legacy upload API for the given twine
+    package metadata, the same way twine's repository encodes them, which
+    is the reverse of what PyPI does when parsing the upload form.
+    """
+    fields = []
+    for key, value in metadata.items():
+        if value is None or key == "gpg_signature":
+            # releases are never signed
+            continue
+        if key == "project_urls":
+            fields.extend((key, f"{name}, {url}") for name, url in value.items())
+        elif key == "keywords":
+            fields.append((key, ", ".join(value)))
+        elif isinstance(value, (list, tuple)):
+            fields.extend((key, item) for item in value)
+        else:
+            fields.append((key, value))
+    return fields
+
+
+class UploadResult:
+    """
+    The result of uploading a single file to PyPI.
+    """
+
+    def __init__(self, filename, status_code=None, message="", skipped=False):
+        self.filename = filename
+        self.status_code = status_code
+        self.message = message
+        #: whether the file was already uploaded and hence not sent again
+        self.skipped = skipped
+
+    @property
+    def ok(self):
+        if self.skipped:
+            return True
+        return self.status_code is not None and 200 <= self.status_code < 300
+
+    def to_dict(self):
+        return {
+            "filename": self.filename,
+            "status_code": self.status_code,
+            "message": self.message,
+            "skipped": self.skipped,
+            "ok": self.ok,
+        }
+
+    def __str__(self):
+        if self.skipped:
+            status = "skipped"
+        elif self.status_code is not None:
+            status = self.status_code
+        else:
+            status = "error"
+        return f"{self.filename}: {status} {self.message}".strip()
+
+    def __repr__(self):
+        return f"<UploadResult {self}>"
+
+
+class PyPIUploader:
+    """
+    Uploads release files to a package index with the legacy upload API,
+    the same way "twine upload" does but from within the app process.
+
+    The HTTPS connections to the index are kept in a pool and reused for
+    all files and releases. Locally stored files are streamed from the
+    upload storage instead of being copied to a temporary directory first.
+    """
+
+    def __init__(self, repository_url, username, password, timeout=60, pool_size=4):
+        self.repository_url = repository_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        self.session.headers["User-Agent"] = (
+            f"jazzband-website twine/{twine.__version__}"
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def package_file(self, upload, directory):
+        """
+        Returns the twine PackageFile of the given upload with the metadata
+        read from the distribution file.
+
+        twine detects the distribution type by the file name, so the file
+        is linked under its original name if it's stored locally and only
+        downloaded from other storage backends.
+        """
+        filename = os.path.join(directory, upload.filename)
+        local_path = upload_storage.local_path(upload.path)
+        if local_path is None:
+            upload_storage.copy_to(upload.path, filename)
+        else:
+            os.symlink(local_path, filename)
+        return PackageFile.from_filename(filename, comment=None)
+
+    def upload(self, upload):
+        """
+        Uploads the given ProjectUpload and returns an UploadResult.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                package = self.package_file(upload, directory)
+            except Exception as exc:
+                logger.error(
+                    f"Reading the metadata of {upload.filename} failed", exc_info=True
+                )
+                return UploadResult(upload.filename, message=str(exc))
+
+            if package.sha2_digest != upload.sha256_digest:
+                return UploadResult(
+                    upload.filename,
+                    message="The stored file doesn't match its sha256 digest.",
+                )
+
+            fields = metadata_fields(package.metadata_dictionary())
+            fields.append((":action", "file_upload"))
+            fields.append(("protocol_version", "1"))
+            with open(package.filename, "rb") as content:
+                fields.append(
+                    (
+                        "content",
+                        (package.basefilename, content, "application/octet-stream"),
+                    )
+                )
+                encoder = MultipartEncoder(fields)
+                try:
+                    response = self.session.post(
+                        self.repository_url,
+                        data=encoder,
+                        headers={"Content-Type": encoder.content_type},
+                        allow_redirects=False,
+                        timeout=self.timeout,
+                    )
+                except requests.exceptions.RequestException as exc:
+                    logger.error(f"Uploading {upload.filename} failed", exc_info=True)
+                    return UploadResult(upload.filename, message=str(exc))
+
+        if response.is_redirect:
+            message = (
+                f"Redirected to {response.headers.get('Location')}, "
+                f"check the repository URL."
+            )
+        else:
+            message = response.reason or ""
+        return UploadResult(upload.filename, response.status_code, message)
+
+    def upload_all(self, uploads):
+        """
+        Uploads the given ProjectUploads one after the other, stopping at
+        the first failed upload like twine does. Returns the list of
+        UploadResults of the attempted uploads.
+        """
+        results = []
+        for upload in uploads:
+            result = self.upload(upload)
+            results.append(result)
+            logger.info(f"PyPI upload of {result}")
+            if not result.ok:
+                break
+        return results
+
+
+def get_uploader():
+    uploader = current_app.extensions.get("pypi_uploader")
+    if uploader is None:
+        uploader = current_app.extensions["pypi_uploader"] = PyPIUploader(
+            current_app.config["PYPI_REPOSITORY_URL"],
+            current_app.config["PYPI_USERNAME"],
+            current_app.config["PYPI_PASSWORD"],
+            timeout=current_app.config["PYPI_UPLOAD_TIMEOUT"],
+        )
+    return uploader
@@ -0,0 +1,245 @@
+import logging
+import time
+
+from flask import current_app
+import requests
+
+from .pypi import get_uploader
+
+
+logger = logging.getLogger(__name__)
+
+
+class UploadValidator:
+    """
+    Validates a released upload against the release files of its version
+    listed by the PyPI JSON API.
+    """
+
+    def __init__(self, upload=None, project=None):
+        self.upload = upload
+        self.project = project
+
+    def validate_upload_data(self, data):
+        """
+        Validate the upload against the given PyPI data.
+        Returns (success, errors, warnings) tuple.
+        """
+        errors = []
+        warnings = []
+
+        releases = data.get("releases", {})
+        release_files = releases.get(self.upload.version, [])
+
+        if not release_files:
+            # No files found - likely CDN delay, treat as warning
+            warning = (
+                f"No released files found for version {self.upload.version}. "
+                f"This might be due to CDN propagation delays."
+            )
+            warnings.append(warning)
+            logger.warning(warning)
+            return True, [], warnings
+
+        # Look for our specific file
+        found_file = False
+        for release_file in release_files:
+            release_filename = release_file.get("filename", None)
+            if release_filename is None:
+                continue
+
+            if release_filename == self.upload.filename:
+                found_file = True
+                # Validate file hashes - these are REAL errors if they don't match
+                digests = release_file.get("digests", {})
+                if digests:
+                    md5_digest = digests.get("md5", None)
+                    if md5_digest and md5_digest != self.upload.md5_digest:
+                        error = (
+                            f"MD5 hash of {self.upload.filename} does "
+                            f"not match hash returned by PyPI."
+                        )
+                        errors.append(error)
+                        logger.error(error, extra={"stack": True})
+
+                    sha256_digest = digests.get("sha256", None)
+                    if sha256_digest and sha256_digest != self.upload.sha256_digest:
+                        error = (
+                            f"SHA256 hash of {self.upload.filename} "
+                            f"does not match hash returned by PyPI."
+                        )
+                        errors.append(error)
+                        logger.error(error, extra={"stack": True})
+                else:
+                    # No digests available - warn but don't block
+                    warning = f"No digests available for file {self.upload.filename}"
+                    warnings.append(warning)
+                    logger.warning(warning)
+                break
+
+        if not found_file:
+            # File not visible yet - likely CDN delay, treat as warning
+            warning = (
+                f"File {self.upload.filename} not yet visible in PyPI API. "
+                f"This is likely due to CDN propagation delays."
+            )
+            warnings.append(warning)
+            logger.warning(warning)
+            return True, [], warnings
+
+        # If we found the file and no hash errors, validation passed
+        return len(errors) == 0, errors, warnings
+
+
+class ReleaseValidator:
+    """
+    Validates all released uploads of a version against a single response
+    of the PyPI JSON API for that version.
+
+    Since released files take a moment to show up in the API, it's polled
+    with an exponential backoff until all of them are listed, and only
+    then are the digests of the uploads compared, in memory.
+
+    The polling blocks the release job, with the default settings of
+    6 attempts and a delay of 1 second it waits up to 1+2+4+8+16 = 31
+    seconds plus the request timeouts before giving up.
+    """
+
+    def __init__(self, project, version, attempts=None, delay=None):
+        self.project = project
+        self.version = version
+        #: how often the PyPI API is polled at most
+        self.attempts = attempts or current_app.config["RELEASE_VALIDATION_ATTEMPTS"]
+        #: the seconds to wait before the second attempt, doubled after each one
+        self.delay = delay or current_app.config["RELEASE_VALIDATION_DELAY"]
+
+    def fetch_release_files(self, timeout=10):
+        response = requests.get(
+            self.project.pypi_version_json_url(self.version), timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json().get("urls", [])
+
+    def poll_release_files(self, uploads, timeout=10):
+        """
+        Returns the release files listed by PyPI once all given uploads
+        show up in them or the attempts are exhausted. Returns None if PyPI
+        couldn't be queried at all.
+        """
+        filenames = {upload.filename for upload in uploads}
+        release_files = None
+        delay = self.delay
+        for attempt in range(1, self.attempts + 1):
+            try:
+                release_files = self.fetch_release_files(timeout)
+            except requests.exceptions.HTTPError as exc:
+                status_code = exc.response.status_code
+                # the version isn't known yet or PyPI has hiccups
+                if status_code != 404 and status_code < 500:
+                    raise
+                logger.info(f"PyPI returned {status_code} for {self.version}")
+            except requests.exceptions.RequestException:
+                logger.info(f"Fetching {self.version} from PyPI failed", exc_info=True)
+            else:
+                listed = {
+                    release_file.get("filename") for release_file in release_files
+                }
+                if filenames <= listed:
+                    break
+                logger.info(
+                    f"Waiting for {', '.join(sorted(filenames - listed))} on PyPI"
+                )
+
+            if attempt < self.attempts:
+                time.sleep(delay)
+                delay *= 2
+
+        return release_files
+
+    def validate_uploads(self, uploads, timeout=10):
+        """
+        Validate uploads of the version against PyPI API.
+        Returns (success, errors, warnings) tuple.
+        """
+        errors = []
+        warnings = []
+
+        try:
+            release_files = self.poll_release_files(uploads, timeout)
+        except requests.exceptions.HTTPError as e:
+            error = f"HTTP error {e.response.status_code} while validating uploads"
+            logger.error(error, exc_info=True)
+            return False, [error], []
+        except ValueError:
+            error = "Error while parsing response from PyPI during validation"
+            logger.error(error, exc_info=True)
+            return False, [error], []
+
+        if release_files is None:
+            # PyPI couldn't be reached - don't block release
+            warning = (
+                f"Version {self.version} couldn't be fetched from PyPI for "
+                f"validation. The upload may still be successful. "
+                f"Please verify manually on PyPI if needed."
+            )
+            logger.warning(warning)
+            return True, [], [warning]
+
+        data = {"releases": {self.version: release_files}}
+        for upload in uploads:
+            validator = UploadValidator(upload, self.project)
+            success, upload_errors, upload_warnings = validator.validate_upload_data(
+                data
+            )
+
+            # Prefix errors/warnings with filename for clarity
+            for error in upload_errors:
+                errors.append(f"{upload.filename}: {error}")
+            for warning in upload_warnings:
+                warnings.append(f"{upload.filename}: {warning}")
+
+        return len(errors) == 0, errors, warnings
+
+
+class BulkRelease:
+    """
+    Releases uploads of a project to PyPI and validates them.
+    """
+
+    def __init__(self, project=None):
+        self.project = project
+
+    def validate_uploads_bulk(self, uploads, timeout=10):
+        """
+        Validate multiple uploads at once, fetching each of their versions
+        from PyPI only once.
+        Returns (overall_success, all_errors, all_warnings) tuple.
+        """
+        all_errors = []
+        all_warnings = []
+
+        uploads_by_version = {}
+        for upload in uploads:
+            uploads_by_version.setdefault(upload.version, []).append(upload)
+
+        for version, version_uploads in uploads_by_version.items():
+            validator = ReleaseValidator(self.project, version)
+            success, errors, warnings = validator.validate_uploads(
+                version_uploads, timeout
+            )
+            all_errors.extend(errors)
+            all_warnings.extend(warnings)
+
+        # Overall success if no blocking errors
+        return len(all_errors) == 0, all_errors, all_warnings
+
+    def release_uploads_bulk(self, uploads):
+        """
+        Release multiple uploads to PyPI.
+        Returns (success, upload_results) tuple.
+        """
+        upload_results = get_uploader().upload_all(uploads)
+        success = len(upload_results) == len(uploads) and all(
+            result.ok for result in upload_results
+        )
+        return success, upload_results
@@ -0,0 +1,176 @@
+import logging
+import os
+import shutil
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+from werkzeug.security import safe_join
+
+
+logger = logging.getLogger(__name__)
+
+
+class Storage:
+    """
+    The base class of the upload storage backends.
+
+    Uploads are stored content-addressed under keys built from their
+    sha256 digest and sharded into two levels of directories by its first
+    four characters, e.g. 2c/of/2coffee12345678123123123123123123, so that
+    no single directory grows with the number of uploads.
+
+    Keys of uploads stored before the sharding was introduced, e.g.
+    acme/2coffee12345678123123123123123123, keep working since every
+    operation takes the key stored with the upload.
+
+    Uploads with identical content share their key, so the stored file
+    is only deleted together with the last of them. Their signatures are
+    stored per upload, see ProjectUpload.signature_key.
+    """
+
+    def key(self, digest):
+        return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def store(self, key, upload_file):
+        """
+        Stores the given HashingFile under the given key, atomically.
+        """
+        raise NotImplementedError
+
+    def open(self, key):
+        """
+        Returns a binary file object to read the file with the given key.
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """
+        Deletes the file with the given key, if it exists.
+        """
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """
+        Returns the path of the file with the given key on the local file
+        system, or None if the backend doesn't store files locally.
+        """
+        return None
+
+    def copy_to(self, key, path):
+        """
+        Copies the file with the given key to the given local path.
+        """
+        with self.open(key) as source, open(path, "wb") as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+
+
+class LocalStorage(Storage):
+    """
+    Stores uploads in a directory on the local file system (UPLOAD_ROOT).
+
+    Files are written to the incoming directory of the root while they're
+    uploaded, fsynced and then renamed into place, followed by an fsync of
+    the target directory, so a stored file is always complete and
+    survives a crash.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def local_path(self, key):
+        return safe_join(self.root, key)
+
+    def store(self, key, upload_file):
+        path = self.local_path(key)
+        upload_file.commit(path)
+        directory = os.open(os.path.dirname(path), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def open(self, key):
+        return open(self.local_path(key), "rb")
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+
+class S3Storage(Storage):
+    """
+    Stores uploads in a bucket of an S3 compatible object storage, e.g.
+    AWS S3 or MinIO (UPLOAD_S3_BUCKET and UPLOAD_S3_ENDPOINT_URL).
+
+    Uploaded files are still received in the incoming directory of
+    UPLOAD_ROOT and then uploaded to the bucket. Since objects only become
+    visible once they were completely written, storing them is atomic.
+    """
+
+    def __init__(self, bucket, prefix="", **client_options):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", **client_options)
+
+    def object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def store(self, key, upload_file):
+        upload_file.seek(0)
+        self.client.upload_fileobj(upload_file, self.bucket, self.object_key(key))
+        upload_file.close()
+
+    def open(self, key):
+        response = self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))
+        return response["Body"]
+
+    def delete(self, key):
+        # deleting missing objects isn't an error with S3
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+
+def create_storage(config):
+    backend = config["UPLOAD_STORAGE"]
+    if backend == "local":
+        return LocalStorage(config["UPLOAD_ROOT"])
+    elif backend == "s3":
+        return S3Storage(
+            config["UPLOAD_S3_BUCKET"],
+            prefix=config["UPLOAD_S3_PREFIX"],
+            endpoint_url=config["UPLOAD_S3_ENDPOINT_URL"],
+            region_name=config["UPLOAD_S3_REGION"],
+        )
+    raise ValueError(f"Unknown upload storage {backend}")
+
+
+def get_storage():
+    storage = current_app.extensions.get("upload_storage")
+    if storage is None:
+        storage = current_app.extensions["upload_storage"] = create_storage(
+            current_app.config
+        )
+    return storage
+
+
+upload_storage = LocalProxy(get_storage)
@@ -6,14 +6,21 @@ import time
 from flask import current_app, render_template
 from flask_mail import Message
 from packaging.version import parse as parse_version
+import requests
 from spinach import Tasks
+from sqlalchemy import and_, or_, orm, select
 
 from ..account import github
 from ..config import ONE_MINUTE
 from ..db import postgres, redis
 from ..email import mail
 from ..members.models import EmailAddress, User
-from .models import Project, ProjectMembership, ProjectUpload
+from ..pagecache import invalidate_pages
+from ..readstore import invalidate_read_store
+from .index import invalidate_index
+from .models import Project, ProjectMembership, ProjectReleaseJob, ProjectUpload
+from .pypi import UploadResult
+from .releases import BulkRelease, ReleaseValidator, UploadValidator
 
 
 logger = logging.getLogger(__name__)
@@ -22,10 +29,51 @@ tasks = Tasks()
 
 
 @tasks.task(name="sync_projects", periodicity=timedelta(minutes=30), max_retries=3)
-def sync_projects():
+def sync_projects(full=False):
+    """
+    Syncs the org repositories with the projects in the database.
+
+    Only the repositories updated since the high-water mark of the last
+    sync are fetched, except for a full sync every
+    SYNC_PROJECTS_FULL_INTERVAL seconds, when there is no high-water mark
+    yet or when requested explicitly.
+    """
     with redis.lock("sync_projects", ttl=ONE_MINUTE * 14):
-        projects_data = github.get_projects()
-        Project.sync(projects_data)
+        request_count = github.admin_session.request_count
+        watermark = redis.get("sync_projects:watermark")
+        full_synced_at = redis.get("sync_projects:full_synced_at")
+        full = (
+            full
+            or watermark is None
+            or full_synced_at is None
+            or time.time() - float(full_synced_at)
+            >= current_app.config["SYNC_PROJECTS_FULL_INTERVAL"]
+        )
+        started_at = time.time()
+        if full:
+            projects_data = github.get_projects()
+        else:
+            projects_data = github.get_updated_projects(watermark.decode())
+        Project.upsert(projects_data)
+        invalidate_index()
+        invalidate_pages("projects")
+        invalidate_read_store()
+
+        # GitHub's ISO 8601 timestamps sort lexicographically
+        updated_at = [project["updated_at"] for project in projects_data]
+        if updated_at:
+            redis.set("sync_projects:watermark", max(updated_at))
+        if full:
+            redis.set("sync_projects:full_synced_at", started_at)
+
+        # record how many GitHub API requests this run made
+        request_count = github.admin_session.request_count - request_count
+        redis.set("sync_projects:request_count", request_count)
+        logger.info(
+            f"Synced {len(projects_data)} projects in {request_count} requests "
+            f"({'full' if full else 'incremental'})"
+        )
+        return request_count
 
 
 @tasks.task(name="update_project_by_hook")
@@ -43,6 +91,9 @@ def update_project_by_hook(hook_id):
 
     # then sync the project so it definitely exists
     Project.sync([hook_data["repository"]])
+    invalidate_index()
+    invalidate_pages("projects")
+    invalidate_read_store()
     # get the project again from the database
     project = Project.query.filter(Project.name == project_name).first()
 
@@ -112,35 +163,80 @@ def update_project_by_hook(hook_id):
                 )
 
 
-@tasks.task(name="send_new_upload_notifications")
-def send_new_upload_notifications(project_id=None):
-    "Sends project upload notifications if needed"
-    unnotified_uploads = ProjectUpload.query.filter_by(notified_at=None)
-    if project_id is not None:
-        unnotified_uploads = unnotified_uploads.filter_by(project_id=project_id)
-    messages = []
+class UploadRecipients:
+    """
+    The lead members of projects and the primary email addresses of them
+    and the roadies, who are notified about the uploads of the projects.
 
-    for upload in unnotified_uploads:
-        lead_memberships = upload.project.membership.join(
-            ProjectMembership.user
-        ).filter(
+    The leads of all given projects and the roadies are loaded together
+    with their primary verified email addresses with a single query and
+    kept for the task run, instead of querying them for every upload.
+    """
+
+    def __init__(self, project_ids):
+        self.leads = {}
+        self.roadies = {}
+        self.emails = {}
+
+        lead_membership = and_(
+            ProjectMembership.user_id == User.id,
+            ProjectMembership.project_id.in_(project_ids),
             ProjectMembership.is_lead.is_(True),
             User.is_member.is_(True),
             User.is_banned.is_(False),
         )
-        lead_members = [membership.user for membership in lead_memberships]
-
-        recipients = set()
+        primary_email = and_(
+            EmailAddress.user_id == User.id,
+            EmailAddress.primary.is_(True),
+            EmailAddress.verified.is_(True),
+        )
+        rows = postgres.session.execute(
+            select(User, ProjectMembership.project_id, EmailAddress.email)
+            .outerjoin(ProjectMembership, lead_membership)
+            .outerjoin(EmailAddress, primary_email)
+            .where(or_(ProjectMembership.id.is_not(None), User.is_roadie.is_(True)))
+            .order_by(ProjectMembership.id, EmailAddress.id)
+        )
+        for user, project_id, email in rows:
+            if email:
+                self.emails.setdefault(user.id, email)
+            if project_id is not None:
+                lead_members = self.leads.setdefault(project_id, [])
+                if user not in lead_members:
+                    lead_members.append(user)
+            if user.is_roadie:
+                self.roadies[user.id] = user
+
+    def for_project(self, project_id):
+        """
+        Returns the lead members of the project with the given id and the
+        email addresses to notify about its uploads.
+        """
+        lead_members = self.leads.get(project_id, [])
+        recipients = {
+            self.emails[user.id]
+            for user in lead_members + list(self.roadies.values())
+            if user.id in self.emails
+        }
+        return lead_members, recipients
 
-        for lead_member in lead_members + list(User.roadies()):
-            primary_email = lead_member.email_addresses.filter(
-                EmailAddress.primary.is_(True), EmailAddress.verified.is_(True)
-            ).first()
 
-            if not primary_email:
-                continue
+@tasks.task(name="send_new_upload_notifications")
+def send_new_upload_notifications(project_id=None):
+    "Sends project upload notifications if needed"
+    unnotified_uploads = ProjectUpload.query.filter_by(notified_at=None).options(
+        orm.joinedload(ProjectUpload.project)
+    )
+    if project_id is not None:
+        unnotified_uploads = unnotified_uploads.filter_by(project_id=project_id)
+    unnotified_uploads = unnotified_uploads.all()
+    upload_recipients = UploadRecipients(
+        {upload.project_id for upload in unnotified_uploads}
+    )
+    messages = []
 
-            recipients.add(primary_email.email)
+    for upload in unnotified_uploads:
+        lead_members, recipients = upload_recipients.for_project(upload.project_id)
 
         message = Message(
             subject=f"Project {upload.project.name} received a new upload",
@@ -169,6 +265,92 @@ def send_new_upload_notifications(project_id=None):
         postgres.session.commit()
 
 
+@tasks.task(name="release_uploads")
+def release_uploads(job_id):
+    """
+    Releases the uploads of the given release job to PyPI and
+    validates them, recording the progress on the job as it goes.
+    """
+    job = postgres.session.get(ProjectReleaseJob, job_id)
+    if job is None:
+        logger.warning(f"Release job {job_id} not found.")
+        return
+    if job.status != ProjectReleaseJob.QUEUED:
+        logger.info(f"Release job {job_id} has already been started.")
+        return
+
+    uploads = [upload for upload in job.uploads if upload.released_at is None]
+    if not uploads:
+        job.set_status(
+            ProjectReleaseJob.FAILED,
+            errors=["The uploads have already been released."],
+        )
+        return
+
+    # PyPI rejects files that an earlier, failed job already uploaded
+    uploaded = ProjectReleaseJob.uploaded_filenames(job.project_id, job.upload_ids)
+    skipped_results = [
+        UploadResult(upload.filename, message="already uploaded", skipped=True)
+        for upload in uploads
+        if upload.filename in uploaded
+    ]
+    pending = [upload for upload in uploads if upload.filename not in uploaded]
+
+    release = BulkRelease(job.project)
+    try:
+        job.set_status(ProjectReleaseJob.UPLOADING)
+        success, upload_results = release.release_uploads_bulk(pending)
+        upload_results = skipped_results + upload_results
+        output = "\n".join(str(result) for result in upload_results)
+        results = [result.to_dict() for result in upload_results]
+        if not success:
+            error = f"Release of version {job.version} failed."
+            logger.error(error, extra={"data": {"output": output}})
+            job.set_status(
+                ProjectReleaseJob.FAILED,
+                output=output,
+                results=results,
+                errors=[error],
+            )
+            return
+
+        job.set_status(ProjectReleaseJob.VALIDATING, output=output, results=results)
+        success, errors, warnings = release.validate_uploads_bulk(uploads)
+        if errors:
+            job.set_status(ProjectReleaseJob.FAILED, errors=errors, warnings=warnings)
+            return
+
+        released_at = datetime.utcnow()
+        for upload in uploads:
+            upload.released_at = released_at
+            if warnings:
+                # not all files could be verified yet, see verify_uploads
+                upload.verification_status = ProjectUpload.VERIFICATION_PENDING
+            else:
+                upload.verification_status = ProjectUpload.VERIFIED
+                upload.verified_at = released_at
+            upload.save(commit=False)
+        # commits the uploads together with the job
+        job.set_status(ProjectReleaseJob.DONE, warnings=warnings)
+        if warnings:
+            delay = current_app.config["RELEASE_VERIFICATION_DELAY"]
+            tasks.schedule_at(
+                verify_uploads,
+                released_at + timedelta(seconds=delay),
+                [upload.id for upload in uploads],
+            )
+        logger.info(
+            f"Released {len(uploads)} uploads for {job.project.name} v{job.version}"
+        )
+    except Exception:
+        postgres.session.rollback()
+        job.set_status(
+            ProjectReleaseJob.FAILED,
+            errors=["The release failed unexpectedly, please contact the roadies."],
+        )
+        raise
+
+
 @tasks.task(name="update_upload_ordering", max_retries=10)
 def update_upload_ordering(project_id):
     uploads = ProjectUpload.query.filter_by(project_id=project_id).all()
@@ -192,23 +374,43 @@ def sync_project_members():
     in GitHub anymore.
     """
     with redis.lock("sync_project_members", ttl=ONE_MINUTE * 14):
-        teams = github.get_teams()
+        project_ids = dict(
+            postgres.session.execute(
+                postgres.select(Project.team_slug, Project.id).where(
+                    Project.team_slug.is_not(None)
+                )
+            ).all()
+        )
 
-        for team in teams:
-            project = Project.query.filter(Project.team_slug == team["slug"]).first()
-            if project is None:
+        memberships = []
+        synced_project_ids = set()
+        for team in github.get_teams():
+            project_id = project_ids.get(team["slug"])
+            if project_id is None:
                 continue
-
-            team_members = github.get_members(team["slug"])
-            sync_data = [
-                {
-                    "user_id": team_member["id"],
-                    "project_id": project.id,
-                }
+            # only the ids are needed, so skip the 2FA and roadie enrichment
+            try:
+                team_members = github.get_team_members(team["slug"])
+            except Exception:
+                # keep the memberships of the team until the next run
+                logger.exception(f"Couldn't fetch members of team {team['slug']}")
+                continue
+            synced_project_ids.add(project_id)
+            memberships.extend(
+                {"user_id": team_member["id"], "project_id": project_id}
                 for team_member in team_members
-            ]
+            )
 
-            ProjectMembership.sync(sync_data, key=["user_id", "project_id"])
+        inserted, _ = ProjectMembership.upsert(memberships)
+        deleted = ProjectMembership.delete_missing(synced_project_ids, memberships)
+        postgres.session.commit()
+        invalidate_index()
+        invalidate_pages("projects")
+        invalidate_read_store()
+        logger.info(
+            f"Synced memberships of {len(synced_project_ids)} projects: "
+            f"{len(inserted)} added, {len(deleted)} deleted"
+        )
 
 
 @tasks.task(name="remove_user_from_team")
@@ -669,3 +871,109 @@ def update_all_projects_members_team(permission="push", dry_run=False):
     logger.info(
         f"Finished updating projects. Success: {success_count}, Skipped: {skip_count}, Errors: {error_count}"
     )
+
+
+@tasks.task(name="verify_uploads")
+def verify_uploads(upload_ids, attempt=1):
+    """
+    Verifies released uploads against PyPI until their digests match or
+    RELEASE_VERIFICATION_DEADLINE seconds have passed since their release.
+
+    Uploads not listed by PyPI yet are checked again later, with the
+    delay doubled after every attempt. The leads are notified about
+    uploads whose digests don't match the ones of PyPI.
+    """
+    uploads = ProjectUpload.query.filter(
+        ProjectUpload.id.in_(upload_ids),
+        ProjectUpload.verification_status == ProjectUpload.VERIFICATION_PENDING,
+    ).all()
+    if not uploads:
+        logger.info(f"No uploads of {upload_ids} are pending verification.")
+        return
+
+    now = datetime.utcnow()
+    deadline = timedelta(seconds=current_app.config["RELEASE_VERIFICATION_DEADLINE"])
+    uploads_by_release = {}
+    for upload in uploads:
+        uploads_by_release.setdefault((upload.project, upload.version), []).append(
+            upload
+        )
+
+    pending = []
+    mismatches = []
+    for (project, version), version_uploads in uploads_by_release.items():
+        try:
+            release_files = ReleaseValidator(project, version).fetch_release_files()
+        except (requests.exceptions.RequestException, ValueError):
+            logger.info(
+                f"Fetching {project.name} {version} from PyPI failed", exc_info=True
+            )
+            release_files = []
+        listed = {release_file.get("filename") for release_file in release_files}
+        data = {"releases": {version: release_files}}
+
+        for upload in version_uploads:
+            upload.verification_checked_at = now
+            if upload.filename in listed:
+                validator = UploadValidator(upload, project)
+                success, errors, warnings = validator.validate_upload_data(data)
+                if errors:
+                    upload.verification_status = ProjectUpload.VERIFICATION_MISMATCH
+                    mismatches.append((upload, errors))
+                else:
+                    upload.verification_status = ProjectUpload.VERIFIED
+                    upload.verified_at = now
+            elif now < (upload.released_at or now) + deadline:
+                pending.append(upload)
+            else:
+                upload.verification_status = ProjectUpload.VERIFICATION_EXPIRED
+                logger.warning(
+                    f"Released upload {upload.filename} didn't show up on PyPI."
+                )
+            upload.save(commit=False)
+    postgres.session.commit()
+
+    if pending:
+        delay = current_app.config["RELEASE_VERIFICATION_DELAY"] * 2**attempt
+        tasks.schedule_at(
+            verify_uploads,
+            now + timedelta(seconds=delay),
+            [upload.id for upload in pending],
+            attempt + 1,
+        )
+
+    if mismatches:
+        send_upload_mismatch_notifications(mismatches)
+
+
+def send_upload_mismatch_notifications(mismatches):
+    """
+    Notifies the leads and roadies about the given released uploads whose
+    digests don't match the files on PyPI.
+    """
+    upload_recipients = UploadRecipients(
+        {upload.project_id for upload, errors in mismatches}
+    )
+    with mail.connect() as smtp:
+        for upload, errors in mismatches:
+            logger.error(
+                f"Released upload {upload.filename} doesn't match PyPI",
+                extra={"data": {"errors": errors}},
+            )
+            lead_members, recipients = upload_recipients.for_project(upload.project_id)
+            smtp.send(
+                Message(
+                    subject=(
+                        f"Released upload {upload.filename} of project "
+                        f"{upload.project.name} doesn't match PyPI"
+                    ),
+                    recipients=list(recipients),
+                    body=render_template(
+                        "projects/mails/upload_mismatch_notification.txt",
+                        project=upload.project,
+                        upload=upload,
+                        lead_members=lead_members,
+                        errors=errors,
+                    ),
+                )
+            )
@@ -0,0 +1,137 @@
+import logging
+import os
+import shutil
+import tempfile
+
+from flask import Request, current_app
+
+from .hashing import MultiDigest
+
+
+logger = logging.getLogger(__name__)
+
+# the endpoint whose files are streamed into the upload storage
+UPLOAD_ENDPOINT = "projects.upload"
+# the directory below UPLOAD_ROOT that receives files while they're uploaded,
+# on the same file system so that they can be renamed into place
+INCOMING_DIRECTORY = ".incoming"
+
+
+class HashingFile:
+    """
+    A temporary file in the incoming directory of the upload storage that
+    updates the upload digests with every chunk written to it.
+
+    Written chunks are collected up to UPLOAD_BUFFER_SIZE and then hashed
+    with a MultiDigest and written to disk at once.
+
+    Werkzeug's multipart parser writes the uploaded file into it while
+    reading the request body, so the file is hashed in the same pass and
+    can be renamed into its content-addressed path afterwards instead of
+    being copied. The file is removed when it's closed without having been
+    committed, e.g. when the upload was rejected.
+    """
+
+    def __init__(self):
+        directory = os.path.join(current_app.config["UPLOAD_ROOT"], INCOMING_DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        fd, self.name = tempfile.mkstemp(dir=directory, suffix=".part")
+        self.file = open(fd, "w+b")
+        self.buffer_size = current_app.config["UPLOAD_BUFFER_SIZE"]
+        self.buffer = bytearray()
+        self.digest = MultiDigest()
+        self.size = 0
+        self.committed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+        if len(self.buffer) >= self.buffer_size:
+            self.drain()
+        return len(data)
+
+    def drain(self):
+        if self.buffer:
+            self.digest.update(self.buffer)
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+
+    def hexdigests(self):
+        self.drain()
+        return self.digest.hexdigests()
+
+    def commit(self, path):
+        """
+        Atomically moves the file to the given path in the upload storage.
+        """
+        self.drain()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.name, path)
+        self.committed = True
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.digest.close()
+        self.file.close()
+        if not self.committed:
+            try:
+                os.remove(self.name)
+            except FileNotFoundError:
+                pass
+
+    def __getattr__(self, name):
+        # read, readline, seek, tell etc. are answered by the file itself
+        # once everything written is on disk
+        self.drain()
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        self.drain()
+        return iter(self.file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def staged_upload(file_storage):
+    """
+    Returns the HashingFile of the given uploaded FileStorage.
+
+    Files that weren't streamed into the upload storage while the request
+    was parsed (e.g. because the form was parsed before the URL was
+    matched) are copied into one first.
+    """
+    if isinstance(file_storage.stream, HashingFile):
+        return file_storage.stream
+    logger.info(f"Staging upload {file_storage.filename} after the fact")
+    staged = HashingFile()
+    file_storage.stream.seek(0)
+    shutil.copyfileobj(
+        file_storage.stream, staged, current_app.config["UPLOAD_BUFFER_SIZE"]
+    )
+    file_storage.stream.close()
+    # let the request close (and clean up) the staged file
+    file_storage.stream = staged
+    return staged
+
+
+class UploadRequest(Request):
+    """
+    The request class of the app that streams the files of uploads
+    directly into HashingFiles in the upload storage.
+    """
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        if self.url_rule is not None and self.url_rule.endpoint == UPLOAD_ENDPOINT:
+            return HashingFile()
+        return super()._get_file_stream(
+            total_content_length, content_type, filename, content_length
+        )
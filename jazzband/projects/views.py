@@ -1,12 +1,7 @@
-from datetime import datetime
-import hashlib
 import hmac
 import logging
 import os
-import shutil
-import tempfile
 
-import delegator
 from flask import (
     Blueprint,
     abort,
@@ -16,6 +11,7 @@ from flask import (
     make_response,
     redirect,
     request,
+    send_file,
     send_from_directory,
     url_for,
 )
@@ -24,23 +20,36 @@ from flask_login import current_user, login_required
 
 # Use packaging.utils instead of deprecated pkg_resources
 from packaging.utils import canonicalize_name as safe_name
-from packaging.version import parse as parse_version
-import requests
-from sqlalchemy import desc, nullsfirst, nullslast
 from sqlalchemy.sql.expression import func
-from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 
 from ..account import github
 from ..account.forms import LeaveForm
 from ..auth import current_user_is_roadie
+from ..config import ONE_MINUTE
+from ..db import postgres, redis
 from ..decorators import templated
 from ..exceptions import eject
 from ..members.decorators import member_required
+from ..pagecache import invalidate_pages
+from ..readstore import invalidate_read_store
 from ..tasks import spinach
 from .forms import BulkReleaseForm, DeleteForm, ReleaseForm, UploadForm
-from .models import Project, ProjectMembership, ProjectUpload
-from .tasks import send_new_upload_notifications, update_upload_ordering
+from .index import DEFAULT_ORDER, SORTERS, get_index_projects, invalidate_index
+from .models import (
+    Project,
+    ProjectDetail,
+    ProjectMembership,
+    ProjectReleaseJob,
+    ProjectUpload,
+)
+from .storage import upload_storage
+from .tasks import (
+    release_uploads,
+    send_new_upload_notifications,
+    update_upload_ordering,
+)
+from .uploads import staged_upload
 
 
 projects = Blueprint("projects", __name__, url_prefix="/projects")
@@ -51,18 +60,6 @@ MAX_FILESIZE = 60 * 1024 * 1024  # 60M
 MAX_SIGSIZE = 8 * 1024  # 8K
 SIGNATURE_START = b"-----BEGIN PGP SIGNATURE-----"
 PATH_HASHER = "sha256"
-DEFAULT_SORTER = func.random()
-SORTERS = {
-    "uploads": Project.uploads_count,
-    "members": Project.membership_count,
-    "watchers": Project.subscribers_count,
-    "stargazers": Project.stargazers_count,
-    "forks": Project.forks_count,
-    "issues": Project.open_issues_count,
-    "name": Project.name,
-    "random": DEFAULT_SORTER,
-}
-DEFAULT_ORDER = "desc"
 
 
 @projects.route("")
@@ -75,17 +72,10 @@ def index():
     else:
         sorter = requested_sorter
         initial_sorting = False
-    criterion = SORTERS.get(sorter, DEFAULT_SORTER)
 
     order = request.args.get("order", None)
-    if order == DEFAULT_ORDER:
-        criterion = nullslast(desc(criterion))
-    else:
-        criterion = nullsfirst(criterion)
-
-    projects = Project.query.filter(Project.is_active.is_(True)).order_by(criterion)
     return {
-        "projects": projects,
+        "projects": get_index_projects(sorter, order),
         "sorter": sorter,
         "initial_sorting": initial_sorting,
         "order": order,
@@ -93,18 +83,26 @@ def index():
     }
 
 
+def active_project_query(name):
+    """
+    Query for a project by normalized name (case-insensitive).
+
+    Uses the same PEP 426 normalization as PyPI: lowercase and
+    collapse runs of dots, underscores, and hyphens to a single hyphen.
+    """
+    return Project.query.filter(
+        Project.is_active.is_(True),
+        Project.normalized_name == func.normalize_pep426_name(name),
+    )
+
+
+def project_version_stamp(name):
+    return ProjectDetail.version_stamp(active_project_query(name))
+
+
 class ProjectMixin:
     def project_query(self, name):
-        """
-        Query for a project by normalized name (case-insensitive).
-
-        Uses the same PEP 426 normalization as PyPI: lowercase and
-        collapse runs of dots, underscores, and hyphens to a single hyphen.
-        """
-        return Project.query.filter(
-            Project.is_active.is_(True),
-            Project.normalized_name == func.normalize_pep426_name(name),
-        )
+        return active_project_query(name)
 
     def project_name(self, *args, **kwargs):
         name = kwargs.get("name")
@@ -136,17 +134,15 @@ class DetailView(ProjectMixin, MethodView):
     """
 
     methods = ["GET"]
-    decorators = [templated()]
+    decorators = [templated(etag=project_version_stamp)]
 
     def get(self, name):
-        uploads = self.project.uploads.order_by(
-            ProjectUpload.ordering.desc(), ProjectUpload.version.desc()
-        )
-        versions = {upload.version for upload in uploads}
+        detail = ProjectDetail(self.project)
         return {
             "project": self.project,
-            "uploads": uploads,
-            "versions": sorted(versions, key=parse_version, reverse=True),
+            "detail": detail,
+            "uploads": detail.uploads,
+            "versions": detail.versions,
         }
 
 
@@ -295,89 +291,68 @@ class UploadView(ProjectMixin, MethodView):
         ).scalar():
             eject(400, description="File already exists.")
 
-        # Store file uploads and calculate hashes
-        with tempfile.TemporaryDirectory() as tmpdir:
-            upload_path = os.path.join(tmpdir, upload_filename)
-            upload_data.stream.seek(0)
-            upload_data.save(upload_path)
-
-            # Buffer the entire file onto disk, checking the hash of the file
-            # as we go along.
-            with open(upload_path, "rb") as upload_file:
-                file_hashes = {
-                    "md5": hashlib.md5(),
-                    "sha256": hashlib.sha256(),
-                    "blake2_256": hashlib.blake2b(digest_size=256 // 8),
-                }
-                for chunk in iter(lambda: upload_file.read(8096), b""):
-                    for hasher in file_hashes.values():
-                        hasher.update(chunk)
-
-            # Take our hash functions and compute the final hashes for them
-            # now.
-            file_hashes = {
-                method: file_hash.hexdigest().lower()
-                for method, file_hash in file_hashes.items()
-            }
-
-            # Actually verify the digests that we've gotten. We're going to use
-            # hmac.compare_digest even though we probably don't actually need
-            # to because it's better safe than sorry. In the case of multiple
-            # digests we expect them all to be given.
-            hash_comparisons = [
-                hmac.compare_digest(
-                    getattr(form, "%s_digest" % digest_name).data.lower(), digest_value
-                )
-                for digest_name, digest_value in file_hashes.items()
-                if getattr(form, "%s_digest" % digest_name).data
-            ]
-            if not all(hash_comparisons):
-                eject(
-                    400,
-                    description="The digest supplied does not match a digest "
-                    "calculated from the uploaded file.",
-                )
-
-            # Also buffer the entire signature file to disk.
-            signature = form.gpg_signature.data
-            signature_filename = upload_filename + ".asc"
-            if signature:
-                signature_path = os.path.join(tmpdir, signature_filename)
-                signature.stream.seek(0)
-                signature.save(signature_path)
-                if os.path.getsize(signature_path) > MAX_SIGSIZE:
-                    eject(400, description="Signature too large.")
-
-                # Check whether signature is ASCII armored
-                with open(signature_path, "rb") as signature_file:
-                    if not signature_file.read().startswith(SIGNATURE_START):
-                        eject(400, description="PGP signature is not ASCII armored.")
-
-            version = form.version.data
-            upload = ProjectUpload(
-                version=version,
-                project=self.project,
-                # e.g. acme/2coffee12345678123123123123123123
-                path=safe_join(self.project.name, file_hashes[PATH_HASHER]),
-                filename=upload_filename,
-                size=os.path.getsize(upload_path),
-                md5_digest=file_hashes["md5"],
-                sha256_digest=file_hashes["sha256"],
-                blake2_256_digest=file_hashes["blake2_256"],
-                form_data=request.form,
-                user_agent=request.user_agent.string,
-                remote_addr=request.remote_addr,
+        # The file has been hashed while it was written into the incoming
+        # directory of the upload storage, so take the final hashes now.
+        upload_file = staged_upload(upload_data)
+        file_hashes = upload_file.hexdigests()
+
+        # Actually verify the digests that we've gotten. We're going to use
+        # hmac.compare_digest even though we probably don't actually need
+        # to because it's better safe than sorry. In the case of multiple
+        # digests we expect them all to be given.
+        hash_comparisons = [
+            hmac.compare_digest(
+                getattr(form, "%s_digest" % digest_name).data.lower(), digest_value
+            )
+            for digest_name, digest_value in file_hashes.items()
+            if getattr(form, "%s_digest" % digest_name).data
+        ]
+        if not all(hash_comparisons):
+            eject(
+                400,
+                description="The digest supplied does not match a digest "
+                "calculated from the uploaded file.",
             )
 
-            # make the storage path directory /app/uploads/acme
-            os.makedirs(os.path.dirname(upload.full_path), exist_ok=True)
-            # move the uploaded file to storage path directory
-            shutil.move(upload_path, upload.full_path)
-            # copy the uploaded signature file to storage path directory
-            if signature:
-                shutil.move(signature_path, upload.full_path + ".asc")
-            # write to database
-            upload.save()
+        signature = form.gpg_signature.data
+        if signature:
+            signature_file = staged_upload(signature)
+            if signature_file.size > MAX_SIGSIZE:
+                eject(400, description="Signature too large.")
+
+            # Check whether signature is ASCII armored
+            signature_file.seek(0)
+            if not signature_file.read(len(SIGNATURE_START)) == SIGNATURE_START:
+                eject(400, description="PGP signature is not ASCII armored.")
+
+        version = form.version.data
+        upload = ProjectUpload(
+            version=version,
+            project=self.project,
+            # e.g. 2c/of/2coffee12345678123123123123123123
+            path=upload_storage.key(file_hashes[PATH_HASHER]),
+            filename=upload_filename,
+            size=upload_file.size,
+            md5_digest=file_hashes["md5"],
+            sha256_digest=file_hashes["sha256"],
+            blake2_256_digest=file_hashes["blake2_256"],
+            form_data=request.form,
+            user_agent=request.user_agent.string,
+            remote_addr=request.remote_addr,
+        )
+
+        # move the uploaded file into the upload storage
+        upload_storage.store(upload.path, upload_file)
+        # write to database, the signature is stored under the upload id
+        upload.save(commit=False)
+        postgres.session.flush()
+        # and the uploaded signature file next to the file
+        if signature:
+            upload_storage.store(upload.signature_key, signature_file)
+        postgres.session.commit()
+        invalidate_index()
+        invalidate_pages("projects")
+        invalidate_read_store()
 
         spinach.schedule(send_new_upload_notifications, self.project.id)
         spinach.schedule(update_upload_ordering, self.project.id)
@@ -416,18 +391,59 @@ class UploadDownloadView(UploadMembersActionView):
     methods = ["GET"]
 
     def get(self, name, upload_id):
-        max_age = current_app.get_send_file_max_age(self.upload.full_path)
-        path, filename = os.path.split(self.upload.full_path)
+        # uploads never change, so their sha256 digest is a strong ETag
+        etag = self.upload.sha256_digest.lower()
+        if current_app.config["UPLOAD_DOWNLOAD_MODE"] == "accel-redirect":
+            return self.accel_redirect(etag)
+
+        # with USE_X_SENDFILE the files are sent by the front proxy as well
+        full_path = self.upload.full_path
+        if full_path is None:
+            # the upload storage isn't local, stream the file from it
+            return send_file(
+                upload_storage.open(self.upload.path),
+                mimetype="application/octet-stream",
+                as_attachment=True,
+                download_name=self.upload.filename,
+                etag=etag,
+            )
+        max_age = current_app.get_send_file_max_age(full_path)
+        path, filename = os.path.split(full_path)
+        # conditional responses answer If-None-Match and Range requests
         return send_from_directory(
             path,
             filename,
             max_age=max_age,
             as_attachment=True,
             download_name=self.upload.filename,
-            etag=False,
+            etag=etag,
             conditional=True,
         )
 
+    def accel_redirect(self, etag):
+        """
+        Returns a response without body that has nginx send the upload
+        from its internal location for the upload storage, so the
+        transfer doesn't tie up a worker. nginx also handles Range
+        requests.
+        """
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(mimetype="application/octet-stream")
+            response.headers["X-Accel-Redirect"] = (
+                current_app.config["UPLOAD_ACCEL_REDIRECT_PREFIX"] + self.upload.path
+            )
+            response.headers.set(
+                "Content-Disposition", "attachment", filename=self.upload.filename
+            )
+        response.set_etag(etag)
+        response.cache_control.private = True
+        max_age = current_app.get_send_file_max_age(self.upload.filename)
+        if max_age is not None:
+            response.cache_control.max_age = max_age
+        return response
+
 
 class UploadFormDataView(UploadMembersActionView):
     methods = ["GET"]
@@ -436,162 +452,50 @@ class UploadFormDataView(UploadMembersActionView):
         return jsonify(self.upload.form_data)
 
 
-class UploadReleaseView(UploadLeadsActionView):
-    methods = ["GET", "POST"]
-    decorators = UploadLeadsActionView.decorators + [templated()]
-
-    def validate_upload(self, timeout=10):
-        """
-        Validate upload against PyPI API.
-        Returns (success, errors, warnings) tuple.
-
-        Strategy: Treat CDN propagation delays and temporary network issues as
-        warnings rather than blocking errors, while still catching real problems.
-        """
-        errors = []
-        warnings = []
+def enqueue_release(project, uploads, version):
+    """
+    Records a release job for the given uploads and hands it to the
+    release_uploads task, then redirects to the page showing its progress.
 
-        try:
-            # Add timeout to prevent hanging on slow CDN responses
-            pypi_response = requests.get(
-                self.upload.project.pypi_json_url, timeout=timeout
-            )
-            pypi_response.raise_for_status()
-            data = pypi_response.json()
-
-        except requests.exceptions.Timeout:
-            # CDN or network timeout - don't block release
-            warning = (
-                f"Validation timed out after {timeout}s. This might be due to CDN "
-                f"propagation delays. The upload may still be successful."
-            )
-            logger.warning(warning)
-            warnings.append(warning)
-            return True, [], warnings
-
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                # File not yet available - likely CDN delay
-                warning = (
-                    "File not yet visible on PyPI API. This is likely due to CDN "
-                    "propagation delays and should resolve shortly."
-                )
-                logger.warning(warning)
-                warnings.append(warning)
-                return True, [], warnings
-            else:
-                # Other HTTP errors are more serious
-                error = f"HTTP error {e.response.status_code} while validating upload"
-                logger.error(error, exc_info=True)
-                errors.append(error)
-                return False, errors, warnings
-
-        except requests.exceptions.RequestException:
-            # Network issues - don't block release
-            warning = (
-                "Network error during validation. The upload may still be successful. "
-                "Please verify manually on PyPI if needed."
+    If some of the uploads are already in a release job that hasn't
+    finished yet, e.g. after a double submit, it redirects to that job
+    instead of uploading them a second time. Jobs that haven't finished
+    within their timeout don't count, see ProjectReleaseJob.is_stale.
+    """
+    upload_ids = [upload.id for upload in uploads]
+    with redis.lock(f"release-project-{project.id}", ttl=ONE_MINUTE):
+        job = ProjectReleaseJob.unfinished_for(project.id, upload_ids)
+        if job is not None:
+            flash(f"The upload(s) for version {version} are already being released.")
+            return redirect(
+                url_for("projects.release_job", name=project.name, job_id=job.id)
             )
-            logger.warning(warning)
-            warnings.append(warning)
-            return True, [], warnings
-
-        except ValueError:
-            # JSON parsing error - this is a real problem
-            error = "Error while parsing response from PyPI during validation"
-            logger.error(error, exc_info=True)
-            errors.append(error)
-            return False, errors, warnings
-
+        job = ProjectReleaseJob(
+            project=project,
+            user_id=current_user.id,
+            version=version,
+            upload_ids=upload_ids,
+        ).save()
+        try:
+            spinach.schedule(release_uploads, job.id)
         except Exception:
-            # Unknown errors - don't block release but warn
-            warning = (
-                "Unknown error during validation. The upload may still be successful. "
-                "Please verify manually on PyPI if needed."
+            logger.exception(f"Couldn't schedule release job {job.id}")
+            job.set_status(
+                ProjectReleaseJob.FAILED,
+                errors=["The release couldn't be queued, please try again."],
             )
-            logger.warning(warning, exc_info=True)
-            warnings.append(warning)
-            return True, [], warnings
-
-        # Validation request successful - check the data
-        success, validation_errors, validation_warnings = self._validate_upload_data(
-            data
-        )
-        errors.extend(validation_errors)
-        warnings.extend(validation_warnings)
-
-        # Return success if no real errors (only allow blocking on hash mismatches)
-        return len(errors) == 0, errors, warnings
-
-    def _validate_upload_data(self, data):
-        """
-        Validate the actual upload data from PyPI.
-        Returns (success, errors, warnings) tuple.
-        """
-        errors = []
-        warnings = []
-
-        releases = data.get("releases", {})
-        release_files = releases.get(self.upload.version, [])
-
-        if not release_files:
-            # No files found - likely CDN delay, treat as warning
-            warning = (
-                f"No released files found for version {self.upload.version}. "
-                f"This might be due to CDN propagation delays."
-            )
-            warnings.append(warning)
-            logger.warning(warning)
-            return True, [], warnings
-
-        # Look for our specific file
-        found_file = False
-        for release_file in release_files:
-            release_filename = release_file.get("filename", None)
-            if release_filename is None:
-                continue
-
-            if release_filename == self.upload.filename:
-                found_file = True
-                # Validate file hashes - these are REAL errors if they don't match
-                digests = release_file.get("digests", {})
-                if digests:
-                    md5_digest = digests.get("md5", None)
-                    if md5_digest and md5_digest != self.upload.md5_digest:
-                        error = (
-                            f"MD5 hash of {self.upload.filename} does "
-                            f"not match hash returned by PyPI."
-                        )
-                        errors.append(error)
-                        logger.error(error, extra={"stack": True})
-
-                    sha256_digest = digests.get("sha256", None)
-                    if sha256_digest and sha256_digest != self.upload.sha256_digest:
-                        error = (
-                            f"SHA256 hash of {self.upload.filename} "
-                            f"does not match hash returned by PyPI."
-                        )
-                        errors.append(error)
-                        logger.error(error, extra={"stack": True})
-                else:
-                    # No digests available - warn but don't block
-                    warning = f"No digests available for file {self.upload.filename}"
-                    warnings.append(warning)
-                    logger.warning(warning)
-                break
-
-        if not found_file:
-            # File not visible yet - likely CDN delay, treat as warning
-            warning = (
-                f"File {self.upload.filename} not yet visible in PyPI API. "
-                f"This is likely due to CDN propagation delays."
+            return redirect(
+                url_for("projects.release_job", name=project.name, job_id=job.id)
             )
-            warnings.append(warning)
-            logger.warning(warning)
-            return True, [], warnings
+    message = f"The release of {len(uploads)} upload(s) for version {version} has been queued."
+    flash(message)
+    logger.info(message)
+    return redirect(url_for("projects.release_job", name=project.name, job_id=job.id))
 
-        # If we found the file and no hash errors, validation passed
-        return len(errors) == 0, errors, warnings
+
+class UploadReleaseView(UploadLeadsActionView):
+    methods = ["GET", "POST"]
+    decorators = UploadLeadsActionView.decorators + [templated()]
 
     def post(self, name, upload_id):
         if not current_app.config["RELEASE_ENABLED"]:
@@ -615,51 +519,7 @@ class UploadReleaseView(UploadLeadsActionView):
         }
 
         if release_form.validate_on_submit():
-            # copy path to new tmp directory
-            with tempfile.TemporaryDirectory() as tmpdir:
-                upload_path = os.path.join(tmpdir, self.upload.filename)
-                shutil.copy(self.upload.full_path, upload_path)
-
-                # run twine upload against copied upload file
-                twine_run = delegator.run(f"twine upload {upload_path}")
-
-            if twine_run.return_code == 0:
-                # Validate upload but don't block on warnings
-                validation_success, errors, warnings = self.validate_upload()
-
-                # Add errors to form (these will block release)
-                if errors:
-                    release_form.add_global_error(*errors)
-
-                # Show warnings as flash messages (these won't block)
-                for warning in warnings:
-                    flash(warning, category="warning")
-
-                # Proceed with release if no blocking errors
-                if not errors:
-                    # create ProjectRelease object with reference to project
-                    self.upload.released_at = datetime.utcnow()
-                    # write to database
-                    self.upload.save()
-
-                    if warnings:
-                        message = (
-                            f"You've successfully released {self.upload} to PyPI. "
-                            f"Note: Some validation warnings were encountered (see above)."
-                        )
-                    else:
-                        message = f"You've successfully released {self.upload} to PyPI."
-
-                    flash(message, category="success")
-                    logger.info(message)
-                    return self.redirect_to_project()
-            else:
-                error = f"Release of {self.upload} failed."
-                release_form.add_global_error(error)
-                logger.error(
-                    error, extra={"data": {"out": twine_run.out, "err": twine_run.err}}
-                )
-            context.update({"twine_run": twine_run, "upload": self.upload})
+            return enqueue_release(self.project, [self.upload], self.upload.version)
 
         return context
 
@@ -720,6 +580,9 @@ class UploadDeleteView(UploadLeadsActionView):
 
         if delete_form.validate_on_submit():
             self.upload.delete()
+            invalidate_index()
+            invalidate_pages("projects")
+            invalidate_read_store()
             message = f"You've successfully deleted the upload {self.upload}."
             flash(message)
             logger.info(message)
@@ -728,14 +591,7 @@ class UploadDeleteView(UploadLeadsActionView):
             return context
 
 
-class BulkReleaseView(ProjectMixin, MethodView):
-    """
-    A view to release all uploads of a given version at once.
-    """
-
-    methods = ["GET", "POST"]
-    decorators = [login_required, templated()]
-
+class ProjectLeadsMixin(ProjectMixin):
     def project_query(self, name):
         """Override to include authorization logic for project leads."""
         projects = super().project_query(name)
@@ -745,56 +601,18 @@ class BulkReleaseView(ProjectMixin, MethodView):
             Project.membership.any(user=current_user, is_lead=True),
         )
 
-    def get_unreleased_uploads_for_version(self, version):
-        """Get all unreleased uploads for a specific version."""
-        return self.project.uploads.filter_by(version=version, released_at=None).all()
 
-    def validate_uploads_bulk(self, uploads, timeout=10):
-        """
-        Validate multiple uploads at once.
-        Returns (overall_success, all_errors, all_warnings) tuple.
-        """
-        all_errors = []
-        all_warnings = []
-
-        for upload in uploads:
-            # Create a temporary UploadReleaseView to use its validation logic
-            temp_view = UploadReleaseView()
-            temp_view.upload = upload
-            temp_view.project = self.project
-
-            success, errors, warnings = temp_view.validate_upload(timeout)
-
-            # Prefix errors/warnings with filename for clarity
-            for error in errors:
-                all_errors.append(f"{upload.filename}: {error}")
-            for warning in warnings:
-                all_warnings.append(f"{upload.filename}: {warning}")
-
-        # Overall success if no blocking errors
-        return len(all_errors) == 0, all_errors, all_warnings
-
-    def release_uploads_bulk(self, uploads):
-        """
-        Release multiple uploads using twine.
-        Returns (success, twine_outputs) tuple.
-        """
-        twine_outputs = []
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Copy all files to temp directory
-            upload_paths = []
-            for upload in uploads:
-                upload_path = os.path.join(tmpdir, upload.filename)
-                shutil.copy(upload.full_path, upload_path)
-                upload_paths.append(upload_path)
+class BulkReleaseView(ProjectLeadsMixin, MethodView):
+    """
+    A view to release all uploads of a given version at once.
+    """
 
-            # Run twine upload on all files at once
-            files_arg = " ".join(f'"{path}"' for path in upload_paths)
-            twine_run = delegator.run(f"twine upload {files_arg}")
-            twine_outputs.append(twine_run)
+    methods = ["GET", "POST"]
+    decorators = [login_required, templated()]
 
-        return twine_run.return_code == 0, twine_outputs
+    def get_unreleased_uploads_for_version(self, version):
+        """Get all unreleased uploads for a specific version."""
+        return self.project.uploads.filter_by(version=version, released_at=None).all()
 
     def get(self, name, version):
         if not current_app.config["RELEASE_ENABLED"]:
@@ -847,65 +665,48 @@ class BulkReleaseView(ProjectMixin, MethodView):
         }
 
         if bulk_release_form.validate_on_submit():
-            # Validate all uploads first
-            validation_success, all_errors, all_warnings = self.validate_uploads_bulk(
-                uploads
-            )
-
-            # Add validation errors to form (these will block release)
-            if all_errors:
-                bulk_release_form.add_global_error(*all_errors)
-
-            # Show warnings as flash messages (these won't block)
-            for warning in all_warnings:
-                flash(warning, category="warning")
-
-            # Proceed with bulk release if no blocking errors
-            if not all_errors:
-                # Release all uploads at once
-                release_success, twine_outputs = self.release_uploads_bulk(uploads)
-
-                if release_success:
-                    # Mark all uploads as released
-                    release_time = datetime.utcnow()
-                    released_count = 0
-
-                    for upload in uploads:
-                        upload.released_at = release_time
-                        upload.save()
-                        released_count += 1
-
-                    if all_warnings:
-                        message = (
-                            f"Successfully released {released_count} uploads for version {version} to PyPI. "
-                            f"Note: Some validation warnings were encountered (see above)."
-                        )
-                    else:
-                        message = f"Successfully released {released_count} uploads for version {version} to PyPI."
-
-                    flash(message, category="success")
-                    logger.info(
-                        f"Bulk release successful: {released_count} uploads for {self.project.name} v{version}"
-                    )
-                    return self.redirect_to_project()
-                else:
-                    error = f"Bulk release of version {version} failed."
-                    bulk_release_form.add_global_error(error)
-                    logger.error(
-                        error,
-                        extra={
-                            "data": {
-                                "twine_outputs": [
-                                    output.out for output in twine_outputs
-                                ]
-                            }
-                        },
-                    )
-                    context.update({"twine_outputs": twine_outputs})
+            return enqueue_release(self.project, uploads, version)
 
         return context
 
 
+class ReleaseJobView(ProjectLeadsMixin, MethodView):
+    """
+    A view to follow the progress of a release job.
+    """
+
+    methods = ["GET"]
+    decorators = [login_required, templated()]
+
+    def dispatch_request(self, *args, **kwargs):
+        name = self.project_name(*args, **kwargs)
+        self.project = self.project_query(name).first_or_404()
+        self.job = self.project.release_jobs.filter_by(
+            id=kwargs.get("job_id")
+        ).first_or_404()
+        # don't keep following a job that will never finish
+        self.job.fail_if_stale()
+        return super(ProjectMixin, self).dispatch_request(*args, **kwargs)
+
+    def get(self, name, job_id):
+        return {
+            "project": self.project,
+            "job": self.job,
+            "uploads": self.job.uploads,
+        }
+
+
+class ReleaseJobStatusView(ReleaseJobView):
+    """
+    Returns the progress of a release job as JSON for polling.
+    """
+
+    decorators = [login_required]
+
+    def get(self, name, job_id):
+        return jsonify(self.job.to_dict())
+
+
 # /projects/test-project/1/delete
 projects.add_url_rule(
     "/<name>/upload/<upload_id>/delete", view_func=UploadDeleteView.as_view("delete")
@@ -928,6 +729,15 @@ projects.add_url_rule(
 projects.add_url_rule(
     "/<name>/release/<version>", view_func=BulkReleaseView.as_view("bulk_release")
 )
+# /projects/test-project/releases/1
+projects.add_url_rule(
+    "/<name>/releases/<int:job_id>", view_func=ReleaseJobView.as_view("release_job")
+)
+# /projects/test-project/releases/1/status
+projects.add_url_rule(
+    "/<name>/releases/<int:job_id>/status",
+    view_func=ReleaseJobStatusView.as_view("release_job_status"),
+)
 # /projects/test-project/join
 projects.add_url_rule("/<name>/join", view_func=JoinView.as_view("join"))
 # /projects/test-project/leave
@@ -0,0 +1,317 @@
+import fcntl
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import current_app
+
+from .db import postgres as db
+from .db import redis
+
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "read-store:generation"
+
+SCHEMA = """
+CREATE TABLE meta (generation INTEGER NOT NULL);
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY,
+    login TEXT NOT NULL,
+    avatar_url TEXT,
+    html_url TEXT,
+    is_active_member INTEGER NOT NULL,
+    is_roadie INTEGER NOT NULL
+);
+CREATE TABLE projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    membership_count INTEGER,
+    uploads_count INTEGER,
+    subscribers_count INTEGER,
+    stargazers_count INTEGER,
+    forks_count INTEGER,
+    open_issues_count INTEGER
+);
+CREATE TABLE memberships (
+    user_id INTEGER NOT NULL,
+    project_id INTEGER NOT NULL,
+    is_lead INTEGER NOT NULL
+);
+CREATE INDEX users_active_member ON users (is_active_member);
+CREATE INDEX users_roadie ON users (is_roadie, login);
+CREATE INDEX memberships_project ON memberships (project_id, is_lead);
+"""
+
+# the columns of the projects table, in order
+PROJECT_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "membership_count",
+    "uploads_count",
+    "subscribers_count",
+    "stargazers_count",
+    "forks_count",
+    "open_issues_count",
+)
+
+
+def invalidate_read_store():
+    """
+    Makes every node rebuild its read store after the next read, e.g. after
+    a sync or a webhook changed the reference data.
+    """
+    try:
+        redis.incr(GENERATION_KEY)
+    except Exception:
+        logger.warning("Couldn't invalidate read store", exc_info=True)
+
+
+class ReadStore:
+    """
+    A node-local, read-only copy of the small and slowly changing
+    reference data that nearly every page shows: the active projects and
+    their counters, the active members and roadies and the project
+    memberships.
+
+    The copy is a SQLite database in shared memory (READ_STORE_PATH,
+    /dev/shm by default) that is opened read-only and immutable with
+    memory-mapped I/O, so lookups need neither network round trips nor
+    locks.
+
+    Its generation is compared with the one in Redis at most every
+    READ_STORE_CHECK_INTERVAL seconds. When invalidate_read_store bumped
+    it, a background thread rebuilds the database from Postgres into a
+    temporary file and atomically swaps it in with a rename, in one
+    process per node (guarded by a file lock). Requests don't wait for
+    it but keep reading the stale copy meanwhile, and reopen the file
+    once it was swapped.
+
+    All lookups return None if the store is unavailable, e.g. before it
+    has been built for the first time, so callers can fall back to
+    Postgres.
+
+    The store backs the projects index and the members and roadies
+    pages. The project detail page isn't served from it since it shows
+    the uploads of the project, which ProjectDetail loads from Postgres
+    anyway, together with the members in a constant number of queries.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.checked_at = 0
+        self.generation = 0
+        self.refresh_lock = threading.Lock()
+        self.refresh_thread = None
+
+    @property
+    def path(self):
+        return current_app.config["READ_STORE_PATH"]
+
+    def wanted_generation(self):
+        """
+        Returns the current generation from Redis, checked at most every
+        READ_STORE_CHECK_INTERVAL seconds by this process.
+        """
+        now = time.monotonic()
+        if now - self.checked_at >= current_app.config["READ_STORE_CHECK_INTERVAL"]:
+            try:
+                self.generation = int(redis.get(GENERATION_KEY) or 0)
+            except Exception:
+                logger.warning("Couldn't check read store generation", exc_info=True)
+            self.checked_at = now
+        return self.generation
+
+    def stored_generation(self, connection):
+        return connection.execute("SELECT generation FROM meta").fetchone()[0]
+
+    def connection(self):
+        """
+        Returns a read-only connection to the store of this node for the
+        current thread, or None if there is none yet. Starts rebuilding
+        the store in the background if it's missing or stale.
+        """
+        generation = self.wanted_generation()
+        connection = self.open()
+        if connection is None or self.stored_generation(connection) < generation:
+            self.refresh_in_background(generation)
+        return connection
+
+    def refresh_in_background(self, generation):
+        """
+        Starts a thread rebuilding the store unless this process is
+        already running one.
+        """
+        with self.refresh_lock:
+            if self.refresh_thread is not None and self.refresh_thread.is_alive():
+                return
+            self.refresh_thread = threading.Thread(
+                target=self.run_refresh,
+                args=(current_app._get_current_object(), generation),
+                name="read-store-refresh",
+                daemon=True,
+            )
+            self.refresh_thread.start()
+
+    def run_refresh(self, app, generation):
+        with app.app_context():
+            try:
+                self.refresh(generation)
+            except Exception:
+                logger.warning("Couldn't rebuild read store", exc_info=True)
+            finally:
+                db.session.remove()
+
+    def open(self):
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+        if getattr(self.local, "inode", None) != inode:
+            if getattr(self.local, "connection", None) is not None:
+                self.local.connection.close()
+            connection = sqlite3.connect(
+                f"file:{self.path}?mode=ro&immutable=1", uri=True
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA mmap_size = 268435456")
+            self.local.connection = connection
+            self.local.inode = inode
+        return self.local.connection
+
+    def refresh(self, generation):
+        """
+        Rebuilds the store unless another process of this node has just
+        done so while we were waiting for the lock.
+        """
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                connection = self.open()
+                if (
+                    connection is not None
+                    and self.stored_generation(connection) >= generation
+                ):
+                    return
+                self.build(generation, directory)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def load(self):
+        """
+        Loads the reference data from Postgres.
+        """
+        from .members.models import User
+        from .projects.models import Project, ProjectMembership
+
+        active_ids = {user.id for user in User.active_members()}
+        users = [
+            (
+                user.id,
+                user.login,
+                user.avatar_url,
+                user.html_url,
+                user.id in active_ids,
+                bool(user.is_roadie),
+            )
+            for user in User.query.filter(
+                db.or_(User.id.in_(active_ids), User.is_roadie.is_(True))
+            )
+        ]
+        projects = [
+            tuple(row)
+            for row in db.session.execute(
+                db.select(
+                    *[Project.__table__.c[name] for name in PROJECT_COLUMNS]
+                ).where(Project.is_active.is_(True))
+            )
+        ]
+        memberships = [
+            tuple(row)
+            for row in db.session.execute(
+                db.select(
+                    ProjectMembership.user_id,
+                    ProjectMembership.project_id,
+                    ProjectMembership.is_lead,
+                )
+            )
+            if row.user_id in active_ids
+        ]
+        return users, projects, memberships
+
+    def build(self, generation, directory):
+        started_at = time.monotonic()
+        users, projects, memberships = self.load()
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(temp_path)
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.execute("INSERT INTO meta VALUES (?)", (generation,))
+                connection.executemany(
+                    "INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)", users
+                )
+                connection.executemany(
+                    "INSERT INTO projects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    projects,
+                )
+                connection.executemany(
+                    "INSERT INTO memberships VALUES (?, ?, ?)", memberships
+                )
+            connection.close()
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        logger.info(
+            f"Rebuilt read store generation {generation} in "
+            f"{time.monotonic() - started_at:.2f}s"
+        )
+
+    def query(self, sql, params=()):
+        try:
+            connection = self.connection()
+            if connection is None:
+                return None
+            return [dict(row) for row in connection.execute(sql, params)]
+        except Exception:
+            logger.warning("Couldn't read from read store", exc_info=True)
+            return None
+
+    def version(self):
+        """
+        Returns a version stamp of the stored data, or None.
+        """
+        rows = self.query("SELECT generation FROM meta")
+        return None if rows is None else f"store:{rows[0]['generation']}"
+
+    def members(self):
+        return self.query(
+            "SELECT * FROM users WHERE is_active_member ORDER BY random()"
+        )
+
+    def roadies(self):
+        return self.query("SELECT * FROM users WHERE is_roadie ORDER BY login")
+
+    def projects(self, column, descending=False):
+        if column not in PROJECT_COLUMNS:
+            raise ValueError(f"Unknown project column {column}")
+        # sort names case-insensitively like Postgres does
+        collate = " COLLATE NOCASE" if column == "name" else ""
+        if descending:
+            order_by = f"{column}{collate} DESC NULLS LAST"
+        else:
+            order_by = f"{column}{collate} ASC NULLS FIRST"
+        return self.query(f"SELECT * FROM projects ORDER BY {order_by}")
+
+
+read_store = ReadStore()
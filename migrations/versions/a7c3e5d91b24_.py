@@ -0,0 +1,48 @@
+"""Add project release jobs
+
+Revision ID: a7c3e5d91b24
+Revises: f2a9c4e1b7d3
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "a7c3e5d91b24"
+down_revision = "f2a9c4e1b7d3"
+
+
+def upgrade():
+    op.create_table(
+        "project_release_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("version", sa.Text(), nullable=True),
+        sa.Column("upload_ids", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("output", sa.Text(), nullable=True),
+        sa.Column("errors", postgresql.JSONB(), nullable=True),
+        sa.Column("warnings", postgresql.JSONB(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_project_release_jobs_status"),
+        "project_release_jobs",
+        ["status"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_project_release_jobs_status"), table_name="project_release_jobs"
+    )
+    op.drop_table("project_release_jobs")
@@ -0,0 +1,41 @@
+"""Add verification state of released uploads
+
+Revision ID: c4e8b2f07a61
+Revises: a7c3e5d91b24
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4e8b2f07a61"
+down_revision = "a7c3e5d91b24"
+
+
+def upgrade():
+    op.add_column(
+        "project_uploads", sa.Column("verification_status", sa.Text(), nullable=True)
+    )
+    op.add_column(
+        "project_uploads",
+        sa.Column("verification_checked_at", sa.DateTime(), nullable=True),
+    )
+    op.add_column(
+        "project_uploads", sa.Column("verified_at", sa.DateTime(), nullable=True)
+    )
+    op.create_index(
+        op.f("ix_project_uploads_verification_status"),
+        "project_uploads",
+        ["verification_status"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_project_uploads_verification_status"), table_name="project_uploads"
+    )
+    op.drop_column("project_uploads", "verified_at")
+    op.drop_column("project_uploads", "verification_checked_at")
+    op.drop_column("project_uploads", "verification_status")
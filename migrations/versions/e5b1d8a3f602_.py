@@ -0,0 +1,26 @@
+"""Add the upload results of release jobs
+
+Revision ID: e5b1d8a3f602
+Revises: c4e8b2f07a61
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "e5b1d8a3f602"
+down_revision = "c4e8b2f07a61"
+
+
+def upgrade():
+    op.add_column(
+        "project_release_jobs",
+        sa.Column("results", postgresql.JSONB(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("project_release_jobs", "results")
@@ -0,0 +1,38 @@
+"""Add unique constraint for project memberships
+
+Revision ID: f2a9c4e1b7d3
+Revises: d69ef951e45
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f2a9c4e1b7d3"
+down_revision = "d69ef951e45"
+
+
+def upgrade():
+    # remove duplicate memberships first, keeping the oldest one
+    op.execute(
+        """
+        DELETE FROM project_memberships a
+        USING project_memberships b
+        WHERE a.user_id = b.user_id
+        AND a.project_id = b.project_id
+        AND a.id > b.id
+        """
+    )
+    op.create_unique_constraint(
+        "project_memberships_user_id_project_id_key",
+        "project_memberships",
+        ["user_id", "project_id"],
+    )
+
+
+def downgrade():
+    op.drop_constraint(
+        "project_memberships_user_id_project_id_key",
+        "project_memberships",
+        type_="unique",
+    )
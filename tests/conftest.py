@@ -22,7 +22,7 @@ def test_project_name():
 
 
 @pytest.fixture(scope="function")
-def app():
+def app(tmp_path):
     """Flask application fixture."""
     # Set environment variables needed for OAuth testing.
     import os
@@ -45,6 +45,8 @@ def app():
             "WTF_CSRF_ENABLED": False,  # Disable CSRF for testing
             "SESSION_TYPE": "null",  # Use a null session for testing
             "OAUTHLIB_INSECURE_TRANSPORT": "1",  # Allow OAuth over HTTP for testing
+            "READ_STORE_PATH": str(tmp_path / "readstore.sqlite3"),
+            "UPLOAD_ROOT": str(tmp_path / "uploads"),
         }
     )
     return app
@@ -5,12 +5,14 @@ These tests cover the ability to release all uploads of a given version at once,
 as requested in GitHub issue #20.
 """
 
-from datetime import datetime
 from unittest.mock import MagicMock
 
 from flask.views import MethodView
 import pytest
+from requests.exceptions import Timeout
 
+from jazzband.projects.pypi import UploadResult
+from jazzband.projects.releases import BulkRelease
 from jazzband.projects.views import BulkReleaseView, ProjectMixin
 
 
@@ -22,10 +24,14 @@ def bulk_release_view():
     # Create mock project using simple objects
     class MockProject:
         def __init__(self):
+            self.id = 10
             self.name = "test-project"
             self.uploads = MockUploads()
             self.membership = MockMembership()
 
+        def pypi_version_json_url(self, version):
+            return f"https://pypi.org/pypi/test-project/{version}/json"
+
     class MockUploads:
         def filter_by(self, **kwargs):
             return MockQuery()
@@ -44,25 +50,57 @@ def bulk_release_view():
     return view
 
 
+@pytest.fixture
+def bulk_release(bulk_release_view):
+    """Create a BulkRelease for the mock project."""
+    return BulkRelease(bulk_release_view.project)
+
+
 @pytest.fixture
 def mock_uploads():
     """Create mock uploads for testing."""
 
     class MockUpload:
-        def __init__(self, filename, version="1.0.0"):
+        def __init__(self, id, filename, version="1.0.0"):
+            self.id = id
             self.filename = filename
             self.version = version
             self.released_at = None
-            self.full_path = f"/app/uploads/{filename}"
+            self.path = f"ab/cd/{filename}"
             self.save = MagicMock()  # Use MagicMock instead of lambda
 
-    upload1 = MockUpload("test-package-1.0.0.tar.gz")
-    upload2 = MockUpload("test-package-1.0.0-py3-none-any.whl")
-    upload3 = MockUpload("test-package-1.0.0-py2.py3-none-any.whl")
+    upload1 = MockUpload(1, "test-package-1.0.0.tar.gz")
+    upload2 = MockUpload(2, "test-package-1.0.0-py3-none-any.whl")
+    upload3 = MockUpload(3, "test-package-1.0.0-py2.py3-none-any.whl")
 
     return [upload1, upload2, upload3]
 
 
+@pytest.fixture
+def pypi_get(test_app_context, mocker):
+    """Mock the PyPI JSON API listing the given release files."""
+    mocker.patch("jazzband.projects.releases.time.sleep")
+
+    def pypi_get(*release_files):
+        responses = []
+        for files in release_files:
+            response = mocker.MagicMock()
+            response.json.return_value = {"urls": files}
+            responses.append(response)
+        return mocker.patch(
+            "jazzband.projects.releases.requests.get", side_effect=responses
+        )
+
+    return pypi_get
+
+
+def release_file(upload, md5="abc", sha256="def"):
+    return {
+        "filename": upload.filename,
+        "digests": {"md5": md5, "sha256": sha256},
+    }
+
+
 def test_get_unreleased_uploads_for_version(bulk_release_view, mock_uploads, mocker):
     """Test getting unreleased uploads for a specific version."""
     # Mock the filter_by chain to return our uploads
@@ -76,118 +114,136 @@ def test_get_unreleased_uploads_for_version(bulk_release_view, mock_uploads, moc
     assert result == mock_uploads
 
 
-def test_validate_uploads_bulk_success(bulk_release_view, mock_uploads, mocker):
-    """Test successful bulk validation with no errors or warnings."""
-    # Mock UploadReleaseView
-    mock_view_class = mocker.patch("jazzband.projects.views.UploadReleaseView")
-    mock_instance = mock_view_class.return_value
-    mock_instance.validate_upload.return_value = (True, [], [])
+def test_validate_uploads_bulk_success(bulk_release, mock_uploads, pypi_get):
+    """Test successful bulk validation with a single request to PyPI."""
+    for upload in mock_uploads:
+        upload.md5_digest, upload.sha256_digest = "abc", "def"
+    get = pypi_get([release_file(upload) for upload in mock_uploads])
 
-    success, errors, warnings = bulk_release_view.validate_uploads_bulk(mock_uploads)
+    success, errors, warnings = bulk_release.validate_uploads_bulk(mock_uploads)
 
     assert success is True
     assert errors == []
     assert warnings == []
-    assert mock_view_class.call_count == len(mock_uploads)
+    get.assert_called_once_with(
+        "https://pypi.org/pypi/test-project/1.0.0/json", timeout=10
+    )
 
 
-def test_validate_uploads_bulk_with_warnings(bulk_release_view, mock_uploads, mocker):
-    """Test bulk validation with warnings that don't block release."""
-    # Mock UploadReleaseView with warnings
-    mock_view_class = mocker.patch("jazzband.projects.views.UploadReleaseView")
-    mock_instance = mock_view_class.return_value
-    mock_instance.validate_upload.return_value = (True, [], ["CDN delay warning"])
+def test_validate_uploads_bulk_polls_until_files_show_up(
+    bulk_release, mock_uploads, mocker, pypi_get
+):
+    """Test that PyPI is polled with a backoff until all files are listed."""
+    sleep = mocker.patch("jazzband.projects.releases.time.sleep")
+    for upload in mock_uploads:
+        upload.md5_digest, upload.sha256_digest = "abc", "def"
+    get = pypi_get(
+        [],
+        [release_file(mock_uploads[0])],
+        [release_file(upload) for upload in mock_uploads],
+    )
 
-    success, errors, warnings = bulk_release_view.validate_uploads_bulk(mock_uploads)
+    success, errors, warnings = bulk_release.validate_uploads_bulk(mock_uploads)
+
+    assert success is True
+    assert warnings == []
+    assert get.call_count == 3
+    assert [call.args for call in sleep.call_args_list] == [(1,), (2,)]
+
+
+def test_validate_uploads_bulk_with_warnings(bulk_release, mock_uploads, pypi_get):
+    """Test that files still missing after polling don't block the release."""
+    get = pypi_get(*[[] for attempt in range(6)])
+
+    success, errors, warnings = bulk_release.validate_uploads_bulk(mock_uploads)
 
     assert success is True
     assert errors == []
+    assert get.call_count == 6
     assert len(warnings) == 3  # One warning per upload
     for i, warning in enumerate(warnings):
         assert mock_uploads[i].filename in warning
-        assert "CDN delay warning" in warning
+        assert "CDN propagation delays" in warning
 
 
-def test_validate_uploads_bulk_with_errors(bulk_release_view, mock_uploads, mocker):
+def test_validate_uploads_bulk_with_errors(bulk_release, mock_uploads, pypi_get):
     """Test bulk validation with errors that block release."""
-    # Mock validation to return errors for some uploads
-    call_count = 0
-
-    def mock_validate_upload(timeout):
-        nonlocal call_count
-        call_count += 1
-        if call_count == 1:
-            return False, ["Hash mismatch"], []
-        else:
-            return True, [], ["CDN warning"]
-
-    mock_view_class = mocker.patch("jazzband.projects.views.UploadReleaseView")
-    mock_instance = mock_view_class.return_value
-    mock_instance.validate_upload.side_effect = mock_validate_upload
+    for upload in mock_uploads:
+        upload.md5_digest, upload.sha256_digest = "abc", "def"
+    pypi_get(
+        [release_file(mock_uploads[0], sha256="other")]
+        + [release_file(upload) for upload in mock_uploads[1:]]
+    )
 
-    success, errors, warnings = bulk_release_view.validate_uploads_bulk(mock_uploads)
+    success, errors, warnings = bulk_release.validate_uploads_bulk(mock_uploads)
 
     assert success is False  # Should fail due to errors
-    assert len(errors) == 1
-    assert mock_uploads[0].filename in errors[0]
-    assert "Hash mismatch" in errors[0]
-    assert len(warnings) == 2  # Warnings from other uploads
+    assert errors == [
+        "test-package-1.0.0.tar.gz: SHA256 hash of test-package-1.0.0.tar.gz "
+        "does not match hash returned by PyPI."
+    ]
+    assert warnings == []
 
 
-def test_release_uploads_bulk_success(
-    bulk_release_view, mock_uploads, mocker, tmp_path
+def test_validate_uploads_bulk_unreachable_pypi(
+    test_app_context, bulk_release, mock_uploads, mocker
 ):
-    """Test successful bulk release using twine."""
-    # Mock successful twine command
-    mock_twine_result = mocker.MagicMock()
-    mock_twine_result.return_code = 0
-    mock_delegator_run = mocker.patch(
-        "jazzband.projects.views.delegator.run", return_value=mock_twine_result
-    )
-
-    # Use tmp_path fixture for real temporary directory
-    mocker.patch(
-        "jazzband.projects.views.tempfile.TemporaryDirectory",
-        return_value=mocker.MagicMock(
-            __enter__=mocker.MagicMock(return_value=str(tmp_path))
-        ),
+    """Test that an unreachable PyPI is retried and then only warned about."""
+    mocker.patch("jazzband.projects.releases.time.sleep")
+    get = mocker.patch(
+        "jazzband.projects.releases.requests.get", side_effect=Timeout("slow")
     )
-    mock_shutil_copy = mocker.patch("jazzband.projects.views.shutil.copy")
 
-    success, twine_outputs = bulk_release_view.release_uploads_bulk(mock_uploads)
+    success, errors, warnings = bulk_release.validate_uploads_bulk(mock_uploads)
 
     assert success is True
-    assert len(twine_outputs) == 1
-    assert twine_outputs[0].return_code == 0
-    assert mock_delegator_run.called
-    assert mock_shutil_copy.call_count == len(mock_uploads)
+    assert errors == []
+    assert get.call_count == 6
+    assert len(warnings) == 1
+    assert "couldn't be fetched from PyPI" in warnings[0]
 
 
-def test_release_uploads_bulk_failure(
-    bulk_release_view, mock_uploads, mocker, tmp_path
+def test_validate_uploads_bulk_polling_budget(
+    app, bulk_release, mock_uploads, pypi_get, mocker
 ):
-    """Test failed bulk release."""
-    # Mock failed twine command
-    mock_twine_result = mocker.MagicMock()
-    mock_twine_result.return_code = 1
-    mocker.patch(
-        "jazzband.projects.views.delegator.run", return_value=mock_twine_result
-    )
+    """Test that the polling budget of the release job is configurable."""
+    app.config["RELEASE_VALIDATION_ATTEMPTS"] = 3
+    app.config["RELEASE_VALIDATION_DELAY"] = 5
+    get = pypi_get(*[[]] * 3)
+    sleep = mocker.patch("jazzband.projects.releases.time.sleep")
 
-    # Use tmp_path fixture for real temporary directory
-    mocker.patch(
-        "jazzband.projects.views.tempfile.TemporaryDirectory",
-        return_value=mocker.MagicMock(
-            __enter__=mocker.MagicMock(return_value=str(tmp_path))
-        ),
-    )
-    mocker.patch("jazzband.projects.views.shutil.copy")
+    success, errors, warnings = bulk_release.validate_uploads_bulk(mock_uploads)
+
+    assert success is True
+    assert get.call_count == 3
+    assert [call.args for call in sleep.call_args_list] == [(5,), (10,)]
 
-    success, twine_outputs = bulk_release_view.release_uploads_bulk(mock_uploads)
+
+def test_release_uploads_bulk_success(bulk_release, mock_uploads, mocker):
+    """Test successful bulk release with the in-process uploader."""
+    uploader = mocker.patch("jazzband.projects.releases.get_uploader").return_value
+    uploader.upload_all.return_value = [
+        UploadResult(upload.filename, 200, "OK") for upload in mock_uploads
+    ]
+
+    success, upload_results = bulk_release.release_uploads_bulk(mock_uploads)
+
+    assert success is True
+    assert len(upload_results) == len(mock_uploads)
+    uploader.upload_all.assert_called_once_with(mock_uploads)
+
+
+def test_release_uploads_bulk_failure(bulk_release, mock_uploads, mocker):
+    """Test failed bulk release."""
+    uploader = mocker.patch("jazzband.projects.releases.get_uploader").return_value
+    uploader.upload_all.return_value = [
+        UploadResult(mock_uploads[0].filename, 403, "Forbidden")
+    ]
+
+    success, upload_results = bulk_release.release_uploads_bulk(mock_uploads)
 
     assert success is False
-    assert len(twine_outputs) == 1
-    assert twine_outputs[0].return_code == 1
+    assert [result.status_code for result in upload_results] == [403]
 
 
 def test_get_method_no_uploads_basic(bulk_release_view, mocker):
@@ -211,50 +267,25 @@ def test_get_method_no_uploads_basic(bulk_release_view, mocker):
 
 
 def test_bulk_release_preserves_individual_validation_logic(
-    bulk_release_view, mock_uploads, mocker
+    bulk_release, mock_uploads, mocker, pypi_get
 ):
     """Test that bulk release uses the same validation logic as individual releases."""
-    mock_view_class = mocker.patch("jazzband.projects.views.UploadReleaseView")
+    mock_view_class = mocker.patch("jazzband.projects.releases.UploadValidator")
     mock_instance = mock_view_class.return_value
-    mock_instance.validate_upload.return_value = (True, [], [])
+    mock_instance.validate_upload_data.return_value = (True, [], [])
+    release_files = [release_file(upload) for upload in mock_uploads]
+    pypi_get(release_files)
 
-    bulk_release_view.validate_uploads_bulk(mock_uploads)
+    bulk_release.validate_uploads_bulk(mock_uploads)
 
-    # Should create one UploadReleaseView instance per upload
+    # Should create one UploadValidator instance per upload
     assert mock_view_class.call_count == len(mock_uploads)
 
-    # Verify validate_upload was called for each instance
-    assert mock_instance.validate_upload.call_count == len(mock_uploads)
-
-
-def test_twine_command_construction(bulk_release_view, mock_uploads, mocker, tmp_path):
-    """Test that the twine command is properly constructed for multiple files."""
-    commands_run = []
-
-    def capture_command(cmd):
-        commands_run.append(cmd)
-        mock_result = mocker.MagicMock()
-        mock_result.return_code = 0
-        return mock_result
-
-    mocker.patch("jazzband.projects.views.delegator.run", side_effect=capture_command)
-    mocker.patch(
-        "jazzband.projects.views.tempfile.TemporaryDirectory",
-        return_value=mocker.MagicMock(
-            __enter__=mocker.MagicMock(return_value=str(tmp_path))
-        ),
+    # Verify the single response was checked for each instance
+    mock_instance.validate_upload_data.assert_called_with(
+        {"releases": {"1.0.0": release_files}}
     )
-    mocker.patch("jazzband.projects.views.shutil.copy")
-
-    bulk_release_view.release_uploads_bulk(mock_uploads)
-
-    assert len(commands_run) == 1
-    command = commands_run[0]
-    assert command.startswith("twine upload ")
-
-    # Should contain all filenames
-    for upload in mock_uploads:
-        assert upload.filename in command
+    assert mock_instance.validate_upload_data.call_count == len(mock_uploads)
 
 
 def test_permission_check_logic(test_app_context, bulk_release_view):
@@ -314,11 +345,13 @@ def test_roadie_permission_bypass(test_app_context, bulk_release_view, mocker):
     assert mock_user.is_roadie is True
 
 
-def test_bulk_validation_error_aggregation(bulk_release_view, mock_uploads, mocker):
+def test_bulk_validation_error_aggregation(
+    bulk_release, mock_uploads, mocker, pypi_get
+):
     """Test that bulk validation properly aggregates errors and warnings."""
     call_count = 0
 
-    def mock_validate_upload(timeout):
+    def mock_validate_upload(data):
         nonlocal call_count
         call_count += 1
         if call_count == 1:
@@ -328,11 +361,12 @@ def test_bulk_validation_error_aggregation(bulk_release_view, mock_uploads, mock
         else:
             return True, [], []
 
-    mock_view_class = mocker.patch("jazzband.projects.views.UploadReleaseView")
+    mock_view_class = mocker.patch("jazzband.projects.releases.UploadValidator")
     mock_instance = mock_view_class.return_value
-    mock_instance.validate_upload.side_effect = mock_validate_upload
+    mock_instance.validate_upload_data.side_effect = mock_validate_upload
+    pypi_get([release_file(upload) for upload in mock_uploads])
 
-    success, errors, warnings = bulk_release_view.validate_uploads_bulk(mock_uploads)
+    success, errors, warnings = bulk_release.validate_uploads_bulk(mock_uploads)
 
     assert success is False  # Should fail due to error in first file
     assert len(errors) == 1
@@ -342,49 +376,6 @@ def test_bulk_validation_error_aggregation(bulk_release_view, mock_uploads, mock
     assert "test-package-1.0.0-py3-none-any.whl: File 2 warning" in warnings[1]
 
 
-def test_bulk_release_form_integration(
-    test_app_context, bulk_release_view, mock_uploads, mocker
-):
-    """Test Flask form integration with app context."""
-    # Mock the form creation and validation
-    from jazzband.projects.forms import BulkReleaseForm
-
-    mock_form_class = mocker.patch("jazzband.projects.views.BulkReleaseForm")
-    mock_form = mocker.MagicMock(spec=BulkReleaseForm)
-    mock_form.validate_on_submit.return_value = True
-    mock_form_class.return_value = mock_form
-
-    # Mock flash and datetime
-    mocker.patch("jazzband.projects.views.flash")
-    mock_datetime = mocker.patch("jazzband.projects.views.datetime")
-    mock_datetime.utcnow.return_value = datetime.now()
-
-    # Mock view methods for successful flow
-    bulk_release_view.get_unreleased_uploads_for_version = lambda v: mock_uploads
-    bulk_release_view.validate_uploads_bulk = lambda uploads, timeout=10: (True, [], [])
-    bulk_release_view.release_uploads_bulk = lambda uploads: (
-        True,
-        [mocker.MagicMock()],
-    )
-    bulk_release_view.redirect_to_project = lambda: "redirect"
-
-    # Test that form can be instantiated with Flask context
-    # This tests the actual Flask form instantiation
-    form_instance = mock_form_class()
-    assert form_instance is not None
-
-    # Verify form validation can be called
-    is_valid = form_instance.validate_on_submit()
-    assert is_valid is True
-
-    # Test that the complete flow works with real form objects
-    result = bulk_release_view.post("test-project", "1.0.0")
-
-    assert result == "redirect"
-    # Verify form was created with Flask context
-    mock_form_class.assert_called()
-
-
 # Tests with Flask app context for better coverage
 def test_get_method_release_disabled(test_app_context, bulk_release_view, mocker):
     """Test GET method when RELEASE_ENABLED is False."""
@@ -495,184 +486,111 @@ def test_post_method_form_validation_fails(
     assert result["bulk_release_form"] == mock_form
 
 
-def test_post_method_validation_errors_block_release(
+def test_post_method_enqueues_release_job(
     test_app_context, bulk_release_view, mock_uploads, mocker
 ):
-    """Test POST method when validation errors block the release."""
+    """Test that POST only records a release job and hands it to a task."""
     mocker.patch(
         "jazzband.projects.views.current_app.config", {"RELEASE_ENABLED": True}
     )
-
-    # Mock form validation success
     mock_form_class = mocker.patch("jazzband.projects.views.BulkReleaseForm")
-    mock_form = mocker.MagicMock()
-    mock_form.validate_on_submit.return_value = True
-    mock_form_class.return_value = mock_form
-
+    mock_form_class.return_value.validate_on_submit.return_value = True
+    mock_user = mocker.MagicMock()
+    mock_user.id = 42
+    mocker.patch("jazzband.projects.views.current_user", mock_user)
+    mock_job_class = mocker.patch("jazzband.projects.views.ProjectReleaseJob")
+    mock_job_class.unfinished_for.return_value = None
+    mock_job = mock_job_class.return_value.save.return_value
+    mock_job.id = 7
+    mock_spinach = mocker.patch("jazzband.projects.views.spinach")
+    mock_redis = mocker.patch("jazzband.projects.views.redis")
+    mocker.patch("jazzband.projects.views.flash")
+    mocker.patch("jazzband.projects.views.url_for", return_value="/job")
     bulk_release_view.get_unreleased_uploads_for_version = lambda v: mock_uploads
 
-    # Mock validation with errors
-    bulk_release_view.validate_uploads_bulk = lambda uploads, timeout=10: (
-        False,
-        ["Validation error"],
-        ["Warning"],
-    )
-
-    mock_flash = mocker.patch("jazzband.projects.views.flash")
-
     result = bulk_release_view.post("test-project", "1.0.0")
 
-    assert isinstance(result, dict)
-    assert result["uploads"] == mock_uploads
-    mock_form.add_global_error.assert_called_once_with("Validation error")
-    mock_flash.assert_called_once_with("Warning", category="warning")
-
-
-def test_post_method_release_failure(
-    test_app_context, bulk_release_view, mock_uploads, mocker, caplog
-):
-    """Test POST method when twine upload fails."""
-    mocker.patch(
-        "jazzband.projects.views.current_app.config", {"RELEASE_ENABLED": True}
+    assert result.status_code == 302
+    assert result.location == "/job"
+    mock_job_class.assert_called_once_with(
+        project=bulk_release_view.project,
+        user_id=42,
+        version="1.0.0",
+        upload_ids=[upload.id for upload in mock_uploads],
     )
+    from jazzband.projects.tasks import release_uploads
 
-    # Mock form validation success
-    mock_form_class = mocker.patch("jazzband.projects.views.BulkReleaseForm")
-    mock_form = mocker.MagicMock()
-    mock_form.validate_on_submit.return_value = True
-    mock_form_class.return_value = mock_form
-
-    # Mock failed twine output
-    mock_twine_output = mocker.MagicMock()
-    mock_twine_output.out = "Twine failed"
-
-    bulk_release_view.get_unreleased_uploads_for_version = lambda v: mock_uploads
-    bulk_release_view.validate_uploads_bulk = lambda uploads, timeout=10: (True, [], [])
-    bulk_release_view.release_uploads_bulk = lambda uploads: (
-        False,
-        [mock_twine_output],
-    )
-
-    mock_logger = mocker.patch("jazzband.projects.views.logger")
-
-    result = bulk_release_view.post("test-project", "1.0.0")
-
-    assert isinstance(result, dict)
-    assert result["uploads"] == mock_uploads
-    assert "twine_outputs" in result
-    mock_form.add_global_error.assert_called_once_with(
-        "Bulk release of version 1.0.0 failed."
-    )
-    mock_logger.error.assert_called_once()
+    mock_spinach.schedule.assert_called_once_with(release_uploads, 7)
+    mock_redis.lock.return_value.__enter__.assert_called_once_with()
+    for upload in mock_uploads:
+        assert upload.released_at is None
+        upload.save.assert_not_called()
 
 
-def test_post_method_success_with_warnings(
-    test_app_context, bulk_release_view, mock_uploads, mocker, caplog
+def test_post_method_redirects_to_unfinished_release_job(
+    test_app_context, bulk_release_view, mock_uploads, mocker
 ):
-    """Test successful POST method with warnings."""
+    """Test that a double submit doesn't release the uploads twice."""
     mocker.patch(
         "jazzband.projects.views.current_app.config", {"RELEASE_ENABLED": True}
     )
-
-    # Mock form validation success
     mock_form_class = mocker.patch("jazzband.projects.views.BulkReleaseForm")
-    mock_form = mocker.MagicMock()
-    mock_form.validate_on_submit.return_value = True
-    mock_form_class.return_value = mock_form
-
-    # Mock datetime
-    mock_datetime = mocker.patch("jazzband.projects.views.datetime")
-    release_time = datetime.now()
-    mock_datetime.utcnow.return_value = release_time
-
+    mock_form_class.return_value.validate_on_submit.return_value = True
+    mocker.patch("jazzband.projects.views.current_user", mocker.MagicMock(id=42))
+    mock_job_class = mocker.patch("jazzband.projects.views.ProjectReleaseJob")
+    mock_job_class.unfinished_for.return_value.id = 5
+    mock_spinach = mocker.patch("jazzband.projects.views.spinach")
+    mocker.patch("jazzband.projects.views.redis")
+    mocker.patch("jazzband.projects.views.flash")
+    url_for = mocker.patch("jazzband.projects.views.url_for", return_value="/job")
     bulk_release_view.get_unreleased_uploads_for_version = lambda v: mock_uploads
-    bulk_release_view.validate_uploads_bulk = lambda uploads, timeout=10: (
-        True,
-        [],
-        ["Warning 1", "Warning 2"],
-    )
-    bulk_release_view.release_uploads_bulk = lambda uploads: (
-        True,
-        [mocker.MagicMock()],
-    )
-    bulk_release_view.redirect_to_project = lambda: "redirect_result"
-
-    mock_flash = mocker.patch("jazzband.projects.views.flash")
-    mock_logger = mocker.patch("jazzband.projects.views.logger")
 
     result = bulk_release_view.post("test-project", "1.0.0")
 
-    assert result == "redirect_result"
-
-    # Check that all uploads were marked as released
-    for upload in mock_uploads:
-        assert upload.released_at == release_time
-        upload.save.assert_called()
-
-    # Check flash messages (warnings + success)
-    flash_calls = mock_flash.call_args_list
-    assert len(flash_calls) == 3  # 2 warnings + 1 success
-    assert flash_calls[0][0][0] == "Warning 1"
-    assert flash_calls[1][0][0] == "Warning 2"
-    assert (
-        "Successfully released 3 uploads for version 1.0.0 to PyPI"
-        in flash_calls[2][0][0]
+    assert result.status_code == 302
+    assert result.location == "/job"
+    mock_job_class.unfinished_for.assert_called_once_with(10, [1, 2, 3])
+    url_for.assert_called_once_with(
+        "projects.release_job", name="test-project", job_id=5
     )
-    assert "Some validation warnings were encountered" in flash_calls[2][0][0]
+    mock_job_class.assert_not_called()
+    mock_spinach.schedule.assert_not_called()
 
-    mock_logger.info.assert_called_once_with(
-        "Bulk release successful: 3 uploads for test-project v1.0.0"
-    )
 
-
-def test_post_method_success_no_warnings(
+def test_post_method_fails_job_if_scheduling_fails(
     test_app_context, bulk_release_view, mock_uploads, mocker
 ):
-    """Test successful POST method without warnings."""
+    """Test that a job that couldn't be queued doesn't block the uploads."""
     mocker.patch(
         "jazzband.projects.views.current_app.config", {"RELEASE_ENABLED": True}
     )
-
-    # Mock form validation success
     mock_form_class = mocker.patch("jazzband.projects.views.BulkReleaseForm")
-    mock_form = mocker.MagicMock()
-    mock_form.validate_on_submit.return_value = True
-    mock_form_class.return_value = mock_form
-
-    # Mock datetime
-    mock_datetime = mocker.patch("jazzband.projects.views.datetime")
-    release_time = datetime.now()
-    mock_datetime.utcnow.return_value = release_time
-
-    bulk_release_view.get_unreleased_uploads_for_version = lambda v: mock_uploads
-    bulk_release_view.validate_uploads_bulk = lambda uploads, timeout=10: (
-        True,
-        [],
-        [],
-    )  # No warnings
-    bulk_release_view.release_uploads_bulk = lambda uploads: (
-        True,
-        [mocker.MagicMock()],
+    mock_form_class.return_value.validate_on_submit.return_value = True
+    mocker.patch("jazzband.projects.views.current_user", mocker.MagicMock(id=42))
+    mock_job_class = mocker.patch("jazzband.projects.views.ProjectReleaseJob")
+    mock_job_class.unfinished_for.return_value = None
+    mock_job = mock_job_class.return_value.save.return_value
+    mock_job.id = 7
+    calls = []
+
+    def schedule(*args):
+        calls.append("schedule")
+        raise ConnectionError
+
+    mock_spinach = mocker.patch("jazzband.projects.views.spinach")
+    mock_spinach.schedule.side_effect = schedule
+    mock_redis = mocker.patch("jazzband.projects.views.redis")
+    mock_redis.lock.return_value.__exit__.side_effect = lambda *args: calls.append(
+        "unlock"
     )
-    bulk_release_view.redirect_to_project = lambda: "redirect_result"
-
-    mock_flash = mocker.patch("jazzband.projects.views.flash")
-    mock_logger = mocker.patch("jazzband.projects.views.logger")
+    mocker.patch("jazzband.projects.views.flash")
+    mocker.patch("jazzband.projects.views.url_for", return_value="/job")
+    bulk_release_view.get_unreleased_uploads_for_version = lambda v: mock_uploads
 
     result = bulk_release_view.post("test-project", "1.0.0")
 
-    assert result == "redirect_result"
-
-    # Check that all uploads were marked as released
-    for upload in mock_uploads:
-        assert upload.released_at == release_time
-        upload.save.assert_called()
-
-    # Check flash message (no warnings mentioned)
-    mock_flash.assert_called_once_with(
-        "Successfully released 3 uploads for version 1.0.0 to PyPI.", category="success"
-    )
-
-    mock_logger.info.assert_called_once_with(
-        "Bulk release successful: 3 uploads for test-project v1.0.0"
-    )
+    assert result.location == "/job"
+    mock_job.set_status.assert_called_once()
+    assert mock_job.set_status.call_args.args == (mock_job_class.FAILED,)
+    # the job is scheduled while the lock is held
+    assert calls == ["schedule", "unlock"]
@@ -256,3 +256,75 @@ def test_templated_decorator_with_complex_template_context(app, mocker):
         }
         mock_render.assert_called_once_with("test_template.html", **expected_context)
         assert result == "rendered content"
+
+
+def test_templated_decorator_with_etag(app, mocker):
+    """Test templated decorator sets an ETag built from the version stamp."""
+    from jazzband.decorators import templated
+
+    view = mocker.MagicMock(return_value={"key": "value"})
+    mocker.patch("jazzband.decorators.render_template", return_value="rendered")
+    test_view = templated("test_template.html", etag=lambda: "v1")(view)
+
+    with app.test_request_context():
+        response = test_view()
+
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert etag
+    assert not weak
+    view.assert_called_once_with()
+
+
+def test_templated_decorator_answers_not_modified(app, mocker):
+    """Test templated decorator returns 304 without running the view."""
+    from jazzband.decorators import templated
+
+    view = mocker.MagicMock(return_value={"key": "value"})
+    render = mocker.patch(
+        "jazzband.decorators.render_template", return_value="rendered"
+    )
+    test_view = templated("test_template.html", etag=lambda name: name)(view)
+
+    with app.test_request_context():
+        etag, _ = test_view(name="v1").get_etag()
+    with app.test_request_context(headers={"If-None-Match": f'"{etag}"'}):
+        response = test_view(name="v1")
+    with app.test_request_context(headers={"If-None-Match": f'"{etag}"'}):
+        changed = test_view(name="v2")
+
+    assert response.status_code == 304
+    assert response.get_etag() == (etag, False)
+    assert changed.status_code == 200
+    assert view.call_count == 2
+    assert render.call_count == 2
+
+
+def test_templated_decorator_etag_varies_by_user(app, mocker):
+    """Test that logged-in users get a different ETag than anonymous ones."""
+    from jazzband.decorators import make_etag
+
+    user = mocker.patch("jazzband.decorators.current_user")
+    with app.test_request_context():
+        user.is_authenticated = False
+        anonymous = make_etag("test_template.html", "v1")
+        user.is_authenticated = True
+        user.get_id.return_value = "1"
+        logged_in = make_etag("test_template.html", "v1")
+
+    assert anonymous != logged_in
+
+
+def test_templated_decorator_etag_varies_by_app_version(app, mocker):
+    """Test that a deploy changes the ETag even if the data didn't change."""
+    from jazzband.decorators import make_etag
+
+    user = mocker.patch("jazzband.decorators.current_user")
+    user.is_authenticated = False
+    with app.test_request_context():
+        app.config["APP_VERSION"] = "abc123"
+        before = make_etag("test_template.html", "v1")
+        app.config["APP_VERSION"] = "def456"
+        after = make_etag("test_template.html", "v1")
+
+    assert before != after
@@ -30,6 +30,14 @@ def test_rate_limit_with_non_json_response(mock_response):
     assert exception.response == response
 
 
+def test_rate_limit_with_message():
+    """Test RateLimit exception raised without a response."""
+    exception = RateLimit(message="Only the reserve is left")
+
+    assert str(exception) == "Only the reserve is left"
+    assert exception.response is None
+
+
 def test_rate_limit_with_fallback_response(mock_response):
     """Test RateLimit exception falls back to response object when no content."""
     response = mock_response(json_error=True, has_content=False)
@@ -0,0 +1,137 @@
+"""
+Tests for the conditional request cache of the GitHub sessions.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from jazzband.account.blueprint import GitHubSessionMixin
+from jazzband.account.httpcache import GitHubResponseCache
+
+
+class FakeRedis:
+    """A tiny in-memory stand-in for the Redis hash commands used."""
+
+    def __init__(self):
+        self.data = {}
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update(
+            {
+                name.encode(): value if isinstance(value, bytes) else value.encode()
+                for name, value in mapping.items()
+            }
+        )
+
+    def hincrby(self, key, name, amount):
+        values = self.data.setdefault(key, {})
+        values[name.encode()] = int(values.get(name.encode(), 0)) + amount
+
+    def expire(self, key, timeout):
+        pass
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    fake = FakeRedis()
+    mocker.patch("jazzband.account.httpcache.redis", fake)
+    return fake
+
+
+def make_response(status_code, content=b"", headers=None, url="page1"):
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.url = url
+    response.encoding = "utf-8"
+    return response
+
+
+@pytest.fixture
+def session_factory():
+    def create(responses):
+        class BaseSession:
+            def __init__(self):
+                self.sent_headers = []
+
+            def request(self, method, url, data=None, headers=None, **kwargs):
+                self.sent_headers.append(headers)
+                return responses.pop(0)
+
+        class TestSession(GitHubSessionMixin, BaseSession):
+            response_cache = GitHubResponseCache()
+
+        return TestSession()
+
+    return create
+
+
+def test_cache_replays_not_modified_response(
+    test_app_context, fake_redis, session_factory
+):
+    """Test that a 304 response is answered with the cached body."""
+    session = session_factory(
+        [
+            make_response(200, b'[{"id": 1}]', {"ETag": '"abc"'}),
+            make_response(304, headers={"X-RateLimit-Remaining": "4999"}),
+        ]
+    )
+
+    first = session.request("GET", "page1")
+    second = session.request("GET", "page1")
+
+    assert first.json() == [{"id": 1}]
+    assert second.status_code == 200
+    assert second.json() == [{"id": 1}]
+    assert second.headers["X-RateLimit-Remaining"] == "4999"
+    assert session.sent_headers[0] is None
+    assert session.sent_headers[1] == {"If-None-Match": '"abc"'}
+    assert session.response_cache.stats() == {"hits": 1, "misses": 1, "ratio": 0.5}
+
+
+def test_cache_replays_pagination(test_app_context, fake_redis, session_factory):
+    """Test that cached pages keep their Link header for pagination."""
+    link = '<page2>; rel="next"'
+    session = session_factory(
+        [
+            make_response(200, b"[1]", {"ETag": '"p1"', "Link": link}),
+            make_response(200, b"[2]", {"ETag": '"p2"'}, url="page2"),
+            make_response(304),
+            make_response(304),
+        ]
+    )
+
+    assert session.request("GET", "page1", all_pages=True) == [1, 2]
+    assert session.request("GET", "page1", all_pages=True) == [1, 2]
+    assert session.sent_headers[3] == {"If-None-Match": '"p2"'}
+
+
+def test_cache_ignores_other_methods(test_app_context, fake_redis, session_factory):
+    """Test that only GET requests are cached."""
+    session = session_factory([make_response(200, b"{}", {"ETag": '"abc"'})])
+
+    session.request("POST", "page1")
+
+    assert fake_redis.data == {}
+
+
+def test_cache_survives_redis_errors(test_app_context, mocker, session_factory):
+    """Test that requests still work when Redis is unavailable."""
+    broken_redis = MagicMock()
+    broken_redis.hgetall.side_effect = ConnectionError
+    broken_redis.hset.side_effect = ConnectionError
+    broken_redis.hincrby.side_effect = ConnectionError
+    mocker.patch("jazzband.account.httpcache.redis", broken_redis)
+    session = session_factory([make_response(200, b"[]", {"ETag": '"abc"'})])
+
+    assert session.request("GET", "page1").json() == []
@@ -0,0 +1,147 @@
+"""
+Tests for loading the org repositories and their watcher counts from GitHub.
+"""
+
+from unittest.mock import MagicMock
+
+from jazzband.account.blueprint import GitHubBlueprint, GitHubSessionMixin
+
+
+def graphql_response(data):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {"data": data}
+    return response
+
+
+def test_get_watcher_counts_batches_repositories(github_blueprint, github_org_name):
+    """Test that watcher counts are loaded in batches via GraphQL."""
+    blueprint, mock_admin_session = github_blueprint
+    mock_admin_session.post.side_effect = [
+        graphql_response(
+            {
+                "repo0": {"watchers": {"totalCount": 10}},
+                "repo1": {"watchers": {"totalCount": 20}},
+            }
+        ),
+        graphql_response({"repo0": {"watchers": {"totalCount": 30}}}),
+    ]
+
+    result = GitHubBlueprint.get_watcher_counts(
+        blueprint, ["one", "two", "three"], batch_size=2
+    )
+
+    assert result == {"one": 10, "two": 20, "three": 30}
+    assert mock_admin_session.post.call_count == 2
+    url = mock_admin_session.post.call_args_list[0][0][0]
+    payload = mock_admin_session.post.call_args_list[0][1]["json"]
+    assert url == "graphql"
+    assert payload["variables"] == {
+        "owner": github_org_name,
+        "name0": "one",
+        "name1": "two",
+    }
+    assert "repo1: repository(owner: $owner, name: $name1)" in payload["query"]
+
+
+def test_get_watcher_counts_skips_failed_batches(github_blueprint):
+    """Test that a failing GraphQL batch leaves its repositories out."""
+    blueprint, mock_admin_session = github_blueprint
+    mock_admin_session.post.side_effect = Exception("Bad gateway")
+
+    result = GitHubBlueprint.get_watcher_counts(blueprint, ["one", "two"])
+
+    assert result == {}
+
+
+def wire_watcher_counts(blueprint):
+    blueprint.add_watcher_counts = lambda projects, batched=True: (
+        GitHubBlueprint.add_watcher_counts(blueprint, projects, batched=batched)
+    )
+
+
+def test_get_projects_falls_back_to_rest(github_blueprint, github_org_name):
+    """Test that repositories missing from the batch are counted via REST."""
+    blueprint, mock_admin_session = github_blueprint
+    wire_watcher_counts(blueprint)
+    mock_admin_session.get.return_value = [{"name": "one"}, {"name": "two"}]
+    blueprint.get_watcher_counts.return_value = {"one": 5}
+    blueprint.get_watcher_count.return_value = 7
+
+    result = GitHubBlueprint.get_projects(blueprint)
+
+    assert [project["subscribers_count"] for project in result] == [5, 7]
+    blueprint.get_watcher_counts.assert_called_once_with(["one", "two"])
+    blueprint.get_watcher_count.assert_called_once_with("two")
+
+
+def test_get_projects_unbatched(github_blueprint):
+    """Test that the unbatched mode counts every repository via REST."""
+    blueprint, mock_admin_session = github_blueprint
+    wire_watcher_counts(blueprint)
+    mock_admin_session.get.return_value = [{"name": "one"}]
+    blueprint.get_watcher_count.return_value = 3
+
+    result = GitHubBlueprint.get_projects(blueprint, batched=False)
+
+    assert result[0]["subscribers_count"] == 3
+    blueprint.get_watcher_counts.assert_not_called()
+
+
+def repos_page(names_and_times, next_url=None):
+    response = MagicMock()
+    response.json.return_value = [
+        {"name": name, "updated_at": updated_at} for name, updated_at in names_and_times
+    ]
+    response.links = {"next": {"url": next_url}} if next_url else {}
+    return response
+
+
+def test_get_updated_projects_stops_at_watermark(github_blueprint, github_org_name):
+    """Test that paging stops at the first repository older than the watermark."""
+    blueprint, mock_admin_session = github_blueprint
+    wire_watcher_counts(blueprint)
+    mock_admin_session.get.side_effect = [
+        repos_page(
+            [("one", "2024-05-03T00:00:00Z"), ("two", "2024-05-02T00:00:00Z")],
+            next_url="page2",
+        ),
+        repos_page(
+            [("three", "2024-05-01T00:00:00Z"), ("four", "2024-04-01T00:00:00Z")],
+            next_url="page3",
+        ),
+    ]
+    blueprint.get_watcher_counts.return_value = {"one": 1, "two": 2, "three": 3}
+
+    result = GitHubBlueprint.get_updated_projects(blueprint, "2024-05-01T00:00:00Z")
+
+    assert [project["name"] for project in result] == ["one", "two", "three"]
+    assert mock_admin_session.get.call_count == 2
+    url = mock_admin_session.get.call_args_list[0][0][0]
+    assert (
+        url == f"orgs/{github_org_name}/repos?type=public&sort=updated&direction=desc"
+    )
+    blueprint.get_watcher_counts.assert_called_once_with(["one", "two", "three"])
+
+
+def test_request_count(app):
+    """Test that every page fetched is counted as a request."""
+
+    class BaseSession:
+        def request(self, method, url, data=None, headers=None, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            if url == "page1":
+                response.json.return_value = [1]
+                response.links = {"next": {"url": "page2"}}
+            else:
+                response.json.return_value = [2]
+                response.links = {}
+            return response
+
+    class TestSession(GitHubSessionMixin, BaseSession):
+        pass
+
+    session = TestSession()
+    assert session.request("GET", "page1", all_pages=True) == [1, 2]
+    assert session.request_count == 2
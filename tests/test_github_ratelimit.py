@@ -0,0 +1,111 @@
+"""
+Tests for the shared rate limit budget of the GitHub admin session.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from jazzband.account.ratelimit import RateLimitBudget
+from jazzband.exceptions import RateLimit
+
+
+@pytest.fixture
+def budget(app):
+    app.config.update(
+        GITHUB_RATELIMIT_RESERVE=1000,
+        GITHUB_RATELIMIT_BURST=10,
+        GITHUB_RATELIMIT_MAX_WAIT=60,
+    )
+    with app.app_context():
+        yield RateLimitBudget()
+
+
+def state(**values):
+    return {name.encode(): str(value).encode() for name, value in values.items()}
+
+
+def test_reserve_token_without_state(budget):
+    """Test that requests aren't delayed before any rate limit is known."""
+    assert budget.reserve_token({}, now=100) == (0, {})
+
+
+def test_reserve_token_from_full_bucket(budget):
+    """Test that a burst of background requests isn't delayed."""
+    wait, new_state = budget.reserve_token(state(remaining=2000, reset=1100), now=100)
+
+    assert wait == 0
+    assert new_state == {"tokens": 9, "timestamp": 100}
+
+
+def test_reserve_token_spreads_requests(budget):
+    """Test that an empty bucket delays until the next token is refilled."""
+    # 1000 requests above the reserve for 1000 seconds is one per second
+    wait, new_state = budget.reserve_token(
+        state(remaining=2000, reset=1100, tokens=-1, timestamp=100), now=100
+    )
+
+    assert wait == 2
+    assert new_state["tokens"] == -2
+
+
+def test_reserve_token_keeps_reserve(budget):
+    """Test that background requests wait for a close reset to spare the reserve."""
+    wait, new_state = budget.reserve_token(state(remaining=900, reset=150), now=100)
+
+    assert wait == 50
+    assert new_state == {}
+
+
+def test_reserve_token_exhausted(budget):
+    """Test that background requests don't use the reserve until a far reset."""
+    with pytest.raises(RateLimit):
+        budget.reserve_token(state(remaining=1000, reset=400), now=100)
+
+
+def test_reserve_token_after_reset(budget):
+    """Test that an outdated state doesn't delay requests."""
+    assert budget.reserve_token(state(remaining=0, reset=50), now=100) == (0, {})
+
+
+def test_acquire_interactive_never_waits(budget, mocker):
+    """Test that interactive requests bypass the budget."""
+    mock_redis = mocker.patch("jazzband.account.ratelimit.redis")
+
+    assert budget.acquire(interactive=True) == 0
+    mock_redis.lock.assert_not_called()
+
+
+def test_acquire_background_waits_at_most_max_wait(budget, mocker):
+    """Test that background requests sleep for the capped wait time."""
+    mock_redis = mocker.patch("jazzband.account.ratelimit.redis")
+    mock_redis.hgetall.return_value = state(remaining=1010, reset=10**10, tokens=-1)
+    sleep = mocker.patch("jazzband.account.ratelimit.time.sleep")
+
+    assert budget.acquire() == 60
+    sleep.assert_called_once_with(60)
+
+
+def test_acquire_background_with_only_the_reserve_left(budget, mocker):
+    """Test that background requests give up instead of using the reserve."""
+    mock_redis = mocker.patch("jazzband.account.ratelimit.redis")
+    mock_redis.hgetall.return_value = state(remaining=1000, reset=10**10)
+    sleep = mocker.patch("jazzband.account.ratelimit.time.sleep")
+
+    with pytest.raises(RateLimit, match="reserve of 1000"):
+        budget.acquire()
+    sleep.assert_not_called()
+    mock_redis.hset.assert_not_called()
+
+
+def test_update_stores_headers(budget, mocker):
+    """Test that the rate limit headers of responses are stored."""
+    mock_redis = mocker.patch("jazzband.account.ratelimit.redis")
+    response = MagicMock()
+    response.headers = {"X-RateLimit-Remaining": "42", "X-RateLimit-Reset": "1234"}
+
+    budget.update(response)
+
+    mock_redis.hset.assert_called_once_with(
+        "github-ratelimit", mapping={"remaining": 42, "reset": 1234}
+    )
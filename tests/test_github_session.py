@@ -5,11 +5,13 @@ These tests focus on the GitHubSessionMixin, GitHubSession, and AdminGitHubSessi
 classes to ensure proper API interaction, rate limit handling, and pagination.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 import pytest
 import requests
 from requests_oauthlib import OAuth2Session
+from urlobject import URLObject
 
 from jazzband.account.blueprint import GitHubSession, GitHubSessionMixin
 from jazzband.exceptions import RateLimit
@@ -189,6 +191,99 @@ def test_pagination_with_dict_response(app):
     assert len(result["items"]) == 3
 
 
+@pytest.fixture
+def paginated_session():
+    """Create a session serving numbered pages of a listing."""
+
+    def create(pages, page_concurrency=4, remaining=5000, body=list):
+        class BaseSession:
+            def __init__(self):
+                self.requested_pages = []
+
+            def request(self, method, url, data=None, headers=None, **kwargs):
+                page = int(URLObject(url).query_dict.get("page", 1))
+                self.requested_pages.append(page)
+                response = MagicMock()
+                response.status_code = 200
+                response.headers = {"X-RateLimit-Remaining": str(remaining)}
+                items = [page * 10, page * 10 + 1]
+                response.json.return_value = (
+                    items if body is list else {"items": items, "total_count": 0}
+                )
+                response.links = {}
+                if page < pages:
+                    response.links = {
+                        "next": {"url": f"https://api/list?page={page + 1}"},
+                        "last": {"url": f"https://api/list?page={pages}"},
+                    }
+                return response
+
+        class TestSession(GitHubSessionMixin, BaseSession):
+            pass
+
+        session = TestSession()
+        session.page_concurrency = page_concurrency
+        return session
+
+    return create
+
+
+def test_concurrent_pagination_keeps_order(app, paginated_session):
+    """Test that concurrently fetched pages are merged in page order."""
+    session = paginated_session(pages=5)
+
+    result = session.request("GET", "https://api/list", all_pages=True)
+
+    assert result == [10, 11, 20, 21, 30, 31, 40, 41, 50, 51]
+    assert sorted(session.requested_pages) == [1, 2, 3, 4, 5]
+    assert session.request_count == 5
+
+
+def test_concurrent_pagination_with_dict_response(app, paginated_session):
+    """Test that items of dict bodies are merged in page order."""
+    session = paginated_session(pages=3, body=dict)
+
+    result = session.request("GET", "https://api/list", all_pages=True)
+
+    assert result["items"] == [10, 11, 20, 21, 30, 31]
+
+
+def test_concurrent_pagination_slows_down_on_low_rate_limit(
+    app, paginated_session, mocker
+):
+    """Test that pages are fetched one by one once the rate limit gets low."""
+    session = paginated_session(pages=6, remaining=10)
+    executor_map = mocker.spy(ThreadPoolExecutor, "map")
+    urls = [f"https://api/list?page={page}" for page in range(2, 7)]
+
+    responses = session.fetch_pages(urls, "GET")
+
+    assert [response.json()[0] for response in responses] == [20, 30, 40, 50, 60]
+    # the first round uses all workers, the following rounds a single one
+    assert [len(call.args[2]) for call in executor_map.call_args_list] == [4, 1]
+
+
+def test_sequential_pagination_on_low_rate_limit(app, paginated_session, mocker):
+    """Test that a low rate limit on the first page disables concurrency."""
+    session = paginated_session(pages=3, remaining=10)
+    fetch_pages = mocker.spy(session, "fetch_pages")
+
+    result = session.request("GET", "https://api/list", all_pages=True)
+
+    assert result == [10, 11, 20, 21, 30, 31]
+    fetch_pages.assert_not_called()
+
+
+def test_sequential_pagination_by_default(app, paginated_session):
+    """Test that pages are followed one by one without concurrency."""
+    session = paginated_session(pages=3, page_concurrency=1)
+
+    result = session.request("GET", "https://api/list", all_pages=True)
+
+    assert result == [10, 11, 20, 21, 30, 31]
+    assert session.requested_pages == [1, 2, 3]
+
+
 @pytest.fixture
 def mock_blueprint():
     """Create a mock blueprint for testing admin sessions."""
@@ -0,0 +1,94 @@
+"""
+Tests for the parallel computation of upload digests.
+"""
+
+import hashlib
+import io
+import os
+
+import pytest
+
+from jazzband.projects.hashing import MultiDigest, hash_file
+
+
+DATA = os.urandom(3 * 1024 * 1024 + 123)
+
+
+def expected_digests(data):
+    return {
+        "md5": hashlib.md5(data).hexdigest(),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "blake2_256": hashlib.blake2b(data, digest_size=32).hexdigest(),
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [8096, 1024 * 1024])
+def test_multi_digest_matches_hashlib(chunk_size):
+    """Test that small and large chunks give the same digests as hashlib."""
+    digest = MultiDigest()
+    view = memoryview(DATA)
+    for start in range(0, len(view), chunk_size):
+        digest.update(view[start : start + chunk_size])
+
+    assert digest.hexdigests() == expected_digests(DATA)
+
+
+def test_multi_digest_hashes_large_chunks_on_worker_threads():
+    """Test that worker threads are only used for large chunks."""
+    digest = MultiDigest(min_parallel_size=1024)
+    digest.update(b"small")
+    assert digest.threads == []
+
+    digest.update(DATA)
+    assert len(digest.threads) == 3
+    threads = digest.threads
+
+    assert digest.hexdigests() == expected_digests(b"small" + DATA)
+    assert digest.threads == []
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_multi_digest_allows_reusing_the_buffer():
+    """Test that update returns only after the chunk has been hashed."""
+    buffer = bytearray(DATA[: 1024 * 1024])
+    digest = MultiDigest()
+    digest.update(buffer)
+    buffer[:] = DATA[1024 * 1024 : 2 * 1024 * 1024]
+    digest.update(buffer)
+
+    assert digest.hexdigests() == expected_digests(DATA[: 2 * 1024 * 1024])
+
+
+def test_hash_file(tmp_path):
+    """Test hashing stored upload files."""
+    path = tmp_path / "upload"
+    path.write_bytes(DATA)
+
+    assert hash_file(path, chunk_size=512 * 1024) == expected_digests(DATA)
+
+
+def test_check_uploads_reads_through_the_storage(app, mocker):
+    """Test that stored files are verified without a local path, e.g. in S3."""
+    from jazzband.cli import check_uploads
+    from jazzband.projects.models import ProjectUpload
+
+    digests = expected_digests(DATA)
+    upload = ProjectUpload(
+        path="ab/cd/abcd",
+        filename="acme-1.0.tar.gz",
+        md5_digest=digests["md5"],
+        sha256_digest=digests["sha256"].upper(),
+        blake2_256_digest="0" * 64,
+    )
+    query = mocker.patch.object(ProjectUpload, "query")
+    query.order_by.return_value = [upload]
+    storage = mocker.MagicMock()
+    storage.open.return_value = io.BytesIO(DATA)
+    mocker.patch("jazzband.cli.upload_storage", storage)
+
+    result = app.test_cli_runner().invoke(check_uploads)
+
+    storage.open.assert_called_once_with("ab/cd/abcd")
+    assert "blake2_256 digest mismatch" in result.output
+    assert "Checked 1 uploads, 1 failed." in result.output
+    assert result.exit_code == 1
@@ -0,0 +1,44 @@
+"""
+Tests for syncing the members of the GitHub organization.
+"""
+
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from jazzband.db import postgres
+from jazzband.members.models import User
+from jazzband.members.tasks import sync_members
+
+
+def test_mark_former_members_single_statement(test_app_context, mocker):
+    """Test that former members are found with an anti-join on the server."""
+    execute = mocker.patch.object(postgres.session, "execute")
+    execute.return_value.scalars.return_value.all.return_value = [3]
+    forget = mocker.patch.object(User, "forget_fingerprints")
+
+    assert User.mark_former_members([1, 2]) == [3]
+
+    execute.assert_called_once()
+    statement = execute.call_args[0][0]
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "NOT (users.id = ANY (%(member_ids)s::INTEGER[]))" in sql
+    assert "users.is_member IS true" in sql
+    assert "RETURNING users.id" in sql
+    assert statement.compile().params["member_ids"] == [1, 2]
+    forget.assert_called_once_with(["3"])
+
+
+def test_sync_members(test_app_context, mocker):
+    """Test that members are upserted and everyone else is marked as former."""
+    mocker.patch("jazzband.members.tasks.redis")
+    github = mocker.patch("jazzband.members.tasks.github", MagicMock())
+    github.get_members.return_value = [{"id": 1}, {"id": 2}]
+    upsert = mocker.patch.object(User, "upsert")
+    mark_former_members = mocker.patch.object(User, "mark_former_members")
+    mocker.patch.object(postgres.session, "commit")
+
+    sync_members()
+
+    upsert.assert_called_once_with([{"id": 1}, {"id": 2}])
+    assert list(mark_former_members.call_args[0][0]) == [1, 2]
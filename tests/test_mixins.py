@@ -6,7 +6,14 @@ These tests cover database mixins and their functionality.
 
 from datetime import datetime
 
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from jazzband import mixins
+from jazzband.db import postgres
+from jazzband.members.models import User
 from jazzband.mixins import Syncable, timestamp_before_update
+from jazzband.projects.models import Project, ProjectMembership
 
 
 def test_timestamp_before_update(mock_target):
@@ -75,3 +82,216 @@ def test_sub_dict_usage_in_sync():
 
     assert result == {"id": 1, "name": "test"}
     assert "extra" not in result
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self.rows
+
+
+@pytest.fixture
+def upsert_connection(test_app_context, mocker):
+    """Capture the upsert statements compiled for PostgreSQL."""
+    statements = []
+    results = []
+
+    class FakeConnection:
+        def execute(self, statement):
+            statements.append(str(statement.compile(dialect=postgresql.dialect())))
+            return FakeResult(results.pop(0) if results else [])
+
+    mocker.patch.object(postgres.session, "connection", return_value=FakeConnection())
+    mocker.patch.object(postgres.session, "execute")
+    mocker.patch("jazzband.mixins.redis", FakeRedis())
+    return statements, results
+
+
+class FakeRedis:
+    """A tiny in-memory stand-in for the Redis hash commands used."""
+
+    def __init__(self):
+        self.data = {}
+
+    def hmget(self, key, fields):
+        values = self.data.get(key, {})
+        return [values.get(field) for field in fields]
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update(
+            {name: str(value).encode() for name, value in mapping.items()}
+        )
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+    def ttl(self, key):
+        return -1
+
+    def expire(self, key, timeout):
+        pass
+
+
+def test_upsert_only_updates_changed_rows(upsert_connection):
+    """Test that the upsert statement skips rows whose values didn't change."""
+    statements, _ = upsert_connection
+
+    User.upsert([{"id": 1, "login": "one", "unknown": True}], commit=False)
+
+    assert len(statements) == 1
+    statement = statements[0]
+    assert "ON CONFLICT (id) DO UPDATE SET login = excluded.login" in statement
+    assert "WHERE users.login IS DISTINCT FROM excluded.login" in statement
+    assert "unknown" not in statement
+
+
+def test_upsert_composite_key_fires_after_insert(upsert_connection, mocker):
+    """Test that after_insert listeners run for inserted memberships only."""
+    statements, results = upsert_connection
+    schedule = mocker.patch("jazzband.projects.tasks.tasks.schedule")
+    update_counts = mocker.patch.object(Project, "update_membership_counts")
+    row = {
+        "id": 5,
+        "user_id": 1,
+        "project_id": 2,
+        "joined_at": None,
+        "is_lead": False,
+        "synced_at": None,
+    }
+    results.append([dict(row, inserted=True), dict(row, id=6, inserted=False)])
+
+    inserted, updated = ProjectMembership.upsert(
+        [{"user_id": 1, "project_id": 2}, {"user_id": 3, "project_id": 2}],
+        key=["user_id", "project_id"],
+        commit=False,
+    )
+
+    assert "ON CONFLICT (user_id, project_id) DO NOTHING" in statements[0]
+    assert [values["id"] for values in inserted] == [5]
+    assert [values["id"] for values in updated] == [6]
+    schedule.assert_called_once()
+    assert schedule.call_args[0][1:] == (1, 2, False)
+    update_counts.assert_called_once_with({2})
+
+
+def test_upsert_batches_rows(upsert_connection, mocker):
+    """Test that large upserts are split into several statements."""
+    statements, _ = upsert_connection
+    mocker.patch("jazzband.mixins.UPSERT_BATCH_SIZE", 2)
+
+    User.upsert([{"id": i, "login": f"user{i}"} for i in range(5)], commit=False)
+
+    assert len(statements) == 3
+
+
+def test_upsert_without_data(upsert_connection):
+    """Test that nothing is sent without data."""
+    statements, _ = upsert_connection
+
+    assert User.upsert([], commit=False) == ([], [])
+    assert statements == []
+
+
+def user_row(**values):
+    row = {column.name: None for column in User.__table__.columns}
+    row.update(values)
+    return row
+
+
+def test_upsert_skips_unchanged_rows(upsert_connection):
+    """Test that rows with a known fingerprint aren't sent again."""
+    statements, results = upsert_connection
+    data = [{"id": 1, "login": "one"}, {"id": 2, "login": "two"}]
+
+    User.upsert(data)
+    User.upsert(data)
+    assert len(statements) == 1
+
+    User.upsert([{"id": 1, "login": "uno"}, {"id": 2, "login": "two"}])
+    assert len(statements) == 2
+
+
+def test_upsert_stores_fingerprints_on_commit(upsert_connection):
+    """Test that fingerprints are only stored once the rows are committed."""
+    statements, _ = upsert_connection
+    data = [{"id": 1, "login": "one"}]
+
+    User.upsert(data, commit=False)
+    assert mixins.redis.data.get("sync-fingerprints:users") is None
+    postgres.session.rollback()
+    User.upsert(data, commit=False)
+    postgres.session.commit()
+    User.upsert(data, commit=False)
+
+    assert len(statements) == 2
+    assert list(mixins.redis.data["sync-fingerprints:users"]) == ["1"]
+
+
+def test_upsert_deduplicates_keys(upsert_connection):
+    """Test that only the last item of a key is sent."""
+    statements, _ = upsert_connection
+
+    User.upsert(
+        [
+            {"id": 1, "login": "one"},
+            {"id": 2, "login": "two"},
+            {"id": 1, "login": "uno"},
+        ]
+    )
+
+    [statement] = statements
+    assert "%(id_m1)s" in statement
+    assert "%(id_m2)s" not in statement
+    fingerprints = mixins.redis.data["sync-fingerprints:users"]
+    assert fingerprints["1"] == mixins.fingerprint({"id": 1, "login": "uno"}).encode()
+
+
+def test_upsert_forgets_fingerprints(upsert_connection):
+    """Test that forgotten rows are sent again by the next upsert."""
+    statements, _ = upsert_connection
+    data = [{"id": 1, "login": "one"}]
+
+    User.upsert(data, commit=False)
+    User.forget_fingerprints(["1"])
+    User.upsert(data, commit=False)
+
+    assert len(statements) == 2
+
+
+def test_upsert_stores_sync_stats(upsert_connection, mocker):
+    """Test that the touched and skipped rows are counted."""
+    _, results = upsert_connection
+    results.append([user_row(id=1, login="one", inserted=False)])
+
+    User.upsert([{"id": 1, "login": "one"}, {"id": 2, "login": "two"}], commit=False)
+
+    stats = mixins.redis.data["sync-stats:users"]
+    assert stats["touched"] == b"1"
+    assert stats["skipped"] == b"1"
+
+
+def test_upsert_survives_redis_errors(upsert_connection, mocker):
+    """Test that every row is sent when Redis is unavailable."""
+    statements, _ = upsert_connection
+    broken_redis = mocker.patch("jazzband.mixins.redis")
+    broken_redis.hmget.side_effect = ConnectionError
+    broken_redis.hset.side_effect = ConnectionError
+
+    User.upsert([{"id": 1, "login": "one"}], commit=False)
+    User.upsert([{"id": 1, "login": "one"}], commit=False)
+
+    assert len(statements) == 2
+
+
+def test_timestamp_before_update_skips_unchanged(mocker):
+    """Test that synced_at isn't bumped when nothing changed."""
+    user = User(id=1, login="one")
+    mocker.patch("jazzband.mixins.has_changes", return_value=False)
+    user.synced_at = None
+
+    timestamp_before_update(None, None, user)
+
+    assert user.synced_at is None
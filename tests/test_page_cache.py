@@ -0,0 +1,60 @@
+"""
+Tests for the server-side page cache for anonymous visitors.
+"""
+
+from cachelib import SimpleCache
+from flask import url_for
+import pytest
+
+from jazzband import pagecache
+
+
+@pytest.fixture
+def page_cache(app, mocker):
+    fake = SimpleCache()
+    mocker.patch("jazzband.pagecache.cache", fake)
+    members = mocker.patch("jazzband.members.views.User")
+    members.roadies.return_value.order_by.return_value.count.return_value = 0
+    return fake, members
+
+
+def test_anonymous_page_is_cached(app, page_cache):
+    """Test that anonymous visitors are served the stored page."""
+    _, members = page_cache
+    with app.test_client() as client:
+        first = client.get(url_for("members.roadies"))
+        second = client.get(url_for("members.roadies"))
+
+    assert first.headers["X-Page-Cache"] == "MISS"
+    assert second.headers["X-Page-Cache"] == "HIT"
+    assert first.data == second.data
+    assert members.roadies.return_value.order_by.call_count == 1
+    assert second.cache_control.public
+    assert second.cache_control.max_age == app.config["PAGE_CACHE_TIMEOUTS"]["members"]
+    assert "Cookie" in second.headers["Vary"]
+
+
+def test_page_cache_skips_visitors_with_session(app, page_cache):
+    """Test that visitors with a login cookie always get a fresh page."""
+    _, members = page_cache
+    with app.test_client() as client:
+        client.get(url_for("members.roadies"))
+        client.set_cookie("remember_token", "abc", domain="jazzband.local")
+        response = client.get(url_for("members.roadies"))
+
+    assert "X-Page-Cache" not in response.headers
+    assert not response.cache_control.public
+    assert members.roadies.return_value.order_by.call_count == 2
+
+
+def test_invalidate_pages(app, page_cache):
+    """Test that invalidating a blueprint renders its pages again."""
+    _, members = page_cache
+    with app.test_client() as client:
+        client.get(url_for("members.roadies"))
+        with app.app_context():
+            pagecache.invalidate_pages("members")
+        response = client.get(url_for("members.roadies"))
+
+    assert response.headers["X-Page-Cache"] == "MISS"
+    assert members.roadies.return_value.order_by.call_count == 2
@@ -0,0 +1,175 @@
+"""
+Tests for the loader of the project detail page.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from jazzband.db import postgres
+from jazzband.projects.models import Project, ProjectDetail
+
+
+@pytest.fixture
+def project_detail(test_app_context, mocker):
+    """Build a ProjectDetail from mocked queries."""
+    mocker.patch("jazzband.projects.models.current_user_is_roadie", return_value=False)
+    project = MagicMock(spec=Project, id=1)
+    uploads = [MagicMock(version="1.0"), MagicMock(version="1.0")]
+    project.uploads.order_by.return_value.all.return_value = uploads
+    lead = MagicMock(id=10)
+    member = MagicMock(id=11)
+    project.all_members.add_columns.return_value.all.return_value = [
+        (lead, True),
+        (member, False),
+    ]
+    execute = mocker.patch.object(postgres.session, "execute")
+    execute.return_value = [("1.0", 2, 1), ("1.10", 1, 0), ("1.9", 3, 3)]
+    return ProjectDetail(project), execute
+
+
+def test_project_detail_counts_versions_in_one_query(project_detail):
+    """Test that the upload counts per version come from one GROUP BY."""
+    detail, execute = project_detail
+
+    assert detail.versions == ["1.10", "1.9", "1.0"]
+    assert detail.version_counts["1.0"] == (2, 1)
+    assert detail.upload_count == 6
+    assert detail.unreleased_count == 4
+    execute.assert_called_once()
+    sql = str(execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert "GROUP BY project_uploads.version" in sql
+    assert "FILTER (WHERE project_uploads.released_at IS NULL)" in sql
+
+
+def test_project_detail_members(project_detail, mocker):
+    """Test that the membership checks use the preloaded members."""
+    detail, _ = project_detail
+    user = mocker.patch("jazzband.projects.models.current_user")
+    user.is_authenticated = True
+    user.id = 11
+
+    assert [lead.id for lead in detail.lead_members] == [10]
+    assert [member.id for member in detail.nonlead_members] == [11]
+    assert detail.current_user_is_member
+    assert not detail.current_user_is_lead
+
+    user.id = 12
+    assert not detail.current_user_is_member
+
+
+def test_project_detail_anonymous(project_detail, mocker):
+    """Test that anonymous users are neither members nor leads."""
+    detail, _ = project_detail
+    user = mocker.patch("jazzband.projects.models.current_user")
+    user.is_authenticated = False
+
+    assert not detail.current_user_is_member
+    assert not detail.current_user_is_lead
+
+
+def test_membership_status_single_exists_query(test_app_context, mocker):
+    """Test that membership and lead status are checked with one EXISTS query."""
+    execute = mocker.patch.object(postgres.session, "execute")
+    execute.return_value.one.return_value = (True, False)
+    project = Project(id=1)
+    user = MagicMock(id=2)
+
+    assert project.user_is_member(user)
+    assert project.membership_status(user) == (True, False)
+
+    execute.assert_called_once()
+    sql = str(execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert sql.count("EXISTS") == 2
+    assert "project_memberships.is_lead IS true" in sql
+
+
+def test_membership_status_cached_per_request(app, mocker):
+    """Test that the membership cache doesn't outlive the request."""
+    execute = mocker.patch.object(postgres.session, "execute")
+    execute.return_value.one.return_value = (False, False)
+    project = Project(id=1)
+    user = MagicMock(id=2)
+
+    # every request gets its own app context and therefore its own g
+    with app.app_context():
+        project.user_is_member(user)
+        project.user_is_member(user)
+    with app.app_context():
+        project.user_is_member(user)
+
+    assert execute.call_count == 2
+
+
+def test_project_detail_primes_membership_cache(test_app_context, mocker):
+    """Test that the detail loader spares the current user's membership query."""
+    user = mocker.patch("jazzband.projects.models.current_user")
+    user.is_authenticated = True
+    user.id = 10
+    project = MagicMock(spec=Project, id=1)
+    project.uploads.order_by.return_value.all.return_value = []
+    project.all_members.add_columns.return_value.all.return_value = [
+        (MagicMock(id=10), True)
+    ]
+
+    ProjectDetail(project)
+    execute = mocker.patch.object(postgres.session, "execute")
+
+    assert Project.membership_status(Project(id=1), user) == (True, True)
+    execute.assert_not_called()
+
+
+def test_version_stamp_single_query(test_app_context, mocker):
+    """Test that the detail page version stamp is loaded with one query."""
+    projects = mocker.MagicMock()
+    projects.with_entities.return_value.first.return_value = (1, "2024-05-01", 3)
+
+    assert ProjectDetail.version_stamp(projects) == "1|2024-05-01|3"
+
+    columns = projects.with_entities.call_args[0]
+    sql = str(
+        postgresql.dialect().statement_compiler(
+            postgresql.dialect(), postgres.select(*columns)
+        )
+    )
+    assert "count(project_uploads.id)" in sql
+    assert "max(project_memberships.synced_at)" in sql
+    assert "max(users.synced_at)" in sql
+    assert "max(project_uploads.verification_checked_at)" in sql
+    assert "project_uploads.verification_status" in sql
+
+
+def test_version_stamp_changes_with_verification(app, mocker):
+    """Test that a verification result changes the ETag of the detail page."""
+    from jazzband.decorators import templated
+    from jazzband.projects.views import project_version_stamp
+
+    projects = mocker.patch("jazzband.projects.views.active_project_query")
+    first = projects.return_value.with_entities.return_value.first
+    mocker.patch("jazzband.decorators.render_template", return_value="rendered")
+    view = templated("projects/detail.html", etag=project_version_stamp)(
+        mocker.MagicMock(return_value={})
+    )
+    # project, uploads (count, uploaded, released, ordering, last
+    # verification check, verified, mismatch, expired) and memberships
+    pending = (1, "s", 2, "u", "r", 1, None, 0, 0, 0, 3, "m", "m")
+    mismatch = (1, "s", 2, "u", "r", 1, "c", 1, 1, 0, 3, "m", "m")
+
+    with app.test_request_context():
+        first.return_value = pending
+        etag, _ = view(name="acme").get_etag()
+    with app.test_request_context(headers={"If-None-Match": f'"{etag}"'}):
+        first.return_value = mismatch
+        response = view(name="acme")
+
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_version_stamp_unknown_project(test_app_context, mocker):
+    """Test that no stamp is returned for unknown projects."""
+    projects = mocker.MagicMock()
+    projects.with_entities.return_value.first.return_value = None
+
+    assert ProjectDetail.version_stamp(projects) is None
@@ -63,7 +63,7 @@ def test_canonical_url_does_not_redirect(app, mocker):
         mock_project.name = "Watson"
         mock_project.is_active = True
         mock_project.uploads = mocker.MagicMock()
-        mock_project.uploads.order_by.return_value = []
+        mock_project.uploads.order_by.return_value.all.return_value = []
 
         mock_query = mocker.MagicMock()
         mock_query.filter.return_value.first_or_404.return_value = mock_project
@@ -1,8 +1,16 @@
-from unittest.mock import patch
+import time
+from unittest.mock import MagicMock, patch
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
-from jazzband.projects.tasks import update_project_by_hook
+from jazzband.db import postgres
+from jazzband.projects.models import Project, ProjectMembership
+from jazzband.projects.tasks import (
+    sync_project_members,
+    sync_projects,
+    update_project_by_hook,
+)
 
 
 @pytest.fixture
@@ -132,3 +140,119 @@ def test_update_project_by_hook_aborts_after_max_retries(
     # The create_team method should not be called here because the function
     # returns early after all retries fail
     # (In this test we're only checking the retry logic for enable_issues)
+
+
+def test_sync_project_members_reconciles_memberships(test_app_context, mocker):
+    """Test that memberships of all teams are upserted and deleted in bulk."""
+    mocker.patch("jazzband.projects.tasks.redis")
+    github = mocker.patch("jazzband.projects.tasks.github", MagicMock())
+    github.get_teams.return_value = [
+        {"slug": "one"},
+        {"slug": "two"},
+        {"slug": "unknown"},
+        {"slug": "broken"},
+    ]
+    members = {"one": [{"id": 1}, {"id": 2}], "two": [{"id": 3}]}
+
+    def get_team_members(slug):
+        if slug == "broken":
+            raise Exception("Bad gateway")
+        return members[slug]
+
+    github.get_team_members.side_effect = get_team_members
+    execute = mocker.patch.object(postgres.session, "execute")
+    execute.return_value.all.return_value = [("one", 10), ("two", 20), ("broken", 30)]
+    mocker.patch.object(postgres.session, "commit")
+    upsert = mocker.patch.object(ProjectMembership, "upsert", return_value=([], []))
+    delete_missing = mocker.patch.object(
+        ProjectMembership, "delete_missing", return_value=[]
+    )
+
+    sync_project_members()
+
+    memberships = [
+        {"user_id": 1, "project_id": 10},
+        {"user_id": 2, "project_id": 10},
+        {"user_id": 3, "project_id": 20},
+    ]
+    upsert.assert_called_once_with(memberships)
+    delete_missing.assert_called_once_with({10, 20}, memberships)
+    assert "unknown" not in [c[0][0] for c in github.get_team_members.call_args_list]
+
+
+def test_delete_missing_memberships_skips_hooks(test_app_context, mocker):
+    """Test that vanished memberships are deleted without the GitHub hooks."""
+    execute = mocker.patch.object(postgres.session, "execute")
+    execute.return_value.mappings.return_value.all.return_value = [
+        {"id": 5, "user_id": 4, "project_id": 10}
+    ]
+    schedule = mocker.patch("jazzband.projects.tasks.tasks.schedule")
+    update_counts = mocker.patch.object(Project, "update_membership_counts")
+    forget = mocker.patch.object(ProjectMembership, "forget_fingerprints")
+
+    deleted = ProjectMembership.delete_missing({10}, [{"user_id": 1, "project_id": 10}])
+
+    assert deleted == [{"id": 5, "user_id": 4, "project_id": 10}]
+    sql = str(execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("DELETE FROM project_memberships")
+    assert "project_memberships.project_id = ANY" in sql
+    assert "(project_memberships.user_id, project_memberships.project_id) NOT IN" in sql
+    schedule.assert_not_called()
+    update_counts.assert_called_once_with({10})
+    forget.assert_called_once_with(["4|10"])
+
+
+@pytest.fixture
+def sync_projects_env(test_app_context, mocker):
+    """Mock GitHub, Redis and the upsert used by sync_projects."""
+    store = {}
+    redis = mocker.patch("jazzband.projects.tasks.redis")
+    redis.get.side_effect = store.get
+    redis.set.side_effect = store.__setitem__
+    github = mocker.patch("jazzband.projects.tasks.github", MagicMock())
+    github.admin_session.request_count = 0
+    upsert = mocker.patch.object(Project, "upsert")
+    return store, github, upsert
+
+
+def test_sync_projects_full_without_watermark(sync_projects_env):
+    """Test that the first sync fetches all repositories."""
+    store, github, upsert = sync_projects_env
+    github.get_projects.return_value = [
+        {"name": "one", "updated_at": "2024-05-01T00:00:00Z"},
+        {"name": "two", "updated_at": "2024-05-03T00:00:00Z"},
+    ]
+
+    sync_projects()
+
+    github.get_updated_projects.assert_not_called()
+    upsert.assert_called_once_with(github.get_projects.return_value)
+    assert store["sync_projects:watermark"] == "2024-05-03T00:00:00Z"
+    assert "sync_projects:full_synced_at" in store
+
+
+def test_sync_projects_incremental(sync_projects_env):
+    """Test that only updated repositories are fetched after a full sync."""
+    store, github, upsert = sync_projects_env
+    store["sync_projects:watermark"] = b"2024-05-03T00:00:00Z"
+    store["sync_projects:full_synced_at"] = str(time.time()).encode()
+    github.get_updated_projects.return_value = []
+
+    sync_projects()
+
+    github.get_projects.assert_not_called()
+    github.get_updated_projects.assert_called_once_with("2024-05-03T00:00:00Z")
+    assert store["sync_projects:watermark"] == b"2024-05-03T00:00:00Z"
+
+
+def test_sync_projects_full_after_interval(sync_projects_env):
+    """Test that a full sync runs again after the configured interval."""
+    store, github, _ = sync_projects_env
+    store["sync_projects:watermark"] = b"2024-05-03T00:00:00Z"
+    store["sync_projects:full_synced_at"] = b"0"
+    github.get_projects.return_value = []
+
+    sync_projects()
+
+    github.get_projects.assert_called_once()
+    github.get_updated_projects.assert_not_called()
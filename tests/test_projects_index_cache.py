@@ -0,0 +1,89 @@
+"""
+Tests for the cached data of the projects index.
+"""
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from jazzband.projects import index
+
+
+class FakeCache:
+    """A tiny in-memory stand-in for the flask_caching cache."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.data[key] = value
+
+    def delete_many(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def index_cache(test_app_context, mocker):
+    fake = FakeCache()
+    mocker.patch("jazzband.projects.index.cache", fake)
+    load = mocker.patch(
+        "jazzband.projects.index.load_index_projects",
+        return_value=[{"name": "one"}, {"name": "two"}, {"name": "three"}],
+    )
+    return fake, load
+
+
+def test_index_projects_cached(index_cache):
+    """Test that the sorted projects are only loaded once."""
+    fake, load = index_cache
+
+    first = index.get_index_projects("stargazers", "desc")
+    second = index.get_index_projects("stargazers", "desc")
+
+    assert first == second
+    load.assert_called_once_with("stargazers", "desc")
+    assert "projects-index:stargazers:desc" in fake.data
+
+
+def test_index_projects_random_uses_cached_list(index_cache):
+    """Test that the random order is shuffled from the cached name list."""
+    _, load = index_cache
+
+    for _ in range(3):
+        projects = index.get_index_projects("random", None)
+        assert sorted(project["name"] for project in projects) == [
+            "one",
+            "three",
+            "two",
+        ]
+
+    load.assert_called_once_with("name", "asc")
+
+
+def test_invalidate_index(index_cache):
+    """Test that invalidating drops every sorted list."""
+    fake, load = index_cache
+    index.get_index_projects("name", "asc")
+    index.get_index_projects("members", "desc")
+
+    index.invalidate_index()
+
+    assert fake.data == {}
+    index.get_index_projects("name", "asc")
+    assert load.call_count == 3
+
+
+def test_load_index_projects_query(test_app_context, mocker):
+    """Test that only the shown columns of active projects are queried."""
+    execute = mocker.patch.object(index.db.session, "execute")
+    execute.return_value.mappings.return_value = [{"name": "one"}]
+
+    assert index.load_index_projects("members", "desc") == [{"name": "one"}]
+
+    sql = str(execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert "WHERE projects.is_active IS true" in sql
+    assert "ORDER BY projects.membership_count DESC NULLS LAST" in sql
+    assert "transfer_issue_url" not in sql
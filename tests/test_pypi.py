@@ -0,0 +1,191 @@
+"""
+Tests for uploading releases to PyPI from within the app.
+
+These tests run the uploader against a local stand-in of the legacy
+upload API of PyPI.
+"""
+
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import os
+import threading
+import zipfile
+
+import pytest
+from werkzeug.wrappers import Request
+
+from jazzband.projects.pypi import PyPIUploader, metadata_fields
+from jazzband.projects.storage import LocalStorage
+
+
+WHEEL_FILENAME = "acme-1.0-py3-none-any.whl"
+METADATA = """\
+Metadata-Version: 2.1
+Name: acme
+Version: 1.0
+Summary: Acme
+Classifier: Framework :: Django
+Classifier: Programming Language :: Python :: 3
+"""
+
+
+def build_wheel():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as wheel:
+        wheel.writestr("acme/__init__.py", "")
+        wheel.writestr("acme-1.0.dist-info/METADATA", METADATA)
+        wheel.writestr(
+            "acme-1.0.dist-info/WHEEL",
+            "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+        )
+        wheel.writestr("acme-1.0.dist-info/RECORD", "")
+    return buffer.getvalue()
+
+
+class UploadEndpoint(BaseHTTPRequestHandler):
+    """
+    A stand-in for the upload API of PyPI that records the uploads and
+    keeps connections alive like PyPI does.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        request = Request.from_values(
+            input_stream=io.BytesIO(body),
+            content_length=len(body),
+            content_type=self.headers["Content-Type"],
+            headers=dict(self.headers),
+            method="POST",
+        )
+        content = request.files["content"]
+        self.server.uploads.append(
+            {
+                "form": request.form,
+                "filename": content.filename,
+                "content": content.read(),
+                "username": request.authorization.username,
+            }
+        )
+        self.server.connections.add(self.client_address)
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), UploadEndpoint)
+    server.uploads = []
+    server.connections = set()
+    server.status = 200
+    server.url = f"http://127.0.0.1:{server.server_port}/legacy/"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def wheel_upload(app, mocker):
+    content = build_wheel()
+    sha256 = hashlib.sha256(content).hexdigest()
+    storage = LocalStorage(app.config["UPLOAD_ROOT"])
+    key = storage.key(sha256)
+    os.makedirs(os.path.dirname(storage.local_path(key)))
+    with open(storage.local_path(key), "wb") as f:
+        f.write(content)
+    mocker.patch("jazzband.projects.pypi.upload_storage", storage)
+
+    upload = mocker.MagicMock()
+    upload.filename = WHEEL_FILENAME
+    upload.path = key
+    upload.sha256_digest = sha256
+    upload.content = content
+    return upload
+
+
+def test_upload_streams_file_with_metadata(endpoint, wheel_upload):
+    """Test that files are uploaded with the metadata twine would send."""
+    uploader = PyPIUploader(endpoint.url, "__token__", "pypi-secret")
+
+    result = uploader.upload(wheel_upload)
+
+    assert result.ok
+    assert str(result) == f"{WHEEL_FILENAME}: 200 OK"
+    [upload] = endpoint.uploads
+    assert upload["filename"] == WHEEL_FILENAME
+    assert upload["content"] == wheel_upload.content
+    assert upload["username"] == "__token__"
+    form = upload["form"]
+    assert form[":action"] == "file_upload"
+    assert form["name"] == "acme"
+    assert form["version"] == "1.0"
+    assert form["filetype"] == "bdist_wheel"
+    assert form["sha256_digest"] == wheel_upload.sha256_digest
+    assert form.getlist("classifiers") == [
+        "Framework :: Django",
+        "Programming Language :: Python :: 3",
+    ]
+
+
+def test_uploads_reuse_connections(endpoint, wheel_upload):
+    """Test that consecutive uploads share a pooled connection."""
+    uploader = PyPIUploader(endpoint.url, "__token__", "pypi-secret")
+
+    results = uploader.upload_all([wheel_upload, wheel_upload])
+
+    assert [result.ok for result in results] == [True, True]
+    assert len(endpoint.uploads) == 2
+    assert len(endpoint.connections) == 1
+
+
+def test_upload_all_stops_at_first_failure(endpoint, wheel_upload):
+    """Test that a rejected upload stops the release like twine does."""
+    endpoint.status = 400
+    uploader = PyPIUploader(endpoint.url, "__token__", "pypi-secret")
+
+    results = uploader.upload_all([wheel_upload, wheel_upload])
+
+    assert len(results) == 1
+    assert not results[0].ok
+    assert str(results[0]) == f"{WHEEL_FILENAME}: 400 Bad Request"
+
+
+def test_upload_rejects_changed_files(endpoint, wheel_upload):
+    """Test that files not matching their digest aren't uploaded."""
+    wheel_upload.sha256_digest = "0" * 64
+    uploader = PyPIUploader(endpoint.url, "__token__", "pypi-secret")
+
+    result = uploader.upload(wheel_upload)
+
+    assert not result.ok
+    assert result.status_code is None
+    assert endpoint.uploads == []
+
+
+def test_metadata_fields_encode_multiple_values():
+    """Test that metadata is encoded the way the upload API parses it."""
+    fields = metadata_fields(
+        {
+            "name": "acme",
+            "keywords": ["jazz", "band"],
+            "classifiers": ["Framework :: Django", "Framework :: Flask"],
+            "project_urls": {"Source": "https://github.com/jazzband/acme"},
+            "comment": None,
+        }
+    )
+
+    assert fields == [
+        ("name", "acme"),
+        ("keywords", "jazz, band"),
+        ("classifiers", "Framework :: Django"),
+        ("classifiers", "Framework :: Flask"),
+        ("project_urls", "Source, https://github.com/jazzband/acme"),
+    ]
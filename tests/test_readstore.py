@@ -0,0 +1,115 @@
+"""
+Tests for the node-local read store of reference data.
+"""
+
+import os
+
+import pytest
+
+from jazzband.readstore import ReadStore
+
+
+USERS = [
+    (1, "alice", None, "https://github.com/alice", True, False),
+    (2, "bob", None, "https://github.com/bob", True, True),
+    (3, "carol", None, "https://github.com/carol", False, True),
+]
+PROJECTS = [
+    (1, "zeta", None, 3, None, 1, 2, 3, 4),
+    (2, "Alpha", "First", None, 7, 5, 6, 7, 8),
+]
+MEMBERSHIPS = [(1, 1, True), (2, 1, False)]
+
+
+@pytest.fixture
+def store(test_app_context, mocker):
+    redis = mocker.patch("jazzband.readstore.redis")
+    redis.get.return_value = b"1"
+    store = ReadStore()
+    load = mocker.patch.object(
+        store, "load", return_value=(USERS, PROJECTS, MEMBERSHIPS)
+    )
+    return store, redis, load
+
+
+def wait_for_refresh(store):
+    store.refresh_thread.join(timeout=5)
+
+
+def test_read_store_built_in_background(store):
+    """Test that the store is built after the first read and reused after."""
+    store, _, load = store
+
+    assert store.roadies() is None
+    wait_for_refresh(store)
+
+    assert [user["login"] for user in store.roadies()] == ["bob", "carol"]
+    assert sorted(user["login"] for user in store.members()) == ["alice", "bob"]
+    assert store.version() == "store:1"
+    load.assert_called_once()
+
+
+def test_read_store_projects_sorted(store):
+    """Test that projects are sorted like in Postgres."""
+    store, _, _ = store
+    store.version()
+    wait_for_refresh(store)
+
+    by_name = store.projects("name")
+    by_uploads = store.projects("uploads_count", descending=True)
+
+    assert [project["name"] for project in by_name] == ["Alpha", "zeta"]
+    assert [project["name"] for project in by_uploads] == ["Alpha", "zeta"]
+    assert store.projects("membership_count")[0]["name"] == "Alpha"
+    with pytest.raises(ValueError):
+        store.projects("name; DROP TABLE projects")
+
+
+def test_read_store_rebuilt_after_invalidation(app, store):
+    """Test that a new generation swaps in a rebuilt store file."""
+    store, redis, load = store
+    store.members()
+    wait_for_refresh(store)
+    inode = os.stat(app.config["READ_STORE_PATH"]).st_ino
+
+    redis.get.return_value = b"2"
+    store.checked_at = 0
+    # the stale copy is served while the store is rebuilt
+    assert store.version() == "store:1"
+    wait_for_refresh(store)
+
+    assert load.call_count == 2
+    assert store.version() == "store:2"
+    assert os.stat(app.config["READ_STORE_PATH"]).st_ino != inode
+
+
+def test_read_store_generation_checked_periodically(store):
+    """Test that Redis is only asked for the generation every few seconds."""
+    store, redis, _ = store
+
+    store.members()
+    store.members()
+
+    assert redis.get.call_count == 1
+
+
+def test_read_store_rebuilt_once_per_process(store, mocker):
+    """Test that concurrent reads don't start more than one rebuild."""
+    store, _, _ = store
+    thread = mocker.patch("jazzband.readstore.threading.Thread")
+    thread.return_value.is_alive.return_value = True
+
+    store.members()
+    store.members()
+
+    thread.return_value.start.assert_called_once_with()
+
+
+def test_read_store_unavailable(store):
+    """Test that lookups return None so callers can use Postgres."""
+    store, _, load = store
+    load.side_effect = ConnectionError
+
+    assert store.members() is None
+    wait_for_refresh(store)
+    assert store.members() is None
@@ -0,0 +1,407 @@
+"""
+Tests for releasing uploads to PyPI in the background.
+
+These tests cover the release_uploads task and the release job record it
+keeps up to date for the release page.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from jazzband.projects.models import Project, ProjectReleaseJob, ProjectUpload
+from jazzband.projects.pypi import UploadResult
+from jazzband.projects.tasks import release_uploads, tasks, verify_uploads
+
+
+@pytest.fixture
+def release_env(test_app_context, mocker):
+    """A queued release job of two uploads with saving mocked out."""
+    project = Project(name="test-project")
+    uploads = [
+        ProjectUpload(id=1, filename="test-project-1.0.tar.gz", version="1.0"),
+        ProjectUpload(
+            id=2, filename="test_project-1.0-py3-none-any.whl", version="1.0"
+        ),
+    ]
+    job = ProjectReleaseJob(
+        id=7,
+        project=project,
+        version="1.0",
+        upload_ids=[1, 2],
+        status=ProjectReleaseJob.QUEUED,
+    )
+    mocker.patch.object(
+        ProjectReleaseJob,
+        "uploads",
+        new_callable=mocker.PropertyMock,
+        return_value=uploads,
+    )
+    mocker.patch("jazzband.projects.tasks.postgres.session.get", return_value=job)
+    uploaded_filenames = mocker.patch.object(
+        ProjectReleaseJob, "uploaded_filenames", return_value=set()
+    )
+    rollback = mocker.patch("jazzband.projects.tasks.postgres.session.rollback")
+
+    statuses = []
+    mocker.patch.object(
+        ProjectReleaseJob, "save", lambda self: statuses.append(self.status)
+    )
+    mocker.patch.object(ProjectUpload, "save")
+
+    bulk_release = mocker.patch("jazzband.projects.tasks.BulkRelease").return_value
+    upload_results = [UploadResult(upload.filename, 200, "OK") for upload in uploads]
+    bulk_release.release_uploads_bulk.return_value = (True, upload_results)
+    bulk_release.validate_uploads_bulk.return_value = (True, [], [])
+    schedule_at = mocker.patch.object(tasks, "schedule_at")
+
+    return {
+        "job": job,
+        "uploads": uploads,
+        "statuses": statuses,
+        "bulk_release": bulk_release,
+        "rollback": rollback,
+        "schedule_at": schedule_at,
+        "uploaded_filenames": uploaded_filenames,
+    }
+
+
+def test_release_job_releases_uploads(release_env):
+    """Test that a successful release walks through all states."""
+    release_env["bulk_release"].validate_uploads_bulk.return_value = (
+        True,
+        [],
+        ["CDN delay"],
+    )
+
+    release_uploads(7)
+
+    job = release_env["job"]
+    assert release_env["statuses"] == ["uploading", "validating", "done"]
+    assert job.output == (
+        "test-project-1.0.tar.gz: 200 OK\ntest_project-1.0-py3-none-any.whl: 200 OK"
+    )
+    assert job.warnings == ["CDN delay"]
+    assert job.started_at is not None
+    assert job.finished_at is not None
+    release_env["bulk_release"].release_uploads_bulk.assert_called_once_with(
+        release_env["uploads"]
+    )
+    released_at = {upload.released_at for upload in release_env["uploads"]}
+    assert len(released_at) == 1
+    assert None not in released_at
+    # the files aren't all visible yet, so they're verified later
+    assert {upload.verification_status for upload in release_env["uploads"]} == {
+        "pending"
+    }
+    release_env["schedule_at"].assert_called_once_with(
+        verify_uploads, released_at.pop() + timedelta(seconds=30), [1, 2]
+    )
+
+
+def test_release_job_verified_uploads(release_env):
+    """Test that uploads found on PyPI right away aren't verified again."""
+    release_uploads(7)
+
+    for upload in release_env["uploads"]:
+        assert upload.verification_status == "verified"
+        assert upload.verified_at == upload.released_at
+    release_env["schedule_at"].assert_not_called()
+
+
+def test_release_job_records_upload_failure(release_env):
+    """Test that a failed upload fails the job with the upload results."""
+    release_env["bulk_release"].release_uploads_bulk.return_value = (
+        False,
+        [UploadResult("test-project-1.0.tar.gz", 403, "Forbidden")],
+    )
+
+    release_uploads(7)
+
+    job = release_env["job"]
+    assert release_env["statuses"] == ["uploading", "failed"]
+    assert job.output == "test-project-1.0.tar.gz: 403 Forbidden"
+    assert job.errors == ["Release of version 1.0 failed."]
+    release_env["bulk_release"].validate_uploads_bulk.assert_not_called()
+    assert all(upload.released_at is None for upload in release_env["uploads"])
+
+
+def test_release_job_records_upload_results(release_env):
+    """Test that the files uploaded before a failure are recorded."""
+    release_env["bulk_release"].release_uploads_bulk.return_value = (
+        False,
+        [
+            UploadResult("test-project-1.0.tar.gz", 200, "OK"),
+            UploadResult("test_project-1.0-py3-none-any.whl", 503, "Unavailable"),
+        ],
+    )
+
+    release_uploads(7)
+
+    assert release_env["job"].results == [
+        {
+            "filename": "test-project-1.0.tar.gz",
+            "status_code": 200,
+            "message": "OK",
+            "skipped": False,
+            "ok": True,
+        },
+        {
+            "filename": "test_project-1.0-py3-none-any.whl",
+            "status_code": 503,
+            "message": "Unavailable",
+            "skipped": False,
+            "ok": False,
+        },
+    ]
+
+
+def test_release_job_skips_already_uploaded_files(release_env):
+    """Test that a retry doesn't upload files a failed job uploaded."""
+    release_env["uploaded_filenames"].return_value = {"test-project-1.0.tar.gz"}
+    sdist, wheel = release_env["uploads"]
+    release_env["bulk_release"].release_uploads_bulk.return_value = (
+        True,
+        [UploadResult(wheel.filename, 200, "OK")],
+    )
+
+    release_uploads(7)
+
+    job = release_env["job"]
+    release_env["uploaded_filenames"].assert_called_once_with(job.project_id, [1, 2])
+    release_env["bulk_release"].release_uploads_bulk.assert_called_once_with([wheel])
+    release_env["bulk_release"].validate_uploads_bulk.assert_called_once_with(
+        [sdist, wheel]
+    )
+    assert release_env["statuses"] == ["uploading", "validating", "done"]
+    assert job.output == (
+        "test-project-1.0.tar.gz: skipped already uploaded\n"
+        "test_project-1.0-py3-none-any.whl: 200 OK"
+    )
+    assert [result["ok"] for result in job.results] == [True, True]
+    assert sdist.released_at is not None
+
+
+def test_release_job_blocked_by_validation_errors(release_env):
+    """Test that digest mismatches keep the uploads unreleased."""
+    release_env["bulk_release"].validate_uploads_bulk.return_value = (
+        False,
+        ["test-project-1.0.tar.gz: SHA256 mismatch"],
+        [],
+    )
+
+    release_uploads(7)
+
+    assert release_env["statuses"] == ["uploading", "validating", "failed"]
+    assert release_env["job"].errors == ["test-project-1.0.tar.gz: SHA256 mismatch"]
+    assert all(upload.released_at is None for upload in release_env["uploads"])
+
+
+def test_release_job_only_runs_once(release_env):
+    """Test that a job that has been started isn't released again."""
+    release_env["job"].status = ProjectReleaseJob.UPLOADING
+
+    release_uploads(7)
+
+    assert release_env["statuses"] == []
+    release_env["bulk_release"].release_uploads_bulk.assert_not_called()
+
+
+def test_release_job_fails_on_unexpected_errors(release_env):
+    """Test that crashes are recorded on the job before being raised."""
+    release_env["bulk_release"].release_uploads_bulk.side_effect = OSError("disk")
+
+    with pytest.raises(OSError):
+        release_uploads(7)
+
+    assert release_env["statuses"] == ["uploading", "failed"]
+    release_env["rollback"].assert_called_once_with()
+    assert release_env["job"].is_finished
+
+
+def test_release_job_to_dict(release_env):
+    """Test the JSON the release page polls."""
+    data = release_env["job"].to_dict()
+
+    assert data["id"] == 7
+    assert data["status"] == "queued"
+    assert data["is_finished"] is False
+    assert data["errors"] == []
+    assert data["started_at"] is None
+
+
+@pytest.fixture
+def verify_env(test_app_context, mocker):
+    """Two released uploads pending verification against PyPI."""
+    project = Project(name="test-project")
+    released_at = datetime.utcnow() - timedelta(minutes=5)
+    uploads = [
+        ProjectUpload(
+            id=id,
+            project=project,
+            filename=filename,
+            version="1.0",
+            md5_digest="abc",
+            sha256_digest="def",
+            released_at=released_at,
+            verification_status=ProjectUpload.VERIFICATION_PENDING,
+        )
+        for id, filename in [
+            (1, "test-project-1.0.tar.gz"),
+            (2, "test_project-1.0-py3-none-any.whl"),
+        ]
+    ]
+    query = mocker.patch.object(ProjectUpload, "query")
+    query.filter.return_value.all.return_value = uploads
+    mocker.patch.object(ProjectUpload, "save")
+    mocker.patch("jazzband.projects.tasks.postgres.session.commit")
+    schedule_at = mocker.patch.object(tasks, "schedule_at")
+    notify = mocker.patch("jazzband.projects.tasks.send_upload_mismatch_notifications")
+    fetch = mocker.patch(
+        "jazzband.projects.tasks.ReleaseValidator.fetch_release_files",
+        return_value=[],
+    )
+    return {
+        "uploads": uploads,
+        "schedule_at": schedule_at,
+        "notify": notify,
+        "fetch": fetch,
+    }
+
+
+def release_file(filename, sha256="def"):
+    return {"filename": filename, "digests": {"md5": "abc", "sha256": sha256}}
+
+
+def test_verify_uploads_marks_matching_uploads_verified(verify_env):
+    """Test that uploads listed with matching digests are verified."""
+    verify_env["fetch"].return_value = [
+        release_file(upload.filename) for upload in verify_env["uploads"]
+    ]
+
+    verify_uploads([1, 2])
+
+    for upload in verify_env["uploads"]:
+        assert upload.verification_status == "verified"
+        assert upload.verified_at == upload.verification_checked_at
+    verify_env["fetch"].assert_called_once_with()
+    verify_env["schedule_at"].assert_not_called()
+    verify_env["notify"].assert_not_called()
+
+
+def test_verify_uploads_retries_with_backoff(verify_env):
+    """Test that missing uploads are checked again with a doubled delay."""
+    verify_env["fetch"].return_value = [release_file("test-project-1.0.tar.gz")]
+
+    verify_uploads([1, 2], attempt=2)
+
+    first, second = verify_env["uploads"]
+    assert first.verification_status == "verified"
+    assert second.verification_status == "pending"
+    [call] = verify_env["schedule_at"].call_args_list
+    assert call.args[0] is verify_uploads
+    assert call.args[1] == second.verification_checked_at + timedelta(seconds=120)
+    assert call.args[2:] == ([2], 3)
+
+
+def test_verify_uploads_gives_up_after_deadline(verify_env):
+    """Test that uploads still missing after the deadline expire."""
+    for upload in verify_env["uploads"]:
+        upload.released_at -= timedelta(hours=1)
+
+    verify_uploads([1, 2])
+
+    for upload in verify_env["uploads"]:
+        assert upload.verification_status == "expired"
+    verify_env["schedule_at"].assert_not_called()
+
+
+def test_verify_uploads_notifies_about_mismatches(verify_env):
+    """Test that the leads are notified about digest mismatches."""
+    first, second = verify_env["uploads"]
+    verify_env["fetch"].return_value = [
+        release_file(first.filename, sha256="tampered"),
+        release_file(second.filename),
+    ]
+
+    verify_uploads([1, 2])
+
+    assert first.verification_status == "mismatch"
+    assert second.verification_status == "verified"
+    [[mismatches]] = verify_env["notify"].call_args.args
+    assert mismatches[0] is first
+    assert "SHA256 hash" in mismatches[1][0]
+
+
+def test_uploaded_filenames_of_failed_jobs(test_app_context, mocker):
+    """Test that only files failed jobs uploaded successfully are returned."""
+    query = mocker.patch.object(ProjectReleaseJob, "query")
+    query.filter.return_value = [
+        ProjectReleaseJob(
+            results=[
+                {"filename": "test-project-1.0.tar.gz", "ok": True},
+                {"filename": "test_project-1.0-py3-none-any.whl", "ok": False},
+            ]
+        ),
+        ProjectReleaseJob(results=None),
+    ]
+
+    uploaded = ProjectReleaseJob.uploaded_filenames(10, [1, 2])
+
+    assert uploaded == {"test-project-1.0.tar.gz"}
+    criteria = [str(criterion) for criterion in query.filter.call_args.args]
+    assert "project_release_jobs.project_id = :project_id_1" in criteria
+    assert "project_release_jobs.upload_ids && :upload_ids_1" in criteria
+
+
+def test_unfinished_for_finds_overlapping_jobs(test_app_context, mocker):
+    """Test that queued and running jobs of any of the uploads are found."""
+    query = mocker.patch.object(ProjectReleaseJob, "query")
+    job = ProjectReleaseJob(
+        id=8,
+        upload_ids=[2, 3],
+        status=ProjectReleaseJob.QUEUED,
+        created_at=datetime.utcnow(),
+    )
+    query.filter.return_value.order_by.return_value = [job]
+
+    assert ProjectReleaseJob.unfinished_for(10, [1, 2]) is job
+
+    criteria = [str(criterion) for criterion in query.filter.call_args.args]
+    assert "project_release_jobs.project_id = :project_id_1" in criteria
+    assert "(project_release_jobs.status NOT IN (__[POSTCOMPILE_status_1]))" in criteria
+    assert "project_release_jobs.upload_ids && :upload_ids_1" in criteria
+
+
+def stuck_job(**kwargs):
+    return ProjectReleaseJob(id=8, upload_ids=[1, 2], **kwargs)
+
+
+def test_release_job_timeout(test_app_context):
+    """Test that the timeout covers the uploads and the validation."""
+    # 2 uploads of 5 minutes, 31 seconds of polling, 6 requests of 10 seconds
+    assert stuck_job().timeout == timedelta(seconds=2 * 300 + 31 + 60)
+
+
+def test_stale_release_job_is_failed(test_app_context, mocker):
+    """Test that jobs stuck past their timeout don't block new releases."""
+    save = mocker.patch.object(ProjectReleaseJob, "save")
+    query = mocker.patch.object(ProjectReleaseJob, "query")
+    now = datetime.utcnow()
+    stale = stuck_job(
+        status=ProjectReleaseJob.UPLOADING,
+        created_at=now - timedelta(hours=2),
+        started_at=now - timedelta(hours=1),
+    )
+    queued = stuck_job(
+        status=ProjectReleaseJob.QUEUED, created_at=now - timedelta(minutes=1)
+    )
+    query.filter.return_value.order_by.return_value = [stale]
+
+    assert ProjectReleaseJob.unfinished_for(10, [1, 2]) is None
+    assert stale.status == ProjectReleaseJob.FAILED
+    assert stale.finished_at is not None
+    assert "didn't finish in time" in stale.errors[0]
+    save.assert_called_once_with()
+    assert not queued.is_stale
+    assert not queued.fail_if_stale()
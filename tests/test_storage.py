@@ -0,0 +1,135 @@
+"""
+Tests for the upload storage backends.
+"""
+
+import os
+
+import pytest
+
+from jazzband.projects.storage import LocalStorage, S3Storage, create_storage
+from jazzband.projects.uploads import HashingFile
+
+
+CONTENT = b"wheel content" * 1000
+DIGEST = "2c0ffee" + "0" * 57
+
+
+def hashing_file(content=CONTENT):
+    upload_file = HashingFile()
+    upload_file.write(content)
+    return upload_file
+
+
+def test_storage_keys_are_sharded_by_digest():
+    """Test that keys spread uploads over two levels of directories."""
+    assert LocalStorage("/app/uploads").key(DIGEST) == f"2c/0f/{DIGEST}"
+
+
+def test_local_storage_round_trip(app, tmp_path):
+    """Test storing, reading, copying and deleting local uploads."""
+    storage = LocalStorage(app.config["UPLOAD_ROOT"])
+    key = storage.key(DIGEST)
+
+    with app.app_context():
+        upload_file = hashing_file()
+        storage.store(key, upload_file)
+        upload_file.close()
+
+    assert storage.exists(key)
+    assert storage.local_path(key) == os.path.join(
+        app.config["UPLOAD_ROOT"], "2c", "0f", DIGEST
+    )
+    with storage.open(key) as stored:
+        assert stored.read() == CONTENT
+    storage.copy_to(key, tmp_path / "copy")
+    assert (tmp_path / "copy").read_bytes() == CONTENT
+
+    storage.delete(key)
+    storage.delete(key)
+    assert not storage.exists(key)
+
+
+def test_local_storage_reads_unsharded_keys(app):
+    """Test that uploads stored before the sharding are still found."""
+    storage = LocalStorage(app.config["UPLOAD_ROOT"])
+    os.makedirs(os.path.join(app.config["UPLOAD_ROOT"], "acme"))
+    with open(os.path.join(app.config["UPLOAD_ROOT"], "acme", DIGEST), "wb") as f:
+        f.write(CONTENT)
+
+    with storage.open(f"acme/{DIGEST}") as stored:
+        assert stored.read() == CONTENT
+
+
+def test_create_storage(app):
+    """Test that the backend is chosen by the UPLOAD_STORAGE setting."""
+    storage = create_storage(app.config)
+    assert isinstance(storage, LocalStorage)
+    assert storage.root == app.config["UPLOAD_ROOT"]
+
+    with pytest.raises(ValueError):
+        create_storage({**app.config, "UPLOAD_STORAGE": "floppy"})
+
+
+def test_upload_deletion_removes_stored_files(mocker):
+    """Test that deleting an upload deletes its files from the storage."""
+    from jazzband.projects.models import ProjectUpload, delete_upload_file
+
+    storage = mocker.MagicMock()
+    mocker.patch("jazzband.projects.models.upload_storage", storage)
+    connection = mocker.MagicMock()
+    connection.execute.return_value.first.return_value = None
+    upload = ProjectUpload(id=42, path=f"2c/0f/{DIGEST}")
+
+    delete_upload_file(None, connection, upload)
+
+    assert storage.delete.call_args_list == [
+        mocker.call(f"2c/0f/{DIGEST}.42.asc"),
+        mocker.call(f"2c/0f/{DIGEST}"),
+        mocker.call(f"2c/0f/{DIGEST}.asc"),
+    ]
+
+
+def test_upload_deletion_keeps_shared_files(mocker):
+    """Test that files of uploads with the same content aren't deleted."""
+    from jazzband.projects.models import ProjectUpload, delete_upload_file
+
+    storage = mocker.MagicMock()
+    mocker.patch("jazzband.projects.models.upload_storage", storage)
+    connection = mocker.MagicMock()
+    connection.execute.return_value.first.return_value = (43,)
+    upload = ProjectUpload(id=42, path=f"2c/0f/{DIGEST}")
+
+    delete_upload_file(None, connection, upload)
+
+    storage.delete.assert_called_once_with(f"2c/0f/{DIGEST}.42.asc")
+    sql = str(connection.execute.call_args.args[0])
+    assert "project_uploads.path = :path_1" in sql
+    assert "project_uploads.id != :id_1" in sql
+
+
+@pytest.fixture
+def s3_storage():
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        storage = S3Storage("uploads", prefix="jazzband/", region_name="us-east-1")
+        storage.client.create_bucket(Bucket="uploads")
+        yield storage
+
+
+def test_s3_storage_round_trip(app, s3_storage, tmp_path):
+    """Test storing, reading, copying and deleting uploads in S3."""
+    key = s3_storage.key(DIGEST)
+
+    with app.app_context():
+        s3_storage.store(key, hashing_file())
+
+    assert s3_storage.exists(key)
+    assert s3_storage.local_path(key) is None
+    listed = s3_storage.client.list_objects_v2(Bucket="uploads")["Contents"]
+    assert [item["Key"] for item in listed] == [f"jazzband/2c/0f/{DIGEST}"]
+    assert s3_storage.open(key).read() == CONTENT
+    s3_storage.copy_to(key, tmp_path / "copy")
+    assert (tmp_path / "copy").read_bytes() == CONTENT
+
+    s3_storage.delete(key)
+    assert not s3_storage.exists(key)
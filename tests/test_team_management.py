@@ -12,7 +12,7 @@ from unittest.mock import MagicMock
 
 import pytest
 
-from jazzband.account.blueprint import GitHubBlueprint
+from jazzband.account.blueprint import GitHubBlueprint, MemberSnapshot
 
 
 @pytest.fixture
@@ -315,6 +315,12 @@ def test_get_members(github_blueprint, mocker, github_org_name):
 
     # When GitHubBlueprint.get_without_2fa is called, return mock_without_2fa
     blueprint.get_without_2fa = MagicMock(return_value=mock_without_2fa)
+    blueprint.get_member_snapshot = lambda: GitHubBlueprint.get_member_snapshot(
+        blueprint
+    )
+    blueprint.get_team_members = lambda slug: GitHubBlueprint.get_team_members(
+        blueprint, slug
+    )
 
     # Setup admin_session.get to return the members
     mock_admin_session.get.return_value = mock_members
@@ -348,3 +354,51 @@ def test_get_members(github_blueprint, mocker, github_org_name):
     assert result_by_login["roadie1"]["is_member"] is True
     assert result_by_login["roadie1"]["is_roadie"] is True
     assert result_by_login["roadie1"]["has_2fa"] is True
+
+
+def test_get_members_with_snapshot(github_blueprint, github_org_name):
+    """Test that a shared snapshot avoids re-fetching the org-wide lists."""
+    blueprint, mock_admin_session = github_blueprint
+    snapshot = MemberSnapshot(without_2fa_ids=[222], roadies_ids=[333])
+    blueprint.get_team_members.return_value = [
+        {"id": 111, "login": "member1"},
+        {"id": 222, "login": "member2"},
+    ]
+
+    result = GitHubBlueprint.get_members(blueprint, "project-team", snapshot=snapshot)
+
+    blueprint.get_team_members.assert_called_once_with("project-team")
+    mock_admin_session.get.assert_not_called()
+    blueprint.get_member_snapshot.assert_not_called()
+    blueprint.get_roadies.assert_not_called()
+    blueprint.get_without_2fa.assert_not_called()
+    assert [member["has_2fa"] for member in result] == [True, False]
+    assert [member["is_roadie"] for member in result] == [False, False]
+
+
+def test_get_member_snapshot(github_blueprint):
+    """Test that the snapshot fetches the 2FA and roadie lists once."""
+    blueprint, _ = github_blueprint
+    blueprint.get_without_2fa.return_value = [{"id": 222}]
+    blueprint.get_roadies.return_value = [{"id": 333}]
+
+    snapshot = GitHubBlueprint.get_member_snapshot(blueprint)
+
+    assert snapshot.without_2fa_ids == {222}
+    assert snapshot.roadies_ids == {333}
+    blueprint.get_without_2fa.assert_called_once_with()
+    blueprint.get_roadies.assert_called_once_with()
+
+
+def test_get_team_members(github_blueprint, github_org_name):
+    """Test that plain team members are returned without enrichment."""
+    blueprint, mock_admin_session = github_blueprint
+    mock_admin_session.get.return_value = [{"id": 111, "login": "member1"}]
+
+    result = GitHubBlueprint.get_team_members(blueprint, "project-team")
+
+    mock_admin_session.get.assert_called_once_with(
+        f"orgs/{github_org_name}/teams/project-team/members", all_pages=True
+    )
+    assert result == [{"id": 111, "login": "member1"}]
+    blueprint.get_roadies.assert_not_called()
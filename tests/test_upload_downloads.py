@@ -0,0 +1,97 @@
+"""
+Tests for downloading uploads.
+
+These tests cover handing downloads to the front proxy and the digest
+ETags and Range support of downloads sent by the app.
+"""
+
+import hashlib
+import os
+
+import pytest
+
+from jazzband.projects.views import UploadDownloadView
+
+
+CONTENT = b"0123456789" * 1000
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def download_view(app, mocker):
+    root = app.config["UPLOAD_ROOT"]
+    path = f"{SHA256[:2]}/{SHA256[2:4]}/{SHA256}"
+    full_path = f"{root}/{path}"
+    os.makedirs(os.path.dirname(full_path))
+    with open(full_path, "wb") as f:
+        f.write(CONTENT)
+
+    view = UploadDownloadView()
+    view.upload = mocker.MagicMock()
+    view.upload.filename = "acme-1.0.tar.gz"
+    view.upload.path = path
+    view.upload.full_path = full_path
+    view.upload.sha256_digest = SHA256.upper()
+    return view
+
+
+def test_download_sent_by_app_with_digest_etag(app, download_view):
+    """Test that the sha256 digest is the strong ETag of downloads."""
+    with app.test_request_context():
+        response = download_view.get("acme", 1)
+        response.direct_passthrough = False
+
+        assert response.status_code == 200
+        assert response.get_etag() == (SHA256, False)
+        assert response.get_data() == CONTENT
+        assert "attachment" in response.headers["Content-Disposition"]
+
+    with app.test_request_context(headers={"If-None-Match": f'"{SHA256}"'}):
+        assert download_view.get("acme", 1).status_code == 304
+
+
+def test_download_sent_by_app_supports_ranges(app, download_view):
+    """Test that resumed downloads only get the requested bytes."""
+    with app.test_request_context(headers={"Range": "bytes=10-19"}):
+        response = download_view.get("acme", 1)
+        response.direct_passthrough = False
+
+        assert response.status_code == 206
+        assert response.get_data() == CONTENT[10:20]
+        assert response.headers["Content-Range"] == f"bytes 10-19/{len(CONTENT)}"
+
+
+def test_download_handed_to_nginx(app, download_view):
+    """Test that nginx is asked to send the file from its storage key."""
+    app.config["UPLOAD_DOWNLOAD_MODE"] = "accel-redirect"
+
+    with app.test_request_context():
+        response = download_view.get("acme", 1)
+
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == (
+        f"/_uploads/{download_view.upload.path}"
+    )
+    assert response.get_data() == b""
+    assert response.get_etag() == (SHA256, False)
+    assert response.headers["Content-Disposition"] == (
+        "attachment; filename=acme-1.0.tar.gz"
+    )
+    assert response.cache_control.private
+
+    with app.test_request_context(headers={"If-None-Match": f'"{SHA256}"'}):
+        response = download_view.get("acme", 1)
+
+    assert response.status_code == 304
+    assert "X-Accel-Redirect" not in response.headers
+
+
+def test_download_handed_to_sendfile_proxy(app, download_view):
+    """Test that X-Sendfile proxies get the local path of the file."""
+    app.config["USE_X_SENDFILE"] = True
+
+    with app.test_request_context():
+        response = download_view.get("acme", 1)
+
+    assert response.headers["X-Sendfile"] == download_view.upload.full_path
+    assert response.get_etag() == (SHA256, False)
@@ -0,0 +1,82 @@
+"""
+Tests for notifying leads and roadies about new uploads.
+
+These tests cover resolving the recipients of all notifications of a
+task run with a single query.
+"""
+
+from sqlalchemy.dialects import postgresql
+
+from jazzband.members.models import User
+from jazzband.projects.models import Project, ProjectUpload
+from jazzband.projects.tasks import UploadRecipients, send_new_upload_notifications
+
+
+def user(id, login, is_roadie=False):
+    return User(id=id, login=login, is_roadie=is_roadie)
+
+
+def test_upload_recipients_resolved_with_one_query(test_app_context, mocker):
+    """Test that leads, roadies and their emails are loaded together."""
+    lead = user(1, "lead")
+    co_lead = user(2, "co-lead")
+    roadie = user(3, "roadie", is_roadie=True)
+    lead_roadie = user(4, "lead-roadie", is_roadie=True)
+    execute = mocker.patch(
+        "jazzband.projects.tasks.postgres.session.execute",
+        return_value=[
+            (lead, 10, "lead@example.com"),
+            (lead, 20, "lead@example.com"),
+            (co_lead, 10, None),
+            (lead_roadie, 20, "lead-roadie@example.com"),
+            (roadie, None, "roadie@example.com"),
+        ],
+    )
+
+    recipients = UploadRecipients({10, 20})
+
+    execute.assert_called_once()
+    sql = str(execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "LEFT OUTER JOIN project_memberships" in sql
+    assert "LEFT OUTER JOIN email_addresses" in sql
+    assert recipients.for_project(10) == (
+        [lead, co_lead],
+        {"lead@example.com", "roadie@example.com", "lead-roadie@example.com"},
+    )
+    assert recipients.for_project(20) == (
+        [lead, lead_roadie],
+        {"lead@example.com", "roadie@example.com", "lead-roadie@example.com"},
+    )
+    assert recipients.for_project(30) == (
+        [],
+        {"roadie@example.com", "lead-roadie@example.com"},
+    )
+
+
+def test_new_upload_notifications_share_recipients(test_app_context, mocker):
+    """Test that many uploads don't query their recipients one by one."""
+    project = Project(id=10, name="acme")
+    uploads = [
+        ProjectUpload(id=id, project=project, project_id=10, filename=f"acme-{id}.whl")
+        for id in range(20)
+    ]
+    query = mocker.patch.object(ProjectUpload, "query")
+    query.filter_by.return_value.options.return_value.all.return_value = uploads
+    recipients = mocker.patch("jazzband.projects.tasks.UploadRecipients")
+    recipients.return_value.for_project.return_value = (
+        [user(1, "lead")],
+        {"lead@example.com"},
+    )
+    mocker.patch("jazzband.projects.tasks.render_template", return_value="")
+    mocker.patch.object(ProjectUpload, "save")
+    mocker.patch("jazzband.projects.tasks.postgres.session.commit")
+    smtp = mocker.patch("jazzband.projects.tasks.mail.connect").return_value
+    smtp = smtp.__enter__.return_value
+
+    send_new_upload_notifications()
+
+    recipients.assert_called_once_with({10})
+    assert smtp.send.call_count == 20
+    message = smtp.send.call_args.args[0]
+    assert message.recipients == ["lead@example.com"]
+    assert all(upload.notified_at is not None for upload in uploads)
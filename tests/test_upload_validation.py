@@ -6,28 +6,27 @@ delays as warnings rather than blocking errors.
 """
 
 import pytest
-from requests.exceptions import HTTPError, RequestException, Timeout
 
+from jazzband.projects.releases import UploadValidator
 from jazzband.projects.views import UploadReleaseView
 
 
 @pytest.fixture
-def upload_view(mocker):
-    """Create an UploadReleaseView instance with mock upload and project."""
-    view = UploadReleaseView()
+def upload_validator(mocker):
+    """Create an UploadValidator for a mock upload of version 1.0.0."""
+    validator = UploadValidator()
 
     # Mock upload
-    view.upload = mocker.MagicMock()
-    view.upload.filename = "test-package-1.0.0.tar.gz"
-    view.upload.version = "1.0.0"
-    view.upload.md5_digest = "abc123"
-    view.upload.sha256_digest = "def456"
+    validator.upload = mocker.MagicMock()
+    validator.upload.filename = "test-package-1.0.0.tar.gz"
+    validator.upload.version = "1.0.0"
+    validator.upload.md5_digest = "abc123"
+    validator.upload.sha256_digest = "def456"
 
     # Mock project
-    view.project = mocker.MagicMock()
-    view.project.pypi_json_url = "https://pypi.org/pypi/test-package/json"
+    validator.project = mocker.MagicMock()
 
-    return view
+    return validator
 
 
 @pytest.fixture
@@ -63,116 +62,11 @@ def pypi_response_with_hash_mismatch():
     }
 
 
-def test_validate_upload_success(upload_view, valid_pypi_response, mocker):
-    """Test successful validation with matching hashes."""
-    # Mock successful requests.get
-    mock_response = mocker.MagicMock()
-    mock_response.json.return_value = valid_pypi_response
-    mock_response.raise_for_status.return_value = None
-
-    mocker.patch("requests.get", return_value=mock_response)
-
-    success, errors, warnings = upload_view.validate_upload()
-
-    assert success is True
-    assert errors == []
-    assert warnings == []
-
-
-def test_validate_upload_timeout_warning(upload_view, mocker):
-    """Test that timeouts are treated as warnings, not errors."""
-    mocker.patch("requests.get", side_effect=Timeout("Request timed out"))
-
-    success, errors, warnings = upload_view.validate_upload()
-
-    assert success is True  # Should still succeed
-    assert errors == []
-    assert len(warnings) == 1
-    assert "timed out" in warnings[0]
-    assert "CDN propagation delays" in warnings[0]
-
-
-def test_validate_upload_404_warning(upload_view, mocker):
-    """Test that 404 errors are treated as CDN delay warnings."""
-    response = mocker.MagicMock()
-    response.status_code = 404
-    mocker.patch(
-        "requests.get", side_effect=HTTPError("404 Not Found", response=response)
-    )
-
-    success, errors, warnings = upload_view.validate_upload()
-
-    assert success is True  # Should still succeed
-    assert errors == []
-    assert len(warnings) == 1
-    assert "not yet visible on PyPI API" in warnings[0]
-    assert "CDN propagation delays" in warnings[0]
-
-
-def test_validate_upload_other_http_error(upload_view, mocker):
-    """Test that non-404 HTTP errors are treated as real errors."""
-    response = mocker.MagicMock()
-    response.status_code = 500
-    mocker.patch(
-        "requests.get",
-        side_effect=HTTPError("500 Internal Server Error", response=response),
-    )
-
-    success, errors, warnings = upload_view.validate_upload()
-
-    assert success is False  # Should fail
-    assert len(errors) == 1
-    assert "HTTP error 500" in errors[0]
-    assert warnings == []
-
-
-def test_validate_upload_network_error_warning(upload_view, mocker):
-    """Test that network errors are treated as warnings."""
-    mocker.patch("requests.get", side_effect=RequestException("Network error"))
-
-    success, errors, warnings = upload_view.validate_upload()
-
-    assert success is True  # Should still succeed
-    assert errors == []
-    assert len(warnings) == 1
-    assert "Network error during validation" in warnings[0]
-    assert "verify manually" in warnings[0]
-
-
-def test_validate_upload_json_parse_error(upload_view, mocker):
-    """Test that JSON parsing errors are treated as real errors."""
-    mock_response = mocker.MagicMock()
-    mock_response.json.side_effect = ValueError("Invalid JSON")
-    mock_response.raise_for_status.return_value = None
-
-    mocker.patch("requests.get", return_value=mock_response)
-
-    success, errors, warnings = upload_view.validate_upload()
-
-    assert success is False  # Should fail
-    assert len(errors) == 1
-    assert "parsing response from PyPI" in errors[0]
-    assert warnings == []
-
-
-def test_validate_upload_unknown_exception_warning(upload_view, mocker):
-    """Test that unknown exceptions are treated as warnings."""
-    mocker.patch("requests.get", side_effect=Exception("Something unexpected happened"))
-
-    success, errors, warnings = upload_view.validate_upload()
-
-    assert success is True  # Should still succeed
-    assert errors == []
-    assert len(warnings) == 1
-    assert "Unknown error during validation" in warnings[0]
-    assert "verify manually" in warnings[0]
-
-
-def test_validate_upload_data_no_releases_warning(upload_view):
+def test_validate_upload_data_no_releases_warning(upload_validator):
     """Test that missing releases are treated as CDN delay warnings."""
     data = {"releases": {}}  # No releases for this version
 
-    success, errors, warnings = upload_view._validate_upload_data(data)
+    success, errors, warnings = upload_validator.validate_upload_data(data)
 
     assert success is True
     assert errors == []
@@ -181,7 +75,7 @@ def test_validate_upload_data_no_releases_warning(upload_view):
     assert "CDN propagation delays" in warnings[0]
 
 
-def test_validate_upload_data_file_not_found_warning(upload_view):
+def test_validate_upload_data_file_not_found_warning(upload_validator):
     """Test that missing specific file is treated as CDN delay warning."""
     data = {
         "releases": {
@@ -194,7 +88,7 @@ def test_validate_upload_data_file_not_found_warning(upload_view):
         }
     }
 
-    success, errors, warnings = upload_view._validate_upload_data(data)
+    success, errors, warnings = upload_validator.validate_upload_data(data)
 
     assert success is True
     assert errors == []
@@ -203,7 +97,7 @@ def test_validate_upload_data_file_not_found_warning(upload_view):
     assert "CDN propagation delays" in warnings[0]
 
 
-def test_validate_upload_data_md5_hash_mismatch_error(upload_view):
+def test_validate_upload_data_md5_hash_mismatch_error(upload_validator):
     """Test that MD5 hash mismatches are treated as real errors."""
     data = {
         "releases": {
@@ -219,7 +113,7 @@ def test_validate_upload_data_md5_hash_mismatch_error(upload_view):
         }
     }
 
-    success, errors, warnings = upload_view._validate_upload_data(data)
+    success, errors, warnings = upload_validator.validate_upload_data(data)
 
     assert success is False  # Should fail due to hash mismatch
     assert len(errors) == 1
@@ -228,7 +122,7 @@ def test_validate_upload_data_md5_hash_mismatch_error(upload_view):
     assert warnings == []
 
 
-def test_validate_upload_data_sha256_hash_mismatch_error(upload_view):
+def test_validate_upload_data_sha256_hash_mismatch_error(upload_validator):
     """Test that SHA256 hash mismatches are treated as real errors."""
     data = {
         "releases": {
@@ -244,7 +138,7 @@ def test_validate_upload_data_sha256_hash_mismatch_error(upload_view):
         }
     }
 
-    success, errors, warnings = upload_view._validate_upload_data(data)
+    success, errors, warnings = upload_validator.validate_upload_data(data)
 
     assert success is False  # Should fail due to hash mismatch
     assert len(errors) == 1
@@ -253,7 +147,7 @@ def test_validate_upload_data_sha256_hash_mismatch_error(upload_view):
     assert warnings == []
 
 
-def test_validate_upload_data_no_digests_warning(upload_view):
+def test_validate_upload_data_no_digests_warning(upload_validator):
     """Test that missing digests are treated as warnings."""
     data = {
         "releases": {
@@ -266,7 +160,7 @@ def test_validate_upload_data_no_digests_warning(upload_view):
         }
     }
 
-    success, errors, warnings = upload_view._validate_upload_data(data)
+    success, errors, warnings = upload_validator.validate_upload_data(data)
 
     assert success is True  # Should succeed despite missing digests
     assert errors == []
@@ -274,7 +168,7 @@ def test_validate_upload_data_no_digests_warning(upload_view):
     assert "No digests available" in warnings[0]
 
 
-def test_validate_upload_data_partial_hash_match(upload_view):
+def test_validate_upload_data_partial_hash_match(upload_validator):
     """Test validation when only one hash is available and matches."""
     # Only SHA256 available, MD5 missing - should succeed
     data = {
@@ -291,31 +185,16 @@ def test_validate_upload_data_partial_hash_match(upload_view):
         }
     }
 
-    success, errors, warnings = upload_view._validate_upload_data(data)
+    success, errors, warnings = upload_validator.validate_upload_data(data)
 
     assert success is True
     assert errors == []
     assert warnings == []
 
 
-def test_validate_upload_timeout_parameter(upload_view, mocker):
-    """Test that custom timeout parameter is used."""
-    call_args = []
-
-    def mock_get(*args, **kwargs):
-        call_args.append(kwargs)
-        raise Timeout("Request timed out")
-
-    mocker.patch("requests.get", side_effect=mock_get)
-
-    # Test with custom timeout
-    upload_view.validate_upload(timeout=15)
-
-    assert len(call_args) == 1
-    assert call_args[0]["timeout"] == 15
-
-
-def test_validate_upload_multiple_files_in_release(upload_view, valid_pypi_response):
+def test_validate_upload_data_multiple_files_in_release(
+    upload_validator, valid_pypi_response
+):
     """Test validation when multiple files exist for the same version."""
     # Add another file to the release
     valid_pypi_response["releases"]["1.0.0"].append(
@@ -325,7 +204,9 @@ def test_validate_upload_multiple_files_in_release(upload_view, valid_pypi_respo
         }
     )
 
-    success, errors, warnings = upload_view._validate_upload_data(valid_pypi_response)
+    success, errors, warnings = upload_validator.validate_upload_data(
+        valid_pypi_response
+    )
 
     # Should find our specific file and validate it successfully
     assert success is True
@@ -333,102 +214,34 @@ def test_validate_upload_multiple_files_in_release(upload_view, valid_pypi_respo
     assert warnings == []
 
 
-def test_validate_upload_integration_with_post_method(app, mocker):
-    """Test integration of validation with the post method."""
-    # This test verifies the validation is properly integrated
-    # and that warnings don't block releases while errors do
-
+def test_release_post_enqueues_release_job(app, mocker):
+    """Test that releasing an upload doesn't run twine in the request."""
     view = UploadReleaseView()
     view.upload = mocker.MagicMock()
+    view.upload.id = 123
     view.upload.released_at = None
-    view.upload.filename = "test-1.0.0.tar.gz"
-    view.project = mocker.MagicMock()
-
-    # Mock the validate_upload method to return warnings
-    def mock_validate_upload():
-        return True, [], ["CDN delay warning"]
-
-    mocker.patch.object(view, "validate_upload", mock_validate_upload)
-
-    # Mock form validation
-    mock_form = mocker.MagicMock()
-    mock_form.validate_on_submit.return_value = True
-
-    # Mock twine run
-    mock_twine_run = mocker.MagicMock()
-    mock_twine_run.return_code = 0
-
-    # Mock flash and other dependencies
-    flash_calls = []
-
-    def mock_flash(message, category=None):
-        flash_calls.append((message, category))
-
-    mocker.patch("jazzband.projects.views.flash", mock_flash)
-    mocker.patch("jazzband.projects.views.ReleaseForm", lambda **kwargs: mock_form)
-    mocker.patch("jazzband.projects.views.delegator.run", lambda cmd: mock_twine_run)
-    mocker.patch(
-        "jazzband.projects.views.tempfile.TemporaryDirectory",
-        lambda: mocker.MagicMock().__enter__(),
-    )
-    mocker.patch("jazzband.projects.views.shutil.copy", lambda src, dst: None)
-    mocker.patch("jazzband.projects.views.datetime", mocker.MagicMock())
-
-    with app.test_request_context():
-        view.post("test-project", 123)
-
-    # Should have flashed the warning
-    warning_flashes = [(msg, cat) for msg, cat in flash_calls if cat == "warning"]
-    assert len(warning_flashes) == 1
-    assert "CDN delay warning" in warning_flashes[0][0]
-
-    # Should have flashed success message
-    success_flashes = [(msg, cat) for msg, cat in flash_calls if cat == "success"]
-    assert len(success_flashes) == 1
-
-    # Upload should have been marked as released
-    assert view.upload.released_at is not None
-    view.upload.save.assert_called_once()
-
-
-def test_validate_upload_blocks_on_hash_mismatch_error(app, mocker):
-    """Test that hash mismatch errors properly block the release."""
-    view = UploadReleaseView()
-    view.upload = mocker.MagicMock()
-    view.upload.released_at = None
-    view.upload.filename = "test-1.0.0.tar.gz"
+    view.upload.version = "1.0.0"
     view.project = mocker.MagicMock()
+    view.project.name = "test-project"
 
-    # Mock the validate_upload method to return errors
-    def mock_validate_upload():
-        return False, ["Hash mismatch error"], []
-
-    mocker.patch.object(view, "validate_upload", mock_validate_upload)
-
-    # Mock form validation
     mock_form = mocker.MagicMock()
     mock_form.validate_on_submit.return_value = True
-
-    # Mock twine run success
-    mock_twine_run = mocker.MagicMock()
-    mock_twine_run.return_code = 0
-
-    # Mock dependencies
     mocker.patch("jazzband.projects.views.ReleaseForm", lambda **kwargs: mock_form)
-    mocker.patch("jazzband.projects.views.delegator.run", lambda cmd: mock_twine_run)
-    mocker.patch(
-        "jazzband.projects.views.tempfile.TemporaryDirectory",
-        lambda: mocker.MagicMock().__enter__(),
-    )
-    mocker.patch("jazzband.projects.views.shutil.copy", lambda src, dst: None)
+    mock_job_class = mocker.patch("jazzband.projects.views.ProjectReleaseJob")
+    mock_job_class.unfinished_for.return_value = None
+    mock_job_class.return_value.save.return_value.id = 7
+    mock_spinach = mocker.patch("jazzband.projects.views.spinach")
+    mocker.patch("jazzband.projects.views.redis")
+    mock_user = mocker.MagicMock()
+    mock_user.id = 42
+    mocker.patch("jazzband.projects.views.current_user", mock_user)
 
     with app.test_request_context():
         result = view.post("test-project", 123)
 
-    # Should have returned the form context with errors (not redirected)
-    assert isinstance(result, dict)
-    assert "upload" in result
-
-    # Upload should NOT have been marked as released due to validation errors
+    assert result.status_code == 302
+    assert result.location.endswith("/projects/test-project/releases/7")
+    assert mock_job_class.call_args.kwargs["upload_ids"] == [123]
+    assert mock_spinach.schedule.call_args.args[1] == 7
     assert view.upload.released_at is None
     view.upload.save.assert_not_called()
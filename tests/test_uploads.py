@@ -0,0 +1,185 @@
+"""
+Tests for streaming uploads into the upload storage.
+
+These tests cover hashing uploaded files while werkzeug writes them and
+renaming them into their content-addressed storage path.
+"""
+
+import hashlib
+from io import BytesIO
+import os
+
+from werkzeug.datastructures import FileStorage
+
+from jazzband.projects.uploads import HashingFile, staged_upload
+
+
+CONTENT = b"wheel content" * 100_000
+
+
+def incoming_files(app):
+    directory = os.path.join(app.config["UPLOAD_ROOT"], ".incoming")
+    return os.listdir(directory) if os.path.exists(directory) else []
+
+
+def test_hashing_file_hashes_while_writing(app):
+    """Test that the digests and size are computed from the written chunks."""
+    with app.app_context():
+        with HashingFile() as upload_file:
+            for start in range(0, len(CONTENT), 64 * 1024):
+                upload_file.write(CONTENT[start : start + 64 * 1024])
+            upload_file.seek(0)
+
+            assert upload_file.size == len(CONTENT)
+            assert upload_file.read() == CONTENT
+            assert upload_file.hexdigests() == {
+                "md5": hashlib.md5(CONTENT).hexdigest(),
+                "sha256": hashlib.sha256(CONTENT).hexdigest(),
+                "blake2_256": hashlib.blake2b(CONTENT, digest_size=32).hexdigest(),
+            }
+
+
+def test_hashing_file_commit_renames_into_place(app):
+    """Test that committing moves the file instead of copying it."""
+    with app.app_context():
+        path = os.path.join(app.config["UPLOAD_ROOT"], "acme", "digest")
+        with HashingFile() as upload_file:
+            upload_file.write(CONTENT)
+            inode = os.stat(upload_file.name).st_ino
+            upload_file.commit(path)
+
+        with open(path, "rb") as stored:
+            assert stored.read() == CONTENT
+        assert os.stat(path).st_ino == inode
+        assert incoming_files(app) == []
+
+
+def test_hashing_file_removed_when_not_committed(app):
+    """Test that rejected uploads don't leave files behind."""
+    with app.app_context():
+        with HashingFile() as upload_file:
+            upload_file.write(CONTENT)
+            assert len(incoming_files(app)) == 1
+
+        assert incoming_files(app) == []
+
+
+def test_upload_request_streams_files_into_storage(app):
+    """Test that the upload endpoint parses files into HashingFiles."""
+    data = {"content": (BytesIO(CONTENT), "acme-1.0.tar.gz")}
+    with app.test_request_context(
+        "/projects/acme/upload", method="POST", data=data
+    ) as context:
+        from flask import request
+
+        content = request.files["content"]
+        assert isinstance(content.stream, HashingFile)
+        assert staged_upload(content) is content.stream
+        assert content.stream.hexdigests()["sha256"] == (
+            hashlib.sha256(CONTENT).hexdigest()
+        )
+        assert len(incoming_files(app)) == 1
+        context.request.close()
+
+    assert incoming_files(app) == []
+
+
+def test_other_requests_use_default_file_streams(app):
+    """Test that files of other endpoints aren't written to the storage."""
+    data = {"content": (BytesIO(CONTENT), "acme-1.0.tar.gz")}
+    with app.test_request_context("/projects/acme", method="POST", data=data):
+        from flask import request
+
+        assert not isinstance(request.files["content"].stream, HashingFile)
+
+    assert incoming_files(app) == []
+
+
+def test_staged_upload_copies_unstreamed_files(app):
+    """Test the fallback for files that weren't streamed while parsing."""
+    file_storage = FileStorage(BytesIO(CONTENT), filename="acme-1.0.tar.gz")
+    with app.app_context():
+        staged = staged_upload(file_storage)
+
+        assert file_storage.stream is staged
+        assert staged.size == len(CONTENT)
+        assert staged.hexdigests()["md5"] == hashlib.md5(CONTENT).hexdigest()
+        file_storage.close()
+
+    assert incoming_files(app) == []
+
+
+def test_upload_view_stores_upload_in_one_pass(app, mocker):
+    """Test that the upload view renames the hashed file into place."""
+    from jazzband.projects.views import UploadView
+
+    project = mocker.MagicMock()
+    project.name = "acme"
+    query = mocker.patch("jazzband.projects.views.active_project_query")
+    query.return_value.first_or_404.return_value = project
+    mocker.patch.object(UploadView, "check_authentication", return_value=True)
+    upload_model = mocker.patch("jazzband.projects.views.ProjectUpload")
+    upload_model.query.filter_by.return_value.scalar.return_value = None
+    upload = upload_model.return_value
+    upload.path = "ab/cd/abcd"
+    upload.signature_key = "ab/cd/abcd.7.asc"
+    session = mocker.patch("jazzband.projects.views.postgres.session")
+    mocker.patch("jazzband.projects.views.spinach")
+    mocker.patch("jazzband.projects.views.invalidate_index")
+    mocker.patch("jazzband.projects.views.invalidate_pages")
+    mocker.patch("jazzband.projects.views.invalidate_read_store")
+    signature = b"-----BEGIN PGP SIGNATURE-----\n"
+
+    response = app.test_client().post(
+        "/projects/acme/upload",
+        data={
+            "name": "acme",
+            "version": "1.0",
+            "content": (BytesIO(CONTENT), "acme-1.0.tar.gz"),
+            "gpg_signature": (BytesIO(signature), "acme-1.0.tar.gz.asc"),
+            "sha256_digest": hashlib.sha256(CONTENT).hexdigest(),
+        },
+    )
+
+    assert response.status_code == 200
+    kwargs = upload_model.call_args.kwargs
+    assert kwargs["size"] == len(CONTENT)
+    sha256 = hashlib.sha256(CONTENT).hexdigest()
+    assert kwargs["path"] == f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+    assert kwargs["md5_digest"] == hashlib.md5(CONTENT).hexdigest()
+    upload.save.assert_called_once_with(commit=False)
+    session.flush.assert_called_once_with()
+    session.commit.assert_called_once_with()
+    root = app.config["UPLOAD_ROOT"]
+    with open(os.path.join(root, "ab", "cd", "abcd"), "rb") as stored:
+        assert stored.read() == CONTENT
+    with open(os.path.join(root, "ab", "cd", "abcd.7.asc"), "rb") as stored:
+        assert stored.read() == signature
+    assert incoming_files(app) == []
+
+
+def test_upload_view_rejects_digest_mismatch(app, mocker):
+    """Test that mismatching uploads are rejected and cleaned up."""
+    from jazzband.projects.views import UploadView
+
+    project = mocker.MagicMock()
+    project.name = "acme"
+    query = mocker.patch("jazzband.projects.views.active_project_query")
+    query.return_value.first_or_404.return_value = project
+    mocker.patch.object(UploadView, "check_authentication", return_value=True)
+    upload_model = mocker.patch("jazzband.projects.views.ProjectUpload")
+    upload_model.query.filter_by.return_value.scalar.return_value = None
+
+    response = app.test_client().post(
+        "/projects/acme/upload",
+        data={
+            "name": "acme",
+            "version": "1.0",
+            "content": (BytesIO(CONTENT), "acme-1.0.tar.gz"),
+            "sha256_digest": "0" * 64,
+        },
+    )
+
+    assert response.status_code == 400
+    upload_model.assert_not_called()
+    assert incoming_files(app) == []